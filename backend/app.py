@@ -1,6 +1,8 @@
 from flask import Flask
 from flask_cors import CORS
 from config import Config
+from utils.compression import CompressionMiddleware
+from utils.json_provider import FastJSONProvider
 
 # Import blueprints
 from routes.ghost_chat import ghost_chat_bp
@@ -9,10 +11,21 @@ from routes.reanimator import reanimator_bp
 from routes.frankenstein_stitcher import frankenstein_stitcher_bp
 from routes.haunted_map import haunted_map_bp
 from routes.cursed_image import cursed_image_bp
+from routes.metrics import metrics_bp
+from routes.admin import admin_bp
+
+# Compression levels by path prefix, overriding the per-encoding defaults
+COMPRESSION_ROUTE_LEVELS = {
+    # Whole HTML documents, requested rarely; worth extra CPU for the bandwidth
+    '/api/reanimator': {'br': 7, 'zstd': 12, 'gzip': 9},
+    # Base64 of an already-compressed PNG barely shrinks; spend as little as possible
+    '/api/cursed-image/ai-transform': {'br': 1, 'zstd': 1, 'gzip': 1},
+}
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.json = FastJSONProvider(app)
     
     # Enable CORS for frontend
     CORS(app)
@@ -24,9 +37,25 @@ def create_app():
     app.register_blueprint(frankenstein_stitcher_bp)
     app.register_blueprint(haunted_map_bp)
     app.register_blueprint(cursed_image_bp)
+
+    # Times every request, so registered only when metrics are wanted
+    if Config.METRICS_ENABLED:
+        app.register_blueprint(metrics_bp)
+
+    # Profiling endpoints and hooks exist only when an admin token is set
+    if Config.ADMIN_TOKEN:
+        app.register_blueprint(admin_bp)
+
+    if Config.COMPRESSION_ENABLED:
+        app.wsgi_app = CompressionMiddleware(
+            app.wsgi_app,
+            min_size=Config.COMPRESSION_MIN_SIZE,
+            route_levels=COMPRESSION_ROUTE_LEVELS
+        )
     
     return app
 
 if __name__ == '__main__':
+    # Development server; use `gunicorn -c gunicorn.conf.py wsgi:app` in production
     app = create_app()
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=Config.DEBUG, host='0.0.0.0', port=Config.PORT)
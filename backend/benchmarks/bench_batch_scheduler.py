@@ -0,0 +1,86 @@
+"""
+Micro-batching benchmark
+
+Fires many concurrent completion requests at the bundled fake server, once
+with one model round trip per request and once through the BatchScheduler
+using the fake server's batch endpoint, and reports throughput, latency per
+priority and the batch sizes reached.
+
+Usage (from backend/):
+    python -m benchmarks.bench_batch_scheduler [--requests 400] [--clients 64] [--latency 50]
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_llm_server import start_server
+from services.batch_scheduler import BatchScheduler, PRIORITY_CHAT, PRIORITY_BACKGROUND
+from services.llm_backend import OpenAICompatibleBackend
+
+MESSAGES = [
+    {'role': 'system', 'content': 'You are a spooky ghost.'},
+    {'role': 'user', 'content': 'Hello?'},
+]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, int(len(ordered) * fraction) - 1)]
+
+def run(label, call, count, clients):
+    """Run count calls from a pool of clients; every 4th call is background priority"""
+    latencies = {PRIORITY_CHAT: [], PRIORITY_BACKGROUND: []}
+
+    def timed(index):
+        priority = PRIORITY_BACKGROUND if index % 4 == 3 else PRIORITY_CHAT
+        start = time.perf_counter()
+        call(priority)
+        latencies[priority].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(timed, range(count)))
+    elapsed = time.perf_counter() - start
+
+    print(f"  {label:<28} {count / elapsed:8.1f} req/s")
+    for priority, name in ((PRIORITY_CHAT, 'chat'), (PRIORITY_BACKGROUND, 'background')):
+        values = latencies[priority]
+        print(f"    {name:<12} p50={statistics.median(values) * 1000:7.1f}ms  "
+              f"p95={percentile(values, 0.95) * 1000:7.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--clients', type=int, default=64, help='concurrent callers')
+    parser.add_argument('--latency', type=float, default=50, help='fake model round trip in ms')
+    parser.add_argument('--concurrency', type=int, default=8, help='model calls in flight')
+    parser.add_argument('--max-batch', type=int, default=16)
+    parser.add_argument('--max-wait', type=float, default=15, help='batch window in ms')
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency / 1000)
+    options = dict(max_concurrency=args.concurrency, queue_timeout=60, timeout=60)
+
+    print(f"{args.requests} requests from {args.clients} clients, "
+          f"{args.latency:.0f}ms per model call, {args.concurrency} calls in flight")
+
+    direct = OpenAICompatibleBackend(server.base_url, **options)
+    run('one call per request', lambda priority: direct.complete(MESSAGES, max_tokens=40), args.requests, args.clients)
+
+    batched = OpenAICompatibleBackend(
+        server.base_url, batch_path='/chat/completions/batch', max_batch_size=args.max_batch, **options
+    )
+    scheduler = BatchScheduler(
+        batched, max_batch=args.max_batch, max_wait=args.max_wait / 1000, workers=args.concurrency
+    )
+    run(f'batched (<= {args.max_batch}, {args.max_wait:.0f}ms)',
+        lambda priority: scheduler.complete(MESSAGES, max_tokens=40, priority=priority, timeout=60),
+        args.requests, args.clients)
+
+    stats = scheduler.stats()
+    print(f"  batches={stats['batches']}  avg batch size={stats['avg_batch_size']:.1f}")
+
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
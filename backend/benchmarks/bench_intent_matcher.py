@@ -0,0 +1,115 @@
+"""
+Intent matcher benchmark and accuracy check
+
+Compares the compiled single-pass IntentMatcher against the keyword chains it
+replaced, on a labelled sample set and on long journal entries.
+
+Usage (from backend/):
+    python -m benchmarks.bench_intent_matcher [--sentences 200] [--repeat 200]
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from services.response_tables import response_tables
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Keyword chains from the previous substring-based implementation, in order
+LEGACY_CHAT_CHAIN = [
+    ('joke', ['joke', 'funny', 'laugh', 'humor']),
+    ('greeting', ['hello', 'hi', 'hey', 'greetings']),
+    ('identity', ['who are you', 'what are you', 'your name']),
+    ('scary', ['scary', 'spooky', 'frighten', 'scare']),
+]
+
+LEGACY_JOURNAL_CHAIN = [
+    ('sadness', ['sad', 'depressed', 'lonely', 'alone', 'cry', 'tears', 'hurt', 'pain', 'loss', 'miss']),
+    ('anger', ['angry', 'mad', 'furious', 'hate', 'rage', 'frustrated', 'annoyed']),
+    ('fear', ['scared', 'afraid', 'fear', 'anxious', 'worry', 'nervous', 'panic', 'terrified']),
+    ('joy', ['happy', 'joy', 'excited', 'great', 'wonderful', 'amazing', 'love', 'blessed', 'grateful']),
+    ('hope', ['hope', 'better', 'future', 'dream', 'wish', 'believe', 'faith', 'optimistic']),
+    ('confusion', ['confused', 'lost', 'uncertain', 'don\'t know', 'unsure', 'doubt', 'question']),
+]
+
+def legacy_classify(chain, text, default):
+    """First category with any substring hit wins"""
+    text_lower = text.lower()
+    for label, words in chain:
+        if any(word in text_lower for word in words):
+            return label
+    return default
+
+def legacy_score_all(chain, text, default):
+    """Substring counts for every category, the legacy way to score all intents"""
+    text_lower = text.lower()
+    counts = {label: sum(text_lower.count(word) for word in words) for label, words in chain}
+    best = max(counts, key=counts.get)
+    return best if counts[best] else default
+
+def accuracy(samples, classify):
+    correct = sum(1 for text, expected in samples if classify(text) == expected)
+    return correct / len(samples)
+
+def misses(samples, classify):
+    return [(text, expected, classify(text)) for text, expected in samples if classify(text) != expected]
+
+def build_long_entries(samples, sentences, count, seed=7):
+    """Concatenate labelled journal sentences into long entries"""
+    rng = random.Random(seed)
+    texts = [text for text, _ in samples]
+    return [' '.join(rng.choice(texts) + '.' for _ in range(sentences)) for _ in range(count)]
+
+def time_per_call(func, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            func(text)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(texts))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sentences', type=int, default=200, help='sentences per long journal entry')
+    parser.add_argument('--entries', type=int, default=10, help='number of long journal entries')
+    parser.add_argument('--repeat', type=int, default=50, help='timing repetitions')
+    parser.add_argument('--verbose', action='store_true', help='list misclassified samples')
+    args = parser.parse_args()
+
+    with open(os.path.join(FIXTURES_DIR, 'intent_samples.json'), encoding='utf-8') as f:
+        samples = json.load(f)
+
+    matchers = {
+        'chat': (response_tables.chat_intents, LEGACY_CHAT_CHAIN, 'generic'),
+        'journal': (response_tables.journal_emotions, LEGACY_JOURNAL_CHAIN, 'contemplation'),
+    }
+
+    print('Accuracy on labelled samples')
+    for name, (matcher, chain, default) in matchers.items():
+        labelled = samples[name]
+        compiled = lambda text: matcher.classify(text, default)
+        legacy = lambda text: legacy_classify(chain, text, default)
+        print(f"  {name:<8} samples={len(labelled):<4} "
+              f"legacy={accuracy(labelled, legacy):6.1%}  compiled={accuracy(labelled, compiled):6.1%}")
+        if args.verbose:
+            for text, expected, got in misses(labelled, compiled):
+                print(f"    miss: {text!r} expected={expected} got={got}")
+
+    matcher, chain, default = matchers['journal']
+    entries = build_long_entries(samples['journal'], args.sentences, args.entries)
+    average_length = sum(len(entry) for entry in entries) / len(entries)
+
+    timings = [
+        ('legacy, first hit', lambda text: legacy_classify(chain, text, default)),
+        ('legacy, all intents', lambda text: legacy_score_all(chain, text, default)),
+        ('compiled, all intents', lambda text: matcher.classify(text, default)),
+    ]
+
+    print(f"\nLong journal entries ({args.entries} x ~{average_length:,.0f} chars)")
+    for label, func in timings:
+        print(f"  {label:<22} {time_per_call(func, entries, args.repeat) * 1e6:10.1f} us/entry")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Journal store benchmark
+
+Checks that stored journals stay scoped to their token, through the store and
+through the HTTP routes, then fills one journal and times history pages at
+increasing depth and the emotion histogram. Uses a temporary database, never
+the one configured in .env.
+
+Usage (from backend/):
+    python -m benchmarks.bench_journal_store [--entries 20000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+# The store and the routes read the path at import, so it is set first
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ['JOURNAL_DB_PATH'] = os.path.join(_tmpdir.name, 'journal.db')
+
+from app import create_app
+from routes.haunted_journal import JOURNAL_TOKEN_HEADER
+from services.journal_store import JournalStore, journal_store
+
+EMOTIONS = ['fear', 'sadness', 'anger', 'joy', 'contemplation']
+
+def check_store_scoping(store):
+    """Assert entries are only kept and read back under their own token"""
+    assert store.find_journal('not-a-token') is None, "unknown token found a journal"
+    assert not store.append('anonymous', 'fear', 'boo'), "entry without a journal was queued"
+
+    alice = store.find_journal(store.create_journal())
+    bob = store.find_journal(store.create_journal())
+    assert alice and bob and alice != bob, "tokens did not name separate journals"
+
+    for i in range(3):
+        store.append(f'alice {i}', 'fear', 'boo', journal=alice)
+    store.append('bob 0', 'joy', 'boo', journal=bob)
+
+    alice_entries = store.history(alice)['entries']
+    assert [e['entry'] for e in alice_entries] == ['alice 2', 'alice 1', 'alice 0'], alice_entries
+    assert [e['entry'] for e in store.history(bob)['entries']] == ['bob 0'], "journals leaked into each other"
+    assert store.emotion_histogram(alice)['emotions'] == {'fear': 3}, "histogram counted other journals"
+
+    assert store.delete_journal(alice) == 3, "delete did not remove the journal's entries"
+    assert store.history(alice)['entries'] == [], "deleted journal still has entries"
+    assert [e['entry'] for e in store.history(bob)['entries']] == ['bob 0'], "delete touched another journal"
+
+def check_route_scoping(client):
+    """Assert the HTTP routes need the journal's own token"""
+    assert client.get('/api/haunted-journal/history').status_code == 401, "history served without a token"
+    bad = {JOURNAL_TOKEN_HEADER: 'not-a-token'}
+    assert client.get('/api/haunted-journal/history', headers=bad).status_code == 401, "history served to a bad token"
+
+    tokens = [client.post('/api/haunted-journal/journals').get_json()['data']['token'] for _ in range(2)]
+    headers = [{JOURNAL_TOKEN_HEADER: token} for token in tokens]
+
+    client.post('/api/haunted-journal', json={'entry': 'I heard footsteps'})
+    client.post('/api/haunted-journal', json={'entry': 'The door creaked open'}, headers=headers[0])
+
+    entries = [
+        client.get('/api/haunted-journal/history', headers=h).get_json()['data']['entries'] for h in headers
+    ]
+    assert [e['entry'] for e in entries[0]] == ['The door creaked open'], entries[0]
+    assert entries[1] == [], "another token read the journal, or an anonymous entry was stored"
+
+    deleted = client.delete('/api/haunted-journal/journals', headers=headers[0]).get_json()['data']['deleted']
+    assert deleted == 1, deleted
+    assert client.get('/api/haunted-journal/history', headers=headers[0]).status_code == 401, \
+        "deleted journal's token still works"
+
+def time_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    check_store_scoping(JournalStore(os.path.join(_tmpdir.name, 'scoping.db')))
+    check_route_scoping(create_app().test_client())
+    print("Journal token scoping OK")
+
+    store = journal_store
+    journal = store.find_journal(store.create_journal())
+    rng = random.Random(7)
+    start_time = time.time() - args.entries * 60
+    started = time.perf_counter()
+    for i in range(args.entries):
+        record = (f'entry {i}', rng.choice(EMOTIONS), 'boo')
+        # The queue is bounded and drops what doesn't fit, so drain it when full
+        while not store.append(*record, journal=journal, created_at=start_time + i * 60):
+            store.flush()
+    store.flush()
+    elapsed = time.perf_counter() - started
+    assert store.history(journal, limit=1)['entries'][0]['entry'] == f'entry {args.entries - 1}'
+    assert store.emotion_histogram(journal)['total'] == args.entries, "entries went missing"
+    print(f"\nWrote {args.entries:,} entries in {elapsed:.2f}s ({args.entries / elapsed:,.0f}/s)")
+
+    cursor = None
+    pages = {}
+    seen = 0
+    for page_number in range(1, args.entries // 20 + 1):
+        page = store.history(journal, limit=20, cursor=cursor)
+        seen += len(page['entries'])
+        if page_number in (1, 10, 100, 1000) or page['next_cursor'] is None:
+            depth_cursor = cursor
+            pages[page_number] = time_call(
+                lambda: store.history(journal, limit=20, cursor=depth_cursor), args.repeat
+            )
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == args.entries, f"paging returned {seen} of {args.entries} entries"
+
+    for page_number, micros in pages.items():
+        print(f"  history page {page_number:<6} {micros:8.1f}us")
+    print(f"  emotion histogram   {time_call(lambda: store.emotion_histogram(journal), args.repeat):8.1f}us")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+JSON provider benchmark
+
+Serializes the response bodies each blueprint returns, at realistic sizes,
+with Flask's default json-module provider and with FastJSONProvider, checks
+both decode to the same data, and reports the time per response.
+
+Usage (from backend/):
+    python -m benchmarks.bench_json_provider [--repeat 200]
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import time
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from services.datasets import datasets
+from utils.json_provider import FastJSONProvider, orjson
+
+def archived_html(rng, size):
+    """An old-web page of roughly `size` bytes, with some non-ASCII text"""
+    rows = []
+    while sum(len(row) for row in rows) < size:
+        rows.append(
+            f'<tr><td bgcolor="#000000"><font face="Comic Sans MS" color="#00ff00">'
+            f'Visitor #{rng.randint(1, 99999)} — welcome to my homepage! ☠</font></td>'
+            f'<td><a href="/guestbook.html?id={rng.randint(1, 999)}">Sign my guestbook</a></td></tr>\n'
+        )
+    return f'<html><body><table>\n{"".join(rows)}</table></body></html>'
+
+def response_shapes(rng):
+    """(blueprint, body) pairs shaped like each blueprint's real responses"""
+    persona = {'name': 'Victorian Widow', 'era': '1880s', 'gender': 'female', 'tone': 'melancholic'}
+    original = archived_html(rng, 60000)
+    revived = archived_html(rng, 50000).replace('<table>', '<main class="grid">')
+    image = base64.b64encode(os.urandom(300000)).decode('ascii')
+    api = lambda kind: {'type': kind, 'data': {
+        'items': [{'id': i, 'title': f'{kind} item {i}', 'value': rng.random()} for i in range(40)]
+    }}
+
+    return [
+        ('ghost-chat', {'success': True, 'data': {
+            'reply': 'The candles gutter... ' * 12,
+            'timestamp': '2024-10-31T23:59:59.000001',
+            'persona': persona,
+            'session_id': 'a3f1c9d2e4b5',
+        }}),
+        ('haunted-journal', {'success': True, 'data': {
+            'entries': [{
+                'id': i, 'emotion': rng.choice(['fear', 'hope', 'sadness']),
+                'entry': 'I heard footsteps on the stairs again tonight. ' * 4,
+                'haunted_reply': 'The house remembers you. ' * 6,
+                'created_at': f'2024-10-{1 + i % 30:02d}T21:00:00',
+            } for i in range(20)],
+            'next_cursor': '2024-10-01T21:00:00:1',
+        }}),
+        ('reanimator', {'success': True, 'data': {
+            'original_html': original,
+            'revived_html': revived,
+            'archive_date': '2001-09-14',
+            'removed_artifacts': {'scripts': 3, 'banners': 1},
+            'success': True,
+        }}),
+        ('frankenstein-stitch', {'success': True, 'data': {
+            'stitched_output': 'From the depths of the digital graveyard... ' * 8,
+            'api1_data': api('weather'),
+            'api2_data': api('quotes'),
+        }}),
+        ('haunted-locations', {'success': True, 'data': {
+            'locations': list(datasets.current().locations) * 20,
+        }}),
+        ('cursed-image', {'success': True, 'data': {
+            'transformed_image': f'data:image/png;base64,{image}',
+            'description': 'Decades of darkness have seeped into every pixel.',
+            'style': 'vintage_haunted',
+            'prompt': 'a haunted vintage photograph',
+        }}),
+    ]
+
+def time_per_call(func, body, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(body)
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+    print(f"FastJSONProvider using {'orjson ' + orjson.__version__ if orjson else 'the json module'}")
+
+    with app.app_context():
+        for blueprint, body in response_shapes(random.Random(7)):
+            default_bytes = default_provider.response(body).get_data()
+            fast_bytes = fast_provider.response(body).get_data()
+            assert json.loads(default_bytes) == json.loads(fast_bytes), blueprint
+
+            default_time = time_per_call(default_provider.response, body, args.repeat)
+            fast_time = time_per_call(fast_provider.response, body, args.repeat)
+            print(f"  {blueprint:<20} {len(fast_bytes) / 1024:7.1f}KB  default={default_time * 1e6:8.1f}us  "
+                  f"fast={fast_time * 1e6:7.1f}us  ({default_time / fast_time:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Language model backend benchmark
+
+Runs the AI service against the bundled fake server to compare a pooled
+session with one-off requests, measure throughput under concurrency limits,
+and check that replies fall back to templates quickly when the model is slow.
+The circuit breaker's open -> half-open -> closed cycle is checked first.
+
+Usage (from backend/):
+    python -m benchmarks.bench_llm_backend [--requests 200] [--latency 20]
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.fake_llm_server import start_server
+from services.ai_service import AIService
+from services.llm_backend import CircuitBreaker, LLMBackendError, OpenAICompatibleBackend
+
+MESSAGES = [
+    {'role': 'system', 'content': 'You are a spooky ghost.'},
+    {'role': 'user', 'content': 'Who are you?'},
+]
+
+def unpooled_call(base_url):
+    response = requests.post(
+        base_url + '/chat/completions',
+        json={'model': 'fake', 'messages': MESSAGES, 'max_tokens': 60},
+        timeout=5,
+    )
+    response.raise_for_status()
+    return response.json()['choices'][0]['message']['content']
+
+def check_circuit_breaker(server, cooldown=0.1):
+    """Assert the breaker opens, admits one trial after the cooldown and closes again"""
+    breaker = CircuitBreaker(threshold=3, cooldown=cooldown)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow() and not breaker.is_open, "opened before the threshold"
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow(), "did not open at the threshold"
+
+    time.sleep(cooldown)
+    assert not breaker.is_open, "still open after the cooldown"
+    assert breaker.allow(), "half-open circuit refused the trial"
+    assert not breaker.allow(), "half-open circuit admitted a second caller"
+    breaker.record_failure()
+    assert breaker.is_open, "failed trial did not reopen the circuit"
+
+    time.sleep(cooldown)
+    assert breaker.allow(), "reopened circuit refused the next trial"
+    breaker.record_success()
+    assert not breaker.is_open and breaker.allow() and breaker.allow(), "successful trial did not close it"
+
+    # Same cycle through a backend talking to the fake server
+    server.latency = 1.0
+    backend = OpenAICompatibleBackend(
+        server.base_url, timeout=0.1, max_retries=0, breaker_threshold=2, breaker_cooldown=cooldown
+    )
+    for _ in range(2):
+        try:
+            backend.complete(MESSAGES, max_tokens=20)
+        except LLMBackendError:
+            pass
+        else:
+            raise AssertionError("slow model call did not time out")
+    assert not backend.available, "backend still available with the circuit open"
+
+    server.latency = 0
+    time.sleep(cooldown)
+    assert backend.available, "backend not available after the cooldown"
+    assert backend.complete(MESSAGES, max_tokens=20), "trial call returned nothing"
+    assert not backend.breaker.is_open and backend.available, "recovered backend kept the circuit open"
+    print("Circuit breaker: open -> half-open -> closed OK")
+
+def run(label, func, count, concurrency=1):
+    latencies = []
+
+    def timed(_):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(count)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"  {label:<34} {count / elapsed:8.1f} req/s  "
+          f"p50={statistics.median(latencies) * 1000:7.1f}ms  p95={p95 * 1000:7.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=20, help='fake model latency in ms')
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency / 1000)
+    check_circuit_breaker(server)
+    server.latency = args.latency / 1000
+    backend = OpenAICompatibleBackend(server.base_url, max_concurrency=args.concurrency, queue_timeout=5)
+
+    print(f"Fake model latency {args.latency:.0f}ms, {args.requests} requests")
+    run('requests.post per call', lambda: unpooled_call(server.base_url), args.requests)
+    run('pooled session', lambda: backend.complete(MESSAGES, max_tokens=60), args.requests)
+    run(f'pooled session, {args.concurrency} threads',
+        lambda: backend.complete(MESSAGES, max_tokens=60), args.requests, args.concurrency)
+
+    # Slow model: replies must come back from templates within the timeout
+    server.latency = 2.0
+    slow_backend = OpenAICompatibleBackend(
+        server.base_url, timeout=0.25, max_retries=0, breaker_threshold=3, breaker_cooldown=60
+    )
+    service = AIService(backend=slow_backend)
+    print("\nFake model latency 2000ms, timeout 250ms, breaker after 3 failures")
+    run('ghost chat with fallback', lambda: service.generate_ghost_chat_reply('hello', 'shadow_child'), 20)
+    print(f"  breaker open: {slow_backend.breaker.is_open}")
+
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
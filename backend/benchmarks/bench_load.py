@@ -0,0 +1,315 @@
+"""
+End-to-end load benchmark for every blueprint
+
+Drives each route through create_app() with concurrent clients and realistic
+payloads (uploaded photos of several sizes, archived pages from a few KB to
+a quarter MB), with the Wayback Machine and public APIs stubbed in-process
+and the language model either off (template replies) or the bundled fake
+server. Reports throughput, p50/p95/p99 latency, response size and process
+RSS per scenario.
+
+Save a run as a baseline and compare later runs against it; the compare
+exits with status 1 when a scenario's throughput drops or its p95 latency
+rises by more than --threshold percent, so it can gate a deploy.
+
+Usage (from backend/):
+    python -m benchmarks.bench_load [--requests 200] [--concurrency 8] [--only reanimator]
+    python -m benchmarks.bench_load --save baseline.json
+    python -m benchmarks.bench_load --compare baseline.json [--threshold 15]
+    python -m benchmarks.bench_load --llm-latency 50    # fake model instead of templates
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.load_fixtures import IMAGE_SIZES, PAGE_SIZES, StubUpstreams, photo_data_url
+
+JOURNAL_ENTRIES = [
+    "I heard footsteps on the stairs again tonight and nobody else is home.",
+    "Today was wonderful, I finally finished the painting I started last spring.",
+    "I miss my grandmother so much, the house feels empty without her.",
+    "I am so angry that they cancelled the trip without telling me.",
+    "I don't know what to do about the job offer, everything feels uncertain.",
+    "Maybe tomorrow will be better, I have a good feeling about the interview.",
+]
+
+CHAT_MESSAGES = [
+    "Who are you?", "Tell me a joke", "Is this house haunted?", "What happened to you?",
+    "Are you trapped here?", "Hello spirit", "Why are you so cold?", "Can you move objects?",
+]
+
+class Scenario:
+    """One request shape, sent repeatedly"""
+
+    def __init__(self, name, method, path, body=None, headers=None):
+        """
+        Args:
+            name (str): Scenario name, stable across runs for comparisons
+            method (str): HTTP method
+            path (str): Path and query string
+            body (callable): Request number to JSON body, or None
+            headers (dict): Extra request headers
+        """
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.headers = headers or {}
+
+def build_scenarios(journal_token):
+    """
+    Every route with realistic request bodies
+
+    Args:
+        journal_token (str): Token of the journal that entries are stored in
+    """
+    gzip_headers = {'Accept-Encoding': 'gzip'}
+    journal_headers = {'X-Journal-Token': journal_token, 'Accept-Encoding': 'gzip'}
+    sse_headers = {'Accept': 'text/event-stream', 'Accept-Encoding': 'gzip'}
+    chat = lambda i: {'message': CHAT_MESSAGES[i % len(CHAT_MESSAGES)], 'persona_id': 'weeping_bride'}
+    story = lambda i: {'location_id': str(i % 50 + 1)}
+
+    scenarios = [
+        Scenario('ghost-chat', 'POST', '/api/ghost-chat', chat, gzip_headers),
+        Scenario('ghost-chat/stream', 'POST', '/api/ghost-chat', chat, sse_headers),
+        Scenario('ghost-personas', 'GET', '/api/ghost-personas', headers=gzip_headers),
+        Scenario('haunted-journal', 'POST', '/api/haunted-journal',
+                 lambda i: {'entry': JOURNAL_ENTRIES[i % len(JOURNAL_ENTRIES)]}, journal_headers),
+        Scenario('haunted-journal/batch-50', 'POST', '/api/haunted-journal/batch',
+                 lambda i: {'entries': [JOURNAL_ENTRIES[(i + n) % len(JOURNAL_ENTRIES)] for n in range(50)]},
+                 journal_headers),
+        Scenario('haunted-journal/history', 'GET', '/api/haunted-journal/history?limit=50',
+                 headers=journal_headers),
+        Scenario('frankenstein-stitch', 'POST', '/api/frankenstein-stitch',
+                 lambda i: {'api1': ('weather', 'jokes', 'quotes')[i % 3], 'api2': ('advice', 'catfacts')[i % 2]}),
+        Scenario('haunted-locations', 'GET', '/api/haunted-locations', headers=gzip_headers),
+        Scenario('haunted-locations/bbox', 'GET', '/api/haunted-locations?bbox=-130,20,-60,55',
+                 headers=gzip_headers),
+        Scenario('haunted-locations/near', 'GET', '/api/haunted-locations?near=40.7,-74.0&radius=2000'),
+        Scenario('haunted-locations/zoom-3', 'GET', '/api/haunted-locations?zoom=3&bbox=-180,-85,180,85'),
+        Scenario('ghost-story', 'POST', '/api/ghost-story', story),
+        Scenario('ghost-story/stream', 'POST', '/api/ghost-story', story, sse_headers),
+        Scenario('cursed-image/styles', 'GET', '/api/cursed-image/styles', headers=gzip_headers),
+    ]
+
+    for size in PAGE_SIZES:
+        scenarios.append(Scenario(
+            f'reanimator/{size}', 'POST', '/api/reanimator',
+            lambda i, size=size: {'url': f'http://example.com/{size}'}, gzip_headers
+        ))
+        scenarios.append(Scenario(
+            f'reanimator/{size}/fragment', 'POST', '/api/reanimator',
+            lambda i, size=size: {'url': f'http://example.com/{size}', 'mode': 'fragment',
+                                  'include_original': False},
+            gzip_headers
+        ))
+
+    styles = ('horror', 'vintage_horror', 'glitch_nightmare', 'ethereal_ghost')
+    for size, (width, height) in IMAGE_SIZES.items():
+        image = photo_data_url(width, height, seed=width)
+        scenarios.append(Scenario(
+            f'cursed-image/{size}', 'POST', '/api/cursed-image/ai-transform',
+            lambda i, image=image: {'image': image, 'style': styles[i % len(styles)], 'prompt': 'a haunted portrait'}
+        ))
+
+    return scenarios
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an ascending list"""
+    return sorted_values[max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)]
+
+def rss_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        # No procfs (macOS): fall back to the peak, reported in bytes there
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 20
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+def run_scenario(app, scenario, count, concurrency, warmup):
+    """
+    Send a scenario's requests from concurrent clients
+
+    Returns:
+        dict: requests, errors, throughput, latency percentiles in ms,
+            mean response bytes and RSS in MB
+    """
+    local = threading.local()
+
+    def send(number):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        body = scenario.body(number) if scenario.body else None
+
+        start = time.perf_counter()
+        response = client.open(scenario.path, method=scenario.method, json=body, headers=scenario.headers)
+        # Reading the body runs streamed responses to completion
+        size = len(response.get_data())
+        elapsed = time.perf_counter() - start
+        response.close()
+        return elapsed, response.status_code, size
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        warmup_results = list(executor.map(send, range(warmup)))
+        start = time.perf_counter()
+        results = list(executor.map(send, range(warmup, warmup + count)))
+        wall = time.perf_counter() - start
+
+    failures = [status for _, status, _ in warmup_results + results if status >= 400]
+    latencies = sorted(elapsed * 1000 for elapsed, _, _ in results)
+    return {
+        'requests': count,
+        'errors': len(failures),
+        'error_statuses': sorted(set(failures)),
+        'throughput': count / wall,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'mean_bytes': sum(size for _, _, size in results) / count,
+        'rss_mb': rss_mb(),
+    }
+
+def print_results(results):
+    print(f"{'scenario':<30} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'KB':>8} {'RSS MB':>8}  errors")
+    for name, result in results.items():
+        errors = f"{result['errors']} {result['error_statuses']}" if result['errors'] else '0'
+        print(f"{name:<30} {result['throughput']:9.1f} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} "
+              f"{result['p99_ms']:9.2f} {result['mean_bytes'] / 1024:8.1f} {result['rss_mb']:8.1f}  {errors}")
+
+def compare(baseline, results, threshold, min_delta_ms):
+    """
+    Print changes against a baseline run
+
+    Latency changes smaller than min_delta_ms are ignored, so sub-millisecond
+    routes don't fail the compare on timer noise
+
+    Returns:
+        list: Names of scenarios that regressed
+    """
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('saved_at', 'baseline')} "
+          f"(threshold {threshold:.0f}%, latency changes under {min_delta_ms}ms ignored)")
+    print(f"{'scenario':<30} {'req/s':>16} {'p95 ms':>20} {'p99 ms':>20}")
+
+    for name, result in results.items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            print(f"{name:<30} (new)")
+            continue
+
+        throughput_change = (result['throughput'] / before['throughput'] - 1) * 100
+        p95_change = (result['p95_ms'] / before['p95_ms'] - 1) * 100 if before['p95_ms'] else 0.0
+        p99_change = (result['p99_ms'] / before['p99_ms'] - 1) * 100 if before['p99_ms'] else 0.0
+        regressed = (
+            throughput_change < -threshold
+            or (p95_change > threshold and result['p95_ms'] - before['p95_ms'] >= min_delta_ms)
+            or result['errors'] > before['errors']
+        )
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<30} {result['throughput']:9.1f} {throughput_change:+5.0f}%  "
+              f"{result['p95_ms']:12.2f} {p95_change:+5.0f}%  {result['p99_ms']:12.2f} {p99_change:+5.0f}%"
+              f"{'  REGRESSED' if regressed else ''}")
+
+    for name in baseline['scenarios']:
+        if name not in results:
+            print(f"{name:<30} (not run)")
+    return regressions
+
+def configure_environment(args, workdir):
+    """Settings for a reproducible run; must happen before the app is imported"""
+    os.environ['JOURNAL_DB_PATH'] = os.path.join(workdir, 'journal.db')
+    os.environ['DATASET_RELOAD_INTERVAL'] = '0'
+    # Upstreams are stubbed, so neither politeness delays nor fake typing apply
+    os.environ['ARCHIVE_RATE_LIMIT'] = '0'
+    os.environ['STREAM_TYPEWRITER_DELAY'] = '0'
+    os.environ['WEATHER_API_KEY'] = 'stub'
+
+    if args.llm_latency is None:
+        os.environ['LLM_BACKEND'] = 'none'
+        return None
+
+    from benchmarks.fake_llm_server import start_server
+    server = start_server(latency=args.llm_latency / 1000, token_latency=0)
+    os.environ['LLM_BACKEND'] = 'openai'
+    os.environ['LLM_BASE_URL'] = server.base_url
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--warmup', type=int, default=10, help='unmeasured requests per scenario')
+    parser.add_argument('--only', action='append', default=[], help='run scenarios whose name contains this')
+    parser.add_argument('--upstream-latency', type=float, default=0, help='stubbed Wayback/API delay in ms')
+    parser.add_argument('--llm-latency', type=float, default=None,
+                        help='use the fake model server with this delay in ms (default: templates)')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file from --save')
+    parser.add_argument('--threshold', type=float, default=15, help='allowed regression in percent')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='smallest p95 change that counts')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-load-')
+    server = configure_environment(args, workdir)
+
+    from app import create_app
+    app = create_app()
+
+    journal_token = app.test_client().post('/api/haunted-journal/journals').get_json()['data']['token']
+    scenarios = [
+        s for s in build_scenarios(journal_token) if not args.only or any(part in s.name for part in args.only)
+    ]
+    print(f"{len(scenarios)} scenarios, {args.requests} requests each, {args.concurrency} clients, "
+          f"model: {'fake server %.0fms' % args.llm_latency if server else 'templates'}\n")
+
+    results = {}
+    with StubUpstreams(latency=args.upstream_latency / 1000):
+        for scenario in scenarios:
+            results[scenario.name] = run_scenario(app, scenario, args.requests, args.concurrency, args.warmup)
+            print(f"  {scenario.name}: {results[scenario.name]['throughput']:.1f} req/s", flush=True)
+
+    print()
+    print_results(results)
+    print(f"\npeak RSS {peak_rss_mb():.1f}MB")
+
+    if server is not None:
+        server.shutdown()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'args': {key: value for key, value in vars(args).items() if key not in ('save', 'compare')},
+                },
+                'scenarios': results,
+            }, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} scenario(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Location index benchmark and correctness check
+
+Builds a synthetic map of user-submitted haunts clustered around cities,
+checks every index query against a linear scan, and times viewport, radius
+and k-nearest queries both ways. Then reports marker clustering cost and the
+markers returned for a screen-sized viewport at several zoom levels.
+
+Usage (from backend/):
+    python -m benchmarks.bench_location_index [--locations 50000] [--queries 500]
+"""
+import argparse
+import random
+import time
+
+from services.location_clusters import ClusterIndex
+from services.location_index import LocationIndex, haversine_km
+
+def synthetic_locations(count, seed=13):
+    """Locations scattered around a few hundred random 'cities'"""
+    rng = random.Random(seed)
+    cities = [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(300)]
+    locations = []
+    for index in range(count):
+        lat, lng = rng.choice(cities)
+        lat = max(-90.0, min(90.0, lat + rng.gauss(0, 1.5)))
+        lng = (lng + rng.gauss(0, 1.5) + 180) % 360 - 180
+        locations.append({'id': str(index), 'name': f'Haunt {index}', 'lat': lat, 'lng': lng, 'description': ''})
+    return locations
+
+def random_viewports(rng, count):
+    """City-sized to country-sized viewports, some crossing the antimeridian"""
+    viewports = []
+    for _ in range(count):
+        width, height = rng.uniform(0.5, 20), rng.uniform(0.5, 10)
+        south = rng.uniform(-90, 90 - height)
+        west = rng.uniform(-180, 180)
+        east = west + width
+        if east > 180:
+            east -= 360
+        viewports.append((west, south, east, south + height))
+    return viewports
+
+def linear_bbox(locations, west, south, east, north):
+    if west <= east:
+        return [l for l in locations if south <= l['lat'] <= north and west <= l['lng'] <= east]
+    return [l for l in locations if south <= l['lat'] <= north and (l['lng'] >= west or l['lng'] <= east)]
+
+def linear_near(locations, lat, lng, radius):
+    matches = [(haversine_km(lat, lng, l['lat'], l['lng']), l) for l in locations]
+    return sorted((match for match in matches if match[0] <= radius), key=lambda match: match[0])
+
+def linear_nearest(locations, lat, lng, k):
+    return sorted(((haversine_km(lat, lng, l['lat'], l['lng']), l) for l in locations), key=lambda m: m[0])[:k]
+
+def screen_viewport(lat, lng, zoom, width=1280, height=800):
+    """Approximate bbox of a screen centred on a point at a zoom level"""
+    degrees_per_px = 360 / (256 * 2 ** zoom)
+    half_width, half_height = width / 2 * degrees_per_px, height / 2 * degrees_per_px
+    west = (lng - half_width + 180) % 360 - 180 if half_width < 180 else -180.0
+    east = (lng + half_width + 180) % 360 - 180 if half_width < 180 else 180.0
+    return west, max(-90.0, lat - half_height), east, min(90.0, lat + half_height)
+
+def time_per_query(func, queries):
+    start = time.perf_counter()
+    for query in queries:
+        func(*query)
+    return (time.perf_counter() - start) / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--locations', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--radius', type=float, default=50, help='radius query size in km')
+    parser.add_argument('--k', type=int, default=10, help='neighbours for k-nearest queries')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    locations = synthetic_locations(args.locations)
+
+    start = time.perf_counter()
+    index = LocationIndex(locations)
+    print(f"{args.locations} locations, index built in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    viewports = random_viewports(rng, args.queries)
+    points = [(l['lat'], l['lng']) for l in rng.sample(locations, args.queries)]
+    radius_queries = [(lat, lng, args.radius) for lat, lng in points]
+    nearest_queries = [(lat, lng, args.k) for lat, lng in points]
+
+    # Spot-check results against the linear scan
+    checked = min(50, args.queries)
+    ids = lambda results: sorted(l['id'] for l in results)
+    distances = lambda matches: [round(d, 6) for d, _ in matches]
+    for viewport in viewports[:checked]:
+        assert ids(index.within_bbox(*viewport)) == ids(linear_bbox(locations, *viewport)), viewport
+    for query in radius_queries[:checked]:
+        assert distances(index.near(*query)) == distances(linear_near(locations, *query)), query
+    for query in nearest_queries[:checked]:
+        assert distances(index.nearest(*query)) == distances(linear_nearest(locations, *query)), query
+    print(f"  {checked} queries of each kind match the linear scan")
+
+    timings = [
+        ('bbox', lambda *q: linear_bbox(locations, *q), index.within_bbox, viewports),
+        (f'radius {args.radius:.0f}km', lambda *q: linear_near(locations, *q), index.near, radius_queries),
+        (f'{args.k} nearest', lambda *q: linear_nearest(locations, *q), index.nearest, nearest_queries),
+    ]
+
+    # The linear scans are slow, so time them on fewer queries
+    linear_sample = max(1, args.queries // 10)
+    for label, linear, indexed, queries in timings:
+        linear_time = time_per_query(linear, queries[:linear_sample])
+        indexed_time = time_per_query(indexed, queries)
+        print(f"  {label:<14} linear={linear_time * 1000:8.2f}ms  indexed={indexed_time * 1000:7.3f}ms  "
+              f"({linear_time / indexed_time:,.0f}x)")
+
+    start = time.perf_counter()
+    clusters = ClusterIndex(index, max_markers=len(locations))
+    print(f"\nClusters for {clusters.clustered_zooms} zoom levels built in "
+          f"{(time.perf_counter() - start) * 1000:.1f}ms")
+
+    # Every location is counted exactly once at every zoom, including those
+    # on the map's edges
+    edges = [
+        {'id': f'edge{index}', 'name': '', 'lat': lat, 'lng': lng, 'description': ''}
+        for index, (lat, lng) in enumerate(
+            (lat, lng) for lat in (-90.0, -89.9, 89.9, 90.0) for lng in (-180.0, -179.9, 179.9, 180.0) for _ in range(5)
+        )
+    ]
+    edge_clusters = ClusterIndex(LocationIndex(locations + edges), max_markers=len(locations) + len(edges))
+    for zoom in range(edge_clusters.clustered_zooms + 1):
+        markers = edge_clusters.clusters(zoom)
+        total = sum(cluster['count'] for cluster in markers['clusters']) + len(markers['locations'])
+        assert total == len(locations) + len(edges), (zoom, total)
+    print(f"  totals conserved at zoom 0-{edge_clusters.clustered_zooms}")
+
+    # Markers per 1280x800 screen: clustering keeps them bounded at every zoom
+    for zoom in (2, 5, 8, 11, 14):
+        screens = [screen_viewport(lat, lng, zoom) for lat, lng in points[:100]]
+        start = time.perf_counter()
+        results = [clusters.clusters(zoom, *screen) for screen in screens]
+        elapsed = (time.perf_counter() - start) / len(screens)
+        markers = max(len(r['clusters']) + len(r['locations']) for r in results)
+        raw = max(len(index.within_bbox(*screen)) for screen in screens)
+        print(f"  zoom {zoom:<3} max markers={markers:<5} max raw locations={raw:<7} {elapsed * 1000:7.3f}ms/query")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions API
+
+Answers POST /v1/chat/completions with canned spooky text after a configurable
+delay, so the AI service can be exercised and benchmarked without a real model.
+Requests with "stream": true get the reply word by word as server-sent events,
+and POST /v1/chat/completions/batch answers several requests in one round trip
+(the protocol OpenAICompatibleBackend uses when LLM_BATCH_PATH is set).
+
+Usage (from backend/):
+    python -m benchmarks.fake_llm_server [--port 8765] [--latency 200] [--token-latency 30]
+
+Then start the app with:
+    LLM_BACKEND=openai LLM_BASE_URL=http://127.0.0.1:8765/v1 python app.py
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETIONS_PATH = '/v1/chat/completions'
+BATCH_PATH = '/v1/chat/completions/batch'
+
+SENTENCES = [
+    "The candles gutter though no wind stirs the room.",
+    "Something behind the wallpaper is breathing in time with you.",
+    "I have waited a hundred winters for someone to ask.",
+    "The floorboards remember every footstep that crossed them.",
+    "Do not turn around; I prefer you cannot see my face.",
+    "The clock in the hall stopped at the hour I died.",
+    "Your reflection blinked a moment after you did.",
+    "Cold fingers trace the words you have written here.",
+]
+
+def fake_reply(messages, max_tokens, rng=random):
+    """Build a plausible reply for the kind of prompt that was sent"""
+    system_prompt = ' '.join(m.get('content', '') for m in messages if m.get('role') == 'system')
+    words = max(8, min(max_tokens, 60))
+    text = ''
+    while len(text.split()) < words:
+        text += rng.choice(SENTENCES) + ' '
+    text = text.strip()
+
+    if '"emotion"' in system_prompt:
+        emotion = rng.choice(['sadness', 'fear', 'hope', 'contemplation'])
+        return json.dumps({'emotion': emotion, 'haunted_reply': text})
+    if 'HTML' in system_prompt:
+        return f"<h1>Reanimated</h1>\n<p>{text}</p>"
+    return text
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients that pool connections actually reuse them
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every reply on a reused connection
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+
+    def _send_stream(self, content, model):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        words = content.split(' ')
+        for index, word in enumerate(words):
+            if index and self.server.token_latency:
+                time.sleep(self.server.token_latency)
+            delta = {'content': word if index == 0 else ' ' + word}
+            event = {'object': 'chat.completion.chunk', 'model': model,
+                     'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]}
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request_body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'Invalid JSON'}})
+            return
+
+        if self.path == BATCH_PATH:
+            self._send_batch(request_body)
+            return
+
+        if self.path != COMPLETIONS_PATH:
+            self._send_json(404, {'error': {'message': 'Not found'}})
+            return
+
+        server = self.server
+        with server.stats_lock:
+            server.requests_served += 1
+
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if server.error_rate and random.random() < server.error_rate:
+            self._send_json(503, {'error': {'message': 'The spirits are busy'}})
+            return
+
+        content = fake_reply(request_body.get('messages', []), int(request_body.get('max_tokens', 256)))
+        if request_body.get('stream'):
+            self._send_stream(content, request_body.get('model', 'fake'))
+            return
+
+        self._send_json(200, self._completion(request_body, content))
+
+    def _completion(self, request_body, content):
+        return {
+            'id': f'fake-{self.server.requests_served}',
+            'object': 'chat.completion',
+            'model': request_body.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+        }
+
+    def _send_batch(self, request_body):
+        server = self.server
+        items = request_body.get('requests') or []
+        with server.stats_lock:
+            server.requests_served += 1
+            server.batch_items += len(items)
+
+        # A batch costs one round trip plus a little per item, like a model
+        # server decoding several sequences together
+        delay = server.latency + random.uniform(0, server.jitter) + server.batch_item_latency * len(items)
+        if delay > 0:
+            time.sleep(delay)
+
+        responses = []
+        for item in items:
+            if server.error_rate and random.random() < server.error_rate:
+                responses.append({'error': {'message': 'The spirits are busy'}})
+                continue
+            content = fake_reply(item.get('messages', []), int(item.get('max_tokens', 256)))
+            responses.append(self._completion(item, content))
+
+        self._send_json(200, {'responses': responses})
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.2, jitter=0.0, error_rate=0.0, token_latency=0.03,
+                 batch_item_latency=0.002, verbose=False):
+        super().__init__(address, FakeLLMHandler)
+        self.latency = latency
+        self.token_latency = token_latency
+        self.batch_item_latency = batch_item_latency
+        self.batch_items = 0
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.verbose = verbose
+        self.requests_served = 0
+        self.stats_lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients that time out on purpose hang up before the reply is written
+        if isinstance(sys.exc_info()[1], ConnectionError) and not self.verbose:
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+def start_server(host='127.0.0.1', port=0, **options):
+    """
+    Run a fake server on a background thread
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind (0 picks a free one)
+        **options: latency, jitter, token_latency, batch_item_latency (seconds),
+            error_rate, verbose
+
+    Returns:
+        FakeLLMServer: Running server; call shutdown() when done
+    """
+    server = FakeLLMServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=200, help='response delay in ms')
+    parser.add_argument('--jitter', type=float, default=0, help='extra random delay in ms')
+    parser.add_argument('--token-latency', type=float, default=30, help='delay between streamed words in ms')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with 503')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        (args.host, args.port),
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        token_latency=args.token_latency / 1000,
+        verbose=args.verbose,
+    )
+    print(f"Fake LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Payload fixtures and stubbed upstreams for the load benchmark
+
+Fixtures are generated from fixed seeds, so every run sends identical bytes:
+uploaded photos at phone-camera sizes, and archived pages in the late-90s
+style the reanimator sees, including the Wayback toolbar, scripts and
+banners the cleaner strips. StubUpstreams answers the Wayback Machine and
+the public APIs in-process after a configurable delay, so timings measure
+this app rather than the internet.
+"""
+import base64
+import io
+import json
+import random
+import time
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from PIL import Image, ImageDraw, ImageFilter
+
+# Uploaded image sizes, from a thumbnail to a full phone photo
+IMAGE_SIZES = {
+    'small': (320, 240),
+    'medium': (1280, 960),
+    'large': (3000, 2250),
+}
+
+# Archived page sizes in bytes, from a personal homepage to a long web ring index
+PAGE_SIZES = {
+    'small': 8 * 1024,
+    'medium': 64 * 1024,
+    'large': 256 * 1024,
+}
+
+# Wayback capture timestamp of every stubbed snapshot
+SNAPSHOT_TIMESTAMP = '20011031120000'
+
+def photo_data_url(width, height, seed=0):
+    """
+    A photo-like JPEG as the frontend uploads it
+
+    Returns:
+        str: data:image/jpeg;base64 URL
+    """
+    rng = random.Random(seed)
+    red = Image.linear_gradient('L').resize((width, height))
+    green = red.rotate(90).resize((width, height))
+    blue = Image.effect_noise((width, height), 64)
+    image = Image.merge('RGB', (red, green, blue))
+
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        radius = rng.randrange(max(2, width // 40), max(3, width // 6))
+        fill = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=fill)
+    image = image.filter(ImageFilter.GaussianBlur(2))
+
+    # Sensor noise, so the photo compresses like a real one
+    noise = Image.merge('RGB', [Image.effect_noise((width, height), 24)] * 3)
+    image = Image.blend(image, noise, 0.15)
+
+    buffered = io.BytesIO()
+    image.save(buffered, format='JPEG', quality=85)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffered.getvalue()).decode('ascii')
+
+def archived_page(size, seed=0, site='http://example.com/'):
+    """
+    A late-90s homepage as served by the Wayback Machine, about `size` bytes
+
+    Returns:
+        str: HTML including Wayback toolbar, scripts and banner markup
+    """
+    rng = random.Random(seed)
+    prefix = f'https://web.archive.org/web/{SNAPSHOT_TIMESTAMP}/'
+    words = ('haunted', 'mansion', 'webring', 'midi', 'guestbook', 'spooky', 'tales', 'visitor',
+             'cool', 'links', 'under', 'construction', 'ghost', 'lantern', 'crypt', 'midnight')
+
+    head = (
+        '<html><head><title>~*~ My Haunted Homepage ~*~</title>\n'
+        '<script src="//web-static.archive.org/_static/js/bundle-playback.js"></script>\n'
+        '<script>__wm.init("https://web.archive.org/web");</script>\n'
+        '<link rel="stylesheet" href="https://web-static.archive.org/_static/css/banner-styles.css">\n'
+        '</head>\n<body bgcolor="#000000" text="#00ff00" link="#ff0000">\n'
+        '<div id="wm-ipp-base"><div id="wm-ipp">Wayback Machine toolbar</div></div>\n'
+        '<div class="wayback-banner">This page was archived</div>\n'
+        '<center><img src="/web/20011031120000im_/http://example.com/title.gif">'
+        '<marquee>Welcome to my page!!!</marquee></center>\n'
+    )
+    parts = [head]
+    length = len(head)
+    section = 0
+    while length < size:
+        section += 1
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(40, 120)))
+        block = (
+            f'<table border="1" width="80%" cellpadding="4"><tr>'
+            f'<td bgcolor="#330033"><font face="Comic Sans MS" size="4">Section {section}</font></td></tr>'
+            f'<tr><td><font face="Times New Roman">{text}</font>'
+            f'<br><img src="/web/{SNAPSHOT_TIMESTAMP}im_/{site}img/skull{section % 7}.gif" width="32" height="32">'
+            f'<a href="{prefix}{site}page{section}.html">Read more</a></td></tr></table>\n'
+        )
+        parts.append(block)
+        length += len(block)
+    parts.append('<p><a href="guestbook.html">Sign my guestbook!</a></p></body></html>\n')
+    return ''.join(parts)
+
+def _response(url, body, content_type='application/json', status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = url
+    response.headers['Content-Type'] = content_type
+    response._content = body if isinstance(body, bytes) else body.encode('utf-8')
+    response.encoding = 'utf-8'
+    return response
+
+# Canned public API answers, keyed by host
+API_REPLIES = {
+    'api.openweathermap.org': {
+        'name': 'London', 'main': {'temp': 7.5, 'humidity': 93}, 'weather': [{'description': 'thick fog'}]
+    },
+    'v2.jokeapi.dev': {
+        'type': 'twopart', 'category': 'Spooky', 'setup': 'Why did the ghost go to the party?',
+        'delivery': 'For the boos.'
+    },
+    'zenquotes.io': [{'q': 'We are all haunted by something.', 'a': 'Unknown'}],
+    'api.adviceslip.com': {'slip': {'id': 13, 'advice': 'Never read the book aloud.'}},
+    'catfact.ninja': {'fact': 'Cats can see spirits in the dark.', 'length': 33},
+}
+
+class StubUpstreams:
+    """
+    Stand-in for the Wayback Machine and public APIs, patched over requests.get
+
+    Archived pages are chosen by the requested site's path, e.g.
+    http://example.com/medium serves the 'medium' page
+    """
+
+    def __init__(self, latency=0.0, pages=None):
+        """
+        Args:
+            latency (float): Seconds every upstream call waits before answering
+            pages (dict): Page name to archived HTML; defaults to one page per PAGE_SIZES entry
+        """
+        self.latency = latency
+        self.pages = pages or {name: archived_page(size, seed=i) for i, (name, size) in enumerate(PAGE_SIZES.items())}
+        self.calls = 0
+        self._patch = mock.patch.object(requests, 'get', self.get)
+
+    def __enter__(self):
+        self._patch.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._patch.stop()
+
+    def get(self, url, timeout=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        parsed = urlparse(url)
+        if parsed.hostname == 'archive.org' and parsed.path == '/wayback/available':
+            site = parse_qs(parsed.query)['url'][0]
+            return _response(url, json.dumps({'archived_snapshots': {'closest': {
+                'available': True,
+                'url': f'https://web.archive.org/web/{SNAPSHOT_TIMESTAMP}/{site}',
+                'timestamp': SNAPSHOT_TIMESTAMP,
+                'status': '200',
+            }}}))
+        if parsed.hostname == 'web.archive.org':
+            page = self.pages.get(urlparse(url.split(f'{SNAPSHOT_TIMESTAMP}/', 1)[1]).path.strip('/'))
+            if page is None:
+                return _response(url, 'Not found', 'text/html', 404)
+            return _response(url, page, 'text/html')
+        if parsed.hostname in API_REPLIES:
+            return _response(url, json.dumps(API_REPLIES[parsed.hostname]))
+
+        raise requests.exceptions.ConnectionError(f"No stubbed upstream for {url}")
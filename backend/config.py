@@ -3,7 +3,116 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Relative data paths in the settings below are resolved from this directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'haunted-nexus-secret-key'
+    # Development server only; production runs through gunicorn (see gunicorn.conf.py)
+    DEBUG = os.environ.get('FLASK_DEBUG', 'false').lower() in ('1', 'true', 'yes')
+    PORT = int(os.environ.get('PORT', 5000))
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
     WEATHER_API_KEY = os.environ.get('WEATHER_API_KEY')
+
+    # Haunted locations (.json or .csv) and ghost personas (.json), reloaded
+    # when the files change; checked at most every DATASET_RELOAD_INTERVAL
+    # seconds, 0 disables reloading
+    LOCATIONS_DATA_PATH = os.path.join(
+        BASE_DIR, os.environ.get('LOCATIONS_DATA_PATH') or os.path.join('data', 'haunted_locations.json')
+    )
+    PERSONAS_DATA_PATH = os.path.join(
+        BASE_DIR, os.environ.get('PERSONAS_DATA_PATH') or os.path.join('data', 'ghost_personas.json')
+    )
+    DATASET_RELOAD_INTERVAL = float(os.environ.get('DATASET_RELOAD_INTERVAL', 2))
+
+    # Seconds clients may cache catalog responses (locations, personas, styles)
+    CATALOG_MAX_AGE = int(os.environ.get('CATALOG_MAX_AGE', 300))
+
+    # Response compression; turn off when a proxy in front already compresses
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+
+    # Request timing and the Prometheus /metrics endpoint
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+    # Shared secret for the /api/admin profiling endpoints; empty disables them
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+    # Reanimator background jobs
+    REANIMATOR_JOB_WORKERS = int(os.environ.get('REANIMATOR_JOB_WORKERS', 4))
+    REANIMATOR_JOB_TTL = int(os.environ.get('REANIMATOR_JOB_TTL', 600))
+    REANIMATOR_JOB_MAX_PENDING = int(os.environ.get('REANIMATOR_JOB_MAX_PENDING', 100))
+    REANIMATOR_JOB_MAX_RESULTS = int(os.environ.get('REANIMATOR_JOB_MAX_RESULTS', 500))
+
+    # Reanimator batch requests
+    REANIMATOR_BATCH_MAX_URLS = int(os.environ.get('REANIMATOR_BATCH_MAX_URLS', 50))
+    REANIMATOR_BATCH_CONCURRENCY = int(os.environ.get('REANIMATOR_BATCH_CONCURRENCY', 4))
+
+    # Haunted journal batch requests
+    JOURNAL_BATCH_MAX_ENTRIES = int(os.environ.get('JOURNAL_BATCH_MAX_ENTRIES', 500))
+    JOURNAL_BATCH_CONCURRENCY = int(os.environ.get('JOURNAL_BATCH_CONCURRENCY', 4))
+
+    # Persistent journal (SQLite), relative to this directory; off unless a
+    # path is set
+    JOURNAL_DB_PATH = os.environ.get('JOURNAL_DB_PATH', '')
+    if JOURNAL_DB_PATH:
+        JOURNAL_DB_PATH = os.path.join(BASE_DIR, JOURNAL_DB_PATH)
+    JOURNAL_WRITE_BATCH = int(os.environ.get('JOURNAL_WRITE_BATCH', 256))
+    JOURNAL_FLUSH_INTERVAL_MS = float(os.environ.get('JOURNAL_FLUSH_INTERVAL_MS', 50))
+
+    # Requests per second allowed toward each archive.org host, shared by all callers
+    ARCHIVE_RATE_LIMIT = float(os.environ.get('ARCHIVE_RATE_LIMIT', 5))
+    ARCHIVE_RATE_BURST = int(os.environ.get('ARCHIVE_RATE_BURST', 5))
+
+    # Reanimator asset proxy
+    ASSET_PROXY_BASE_URL = os.environ.get('ASSET_PROXY_BASE_URL', '')
+    ASSET_PROXY_MAX_DIMENSION = int(os.environ.get('ASSET_PROXY_MAX_DIMENSION', 800))
+    ASSET_CACHE_MAX_BYTES = int(os.environ.get('ASSET_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Language model backend ('openai' for any OpenAI-compatible API, 'none' for templates only)
+    LLM_BACKEND = os.environ.get('LLM_BACKEND') or ('openai' if OPENAI_API_KEY else 'none')
+    LLM_BASE_URL = os.environ.get('LLM_BASE_URL', 'https://api.openai.com/v1')
+    LLM_MODEL = os.environ.get('LLM_MODEL', 'gpt-4o-mini')
+    LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 2))
+    LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 8))
+    LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 1))
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
+    LLM_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', 0.5))
+    LLM_BREAKER_THRESHOLD = int(os.environ.get('LLM_BREAKER_THRESHOLD', 5))
+    LLM_BREAKER_COOLDOWN = float(os.environ.get('LLM_BREAKER_COOLDOWN', 30))
+    # Micro-batching, for gateways that accept several chat requests per call
+    LLM_BATCH_PATH = os.environ.get('LLM_BATCH_PATH', '')
+    LLM_BATCH_MAX_SIZE = int(os.environ.get('LLM_BATCH_MAX_SIZE', 8))
+    LLM_BATCH_MAX_WAIT_MS = float(os.environ.get('LLM_BATCH_MAX_WAIT_MS', 15))
+    LLM_BATCH_WORKERS = int(os.environ.get('LLM_BATCH_WORKERS', 4))
+
+    # Seconds between words when template replies are streamed, matching the
+    # frontend typing sound cadence
+    STREAM_TYPEWRITER_DELAY = float(os.environ.get('STREAM_TYPEWRITER_DELAY', 0.06))
+
+    # Cache of model replies to repeated prompts; each prompt keeps up to
+    # REPLY_CACHE_VARIANTS replies that are served in turn
+    REPLY_CACHE_VARIANTS = int(os.environ.get('REPLY_CACHE_VARIANTS', 3))
+    REPLY_CACHE_TTL = int(os.environ.get('REPLY_CACHE_TTL', 3600))
+    REPLY_CACHE_MAX_BYTES = int(os.environ.get('REPLY_CACHE_MAX_BYTES', 8 * 1024 * 1024))
+    REPLY_CACHE_MAX_PROMPT_CHARS = int(os.environ.get('REPLY_CACHE_MAX_PROMPT_CHARS', 200))
+
+    # Ghost chat sessions: recent messages kept per session, idle expiry and global caps
+    CHAT_SESSION_MAX_TURNS = int(os.environ.get('CHAT_SESSION_MAX_TURNS', 12))
+    CHAT_SESSION_IDLE_TTL = int(os.environ.get('CHAT_SESSION_IDLE_TTL', 1800))
+    CHAT_SESSION_MAX_SESSIONS = int(os.environ.get('CHAT_SESSION_MAX_SESSIONS', 10000))
+    CHAT_SESSION_MAX_BYTES = int(os.environ.get('CHAT_SESSION_MAX_BYTES', 16 * 1024 * 1024))
+    CHAT_TURN_MAX_CHARS = int(os.environ.get('CHAT_TURN_MAX_CHARS', 1000))
+    # Tokens of system prompt, history and message sent to the model per chat reply
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.environ.get('CHAT_HISTORY_TOKEN_BUDGET', 800))
+
+    # Pool of pre-generated ghost stories per (location, ending type); only
+    # used when a model backend is configured, since templates are instant
+    STORY_POOL_ENABLED = os.environ.get('STORY_POOL_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    STORY_POOL_SIZE = int(os.environ.get('STORY_POOL_SIZE', 2))
+    STORY_POOL_TTL = int(os.environ.get('STORY_POOL_TTL', 21600))
+    STORY_POOL_WORKERS = int(os.environ.get('STORY_POOL_WORKERS', 2))
+    STORY_POOL_RETRY_DELAY = int(os.environ.get('STORY_POOL_RETRY_DELAY', 60))
+    # Locations filled at startup; the others fill on their first request
+    STORY_POOL_WARM_LOCATIONS = int(os.environ.get('STORY_POOL_WARM_LOCATIONS', 10))
+    STORY_POOL_MAX_PAIRS = int(os.environ.get('STORY_POOL_MAX_PAIRS', 1000))
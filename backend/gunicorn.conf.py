@@ -0,0 +1,76 @@
+"""
+Gunicorn settings for production
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Settings come from the environment (see .env.example):
+
+    GUNICORN_WORKER_CLASS  sync, gthread (default) or gevent; ghost chat and
+                           story streams hold a connection open, so sync
+                           workers only suit deployments without streaming
+    GUNICORN_WORKERS       worker processes (default 1, see below)
+    GUNICORN_THREADS       threads per gthread worker (default 32)
+    GUNICORN_PRELOAD       load the app and datasets once before forking (default true)
+
+Reanimator jobs, chat sessions, the story pool and admin profiles live in
+the worker process that created them, so polling a job or continuing a chat
+on another worker finds nothing. Keep one worker, or run several behind a
+load balancer with sticky sessions (client IP or cookie affinity) so a
+client keeps reaching the same worker
+
+Graceful reload: `kill -HUP <master pid>` replaces workers once they finish
+their requests. With preloading the app code itself is not re-imported by
+HUP; deploy new code with `kill -USR2` (start a new master) and then
+`kill -QUIT` on the old one, or set GUNICORN_PRELOAD=false
+"""
+import gc
+import os
+import random
+
+WORKER_CLASSES = ('sync', 'gthread', 'gevent')
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class not in WORKER_CLASSES:
+    raise ValueError(f"GUNICORN_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}")
+
+if worker_class == 'gevent':
+    # Patch before the app is preloaded, so the locks and sockets it creates
+    # are cooperative (requires `pip install gevent`)
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = os.environ.get('GUNICORN_BIND') or f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# One process by default, since per-process state isn't shared between
+# workers; concurrency comes from threads (or greenlets) instead, which suits
+# a server that mostly waits on the model and the archive
+workers = int(os.environ.get('GUNICORN_WORKERS') or 1)
+threads = int(os.environ.get('GUNICORN_THREADS', 32)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+# Long model calls and reanimations can take a while; streams are kept alive
+# by their own heartbeats
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+def when_ready(server):
+    # Everything loaded so far (app, datasets, indexes) is long-lived; moving
+    # it out of the garbage collector's view keeps collections in the workers
+    # from touching, and so copying, the shared pages
+    if preload_app:
+        gc.freeze()
+
+def post_fork(server, worker):
+    # Workers would otherwise all draw the same "random" personas and stories
+    random.seed()
+
+    # Thread pools and writer threads restart lazily per process; only
+    # inherited sockets need dropping here
+    from services.ai_service import ai_service
+    ai_service.backend.reset_connections()
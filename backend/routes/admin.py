@@ -0,0 +1,164 @@
+"""
+Admin API routes
+Profiling of the worker that serves the request; every route needs the
+X-Admin-Token header. The blueprint, and its request hooks, are only
+registered when ADMIN_TOKEN is set, so profiling costs nothing otherwise
+"""
+import hmac
+import pstats
+import time
+from flask import Blueprint, request, jsonify, Response, g
+from config import Config
+from utils.profiling import (
+    request_profiler, sample_stacks, format_collapsed, stats_text, stats_bytes, ProfilingError
+)
+
+admin_bp = Blueprint('admin', __name__)
+
+# Blueprints whose requests can be traced one at a time with X-Profile
+TRACEABLE_BLUEPRINTS = ('cursed_image', 'reanimator')
+
+# Bounds that keep a profiling request from tying up a worker for long
+MAX_SAMPLE_SECONDS = 30
+MAX_PROFILED_REQUESTS = 100
+
+def _is_admin():
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(Config.ADMIN_TOKEN) and hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode())
+
+def _error(code, message, details, status_code):
+    return jsonify({
+        'success': False,
+        'error': {
+            'code': code,
+            'message': message,
+            'details': details
+        }
+    }), status_code
+
+@admin_bp.before_request
+def _require_admin():
+    if not _is_admin():
+        return _error('UNAUTHORIZED', 'Admin token required', 'Send a valid X-Admin-Token header', 401)
+
+def _profile_response(stats):
+    """A profile as a text report, or as a pstats file with ?format=pstats"""
+    if request.args.get('format') == 'pstats':
+        return Response(
+            stats_bytes(stats), mimetype='application/octet-stream',
+            headers={'Content-Disposition': 'attachment; filename=profile.pstats'}
+        )
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in pstats.Stats.sort_arg_dict_default:
+        return _error('INVALID_REQUEST', f"Unknown sort key: {sort}", 'Use e.g. cumulative, tottime or calls', 400)
+    limit = request.args.get('limit', 50, type=int)
+    return Response(stats_text(stats, limit=limit, sort=sort), mimetype='text/plain')
+
+@admin_bp.before_app_request
+def _start_profile():
+    # Armed sessions profile the next N matching requests; X-Profile traces
+    # a single request to the slow image and reanimator routes
+    if request.blueprint == admin_bp.name:
+        return
+    armed = request_profiler.wants(request.path)
+    traced = (not armed and request.blueprint in TRACEABLE_BLUEPRINTS
+              and 'X-Profile' in request.headers and _is_admin())
+    if armed or traced:
+        profile = request_profiler.start(armed=armed)
+        if profile is not None:
+            g.profile = (profile, armed, time.perf_counter())
+
+@admin_bp.after_app_request
+def _finish_traced_profile(response):
+    # Traces end here so their id can go in the response headers; this
+    # covers the view, not the body of a streamed response
+    running = g.get('profile')
+    if running is not None and not running[1]:
+        profile, _, started = g.pop('profile')
+        trace_id = request_profiler.finish(profile)
+        response.headers['X-Profile-Id'] = trace_id
+        response.headers['Server-Timing'] = f'profile;dur={(time.perf_counter() - started) * 1000:.1f}'
+    return response
+
+@admin_bp.teardown_app_request
+def _finish_armed_profile(error=None):
+    running = g.pop('profile', None)
+    if running is not None:
+        profile, armed, _ = running
+        request_profiler.finish(profile, armed=armed)
+
+@admin_bp.route('/api/admin/profile/sample', methods=['GET'])
+def sample_profile():
+    """
+    Sample the stacks of every thread in this worker
+
+    Query parameters:
+        seconds (float): Sampling time (default 5, at most 30)
+        interval_ms (float): Time between samples (default 5)
+
+    Returns: Collapsed stacks ("frame;frame;frame count" lines) for
+        flamegraph.pl or speedscope
+    """
+    seconds = request.args.get('seconds', 5, type=float)
+    interval_ms = request.args.get('interval_ms', 5, type=float)
+    if not 0 < seconds <= MAX_SAMPLE_SECONDS or not 0 < interval_ms <= 1000:
+        return _error(
+            'INVALID_REQUEST', 'Invalid sampling parameters',
+            f'seconds must be in (0, {MAX_SAMPLE_SECONDS}] and interval_ms in (0, 1000]', 400
+        )
+
+    stacks, samples = sample_stacks(seconds, interval_ms / 1000)
+    return Response(format_collapsed(stacks), mimetype='text/plain', headers={'X-Samples': str(samples)})
+
+@admin_bp.route('/api/admin/profile/requests', methods=['POST'])
+def arm_request_profile():
+    """
+    Profile the next requests handled by this worker with cProfile
+
+    Request body:
+        {
+            "count": 20,
+            "path_prefix": "/api/cursed-image"
+        }
+
+    Returns: The session status
+    """
+    data = request.get_json(silent=True) or {}
+    count = data.get('count', 10)
+    path_prefix = data.get('path_prefix', '/api/')
+    if (not isinstance(count, int) or isinstance(count, bool)
+            or not 0 < count <= MAX_PROFILED_REQUESTS or not isinstance(path_prefix, str)):
+        return _error(
+            'INVALID_REQUEST', 'Invalid profiling session',
+            f'count must be an integer from 1 to {MAX_PROFILED_REQUESTS} and path_prefix a string', 400
+        )
+
+    request_profiler.arm(count, path_prefix)
+    return jsonify({'success': True, 'data': request_profiler.status()}), 200
+
+@admin_bp.route('/api/admin/profile/requests', methods=['GET'])
+def get_request_profile():
+    """
+    The profile aggregated over the armed session's requests so far
+
+    Query parameters:
+        format: 'text' (default) or 'pstats'
+        limit (int): Functions listed in the text report
+        sort: pstats sort key for the text report (default 'cumulative')
+    """
+    try:
+        return _profile_response(request_profiler.aggregate_stats())
+    except ProfilingError as e:
+        return _error('NO_PROFILE', str(e), request_profiler.status(), 404)
+
+@admin_bp.route('/api/admin/profile/requests/<trace_id>', methods=['GET'])
+def get_traced_profile(trace_id):
+    """
+    The profile of a request traced with X-Profile, by its X-Profile-Id
+
+    Query parameters: as for GET /api/admin/profile/requests
+    """
+    try:
+        return _profile_response(request_profiler.trace(trace_id))
+    except ProfilingError as e:
+        return _error('NO_PROFILE', str(e), f'Traces are kept for the latest {request_profiler.keep} requests', 404)
@@ -3,9 +3,55 @@ import base64
 from io import BytesIO
 from PIL import Image, ImageFilter, ImageEnhance
 import random
+from config import Config
+from utils.metrics import timed
+from utils.precomputed import PrecomputedJSON
 
 cursed_image_bp = Blueprint('cursed_image', __name__)
 
+# AI transformation styles offered by the frontend
+AI_STYLES = [
+    {
+        'id': 'horror',
+        'name': 'Horror',
+        'description': 'Dark, desaturated, high contrast nightmare',
+        'icon': '😱'
+    },
+    {
+        'id': 'vintage_horror',
+        'name': 'Vintage Horror',
+        'description': 'Aged photograph from a cursed past',
+        'icon': '📜'
+    },
+    {
+        'id': 'glitch_nightmare',
+        'name': 'Glitch Nightmare',
+        'description': 'Digital corruption and reality fragmentation',
+        'icon': '📺'
+    },
+    {
+        'id': 'ethereal_ghost',
+        'name': 'Ethereal Ghost',
+        'description': 'Faded, translucent, otherworldly',
+        'icon': '👻'
+    },
+    {
+        'id': 'blood_ritual',
+        'name': 'Blood Ritual',
+        'description': 'Red-tinted ritualistic atmosphere',
+        'icon': '🩸'
+    },
+    {
+        'id': 'corrupted',
+        'name': 'Corrupted',
+        'description': 'Heavily distorted digital decay',
+        'icon': '💀'
+    }
+]
+
+# Styles only change on deploy, so the list is encoded once
+styles_catalog = PrecomputedJSON(lambda: {'styles': AI_STYLES}, max_age=Config.CATALOG_MAX_AGE)
+
 @cursed_image_bp.route('/api/cursed-image/ai-transform', methods=['POST'])
 def ai_transform_image():
     """
@@ -69,6 +115,7 @@ def ai_transform_image():
             }
         }), 500
 
+@timed('image_style')
 def _apply_ai_style_fallback(image, style, prompt):
     """
     Advanced PIL-based image transformation as fallback
@@ -286,52 +333,8 @@ def get_ai_styles():
     Returns: { "styles": array }
     """
     try:
-        styles = [
-            {
-                'id': 'horror',
-                'name': 'Horror',
-                'description': 'Dark, desaturated, high contrast nightmare',
-                'icon': '😱'
-            },
-            {
-                'id': 'vintage_horror',
-                'name': 'Vintage Horror',
-                'description': 'Aged photograph from a cursed past',
-                'icon': '📜'
-            },
-            {
-                'id': 'glitch_nightmare',
-                'name': 'Glitch Nightmare',
-                'description': 'Digital corruption and reality fragmentation',
-                'icon': '📺'
-            },
-            {
-                'id': 'ethereal_ghost',
-                'name': 'Ethereal Ghost',
-                'description': 'Faded, translucent, otherworldly',
-                'icon': '👻'
-            },
-            {
-                'id': 'blood_ritual',
-                'name': 'Blood Ritual',
-                'description': 'Red-tinted ritualistic atmosphere',
-                'icon': '🩸'
-            },
-            {
-                'id': 'corrupted',
-                'name': 'Corrupted',
-                'description': 'Heavily distorted digital decay',
-                'icon': '💀'
-            }
-        ]
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'styles': styles
-            }
-        }), 200
-        
+        return styles_catalog.response()
+    
     except Exception as e:
         return jsonify({
             'success': False,
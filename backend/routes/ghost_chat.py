@@ -1,15 +1,87 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from datetime import datetime
+import random
+from config import Config
 from services.ai_service import ai_service
+from services.chat_sessions import chat_sessions
+from services.datasets import datasets
+from utils.precomputed import PrecomputedJSON
+from utils.sse import format_sse, wants_event_stream, SSE_HEADERS, SSE_MIMETYPE
 
 ghost_chat_bp = Blueprint('ghost_chat', __name__)
 
+def _persona_info(persona_id):
+    """Public persona details returned with a reply (including voice settings)"""
+    persona = ai_service.ghost_personas.get(persona_id) if persona_id else None
+    if persona is None:
+        return None
+    
+    return {
+        'id': persona_id,
+        'name': persona['name'],
+        'era': persona['era'],
+        'gender': persona['gender'],
+        'voice_settings': persona['voice_settings']
+    }
+
+def _random_persona():
+    return random.choice(list(ai_service.ghost_personas.keys()))
+
+def _stream_ghost_chat(session_id, user_message, persona_id, history):
+    """
+    Stream a ghost reply as server-sent events
+    Events: 'persona' first, then 'token' per text chunk, then 'done' with the full reply
+    """
+    chunks = ai_service.stream_ghost_chat_reply(user_message, persona_id, history)
+    persona_info = _persona_info(persona_id)
+    
+    def generate():
+        yield format_sse({'session_id': session_id, 'persona': persona_info}, event='persona')
+        
+        reply = []
+        try:
+            for chunk in chunks:
+                reply.append(chunk)
+                yield format_sse({'text': chunk}, event='token')
+        except Exception as e:
+            yield format_sse({
+                'code': 'SERVER_ERROR',
+                'message': 'The ghost fell silent mid-sentence',
+                'details': str(e)
+            }, event='error')
+            return
+        
+        reply = ''.join(reply)
+        chat_sessions.add_exchange(session_id, user_message, reply)
+        
+        yield format_sse({
+            'reply': reply,
+            'timestamp': datetime.utcnow().isoformat(),
+            'persona': persona_info,
+            'session_id': session_id
+        }, event='done')
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=SSE_MIMETYPE,
+        headers=SSE_HEADERS
+    )
+
 @ghost_chat_bp.route('/api/ghost-chat', methods=['POST'])
 def ghost_chat():
     """
     Handle ghost chat messages with persona support
-    Expects: { "message": string, "persona_id": string (optional) }
-    Returns: { "reply": string, "timestamp": string, "persona": object }
+    Expects: { "message": string, "session_id": string (optional),
+               "persona_id": string (optional), "stream": bool (optional) }
+    Returns: { "reply": string, "timestamp": string, "persona": object, "session_id": string }
+    
+    The session remembers its persona and recent messages, so later messages
+    only need the session_id. A new session is started when it is missing or
+    has expired; without a persona_id it gets a random ghost that stays for
+    the whole conversation.
+    
+    With "stream": true (or Accept: text/event-stream) the reply is sent as
+    server-sent events while it is generated
     """
     try:
         data = request.get_json()
@@ -23,30 +95,42 @@ def ghost_chat():
                 }
             }), 400
         
+        session_id = data.get('session_id')
+        if session_id is not None and not isinstance(session_id, str):
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'INVALID_REQUEST',
+                    'message': 'session_id must be a string'
+                }
+            }), 400
+        
         user_message = data['message']
         persona_id = data.get('persona_id', None)
+        if persona_id not in ai_service.ghost_personas:
+            persona_id = None
+        
+        session_id, persona_id, history = chat_sessions.begin_turn(
+            session_id, persona_id, default_persona=_random_persona
+        )
+        
+        if wants_event_stream(data):
+            return _stream_ghost_chat(session_id, user_message, persona_id, history)
         
-        # Generate ghost reply using AI service with persona
-        ghost_reply = ai_service.generate_ghost_chat_reply(user_message, persona_id)
+        # Generate ghost reply using AI service with persona and conversation so far
+        ghost_reply = ai_service.generate_ghost_chat_reply(user_message, persona_id, history)
+        chat_sessions.add_exchange(session_id, user_message, ghost_reply)
         
         # Get persona info for response (including voice settings)
-        persona_info = None
-        if persona_id and persona_id in ai_service.ghost_personas:
-            persona = ai_service.ghost_personas[persona_id]
-            persona_info = {
-                'id': persona_id,
-                'name': persona['name'],
-                'era': persona['era'],
-                'gender': persona['gender'],
-                'voice_settings': persona['voice_settings']
-            }
+        persona_info = _persona_info(persona_id)
         
         return jsonify({
             'success': True,
             'data': {
                 'reply': ghost_reply,
                 'timestamp': datetime.utcnow().isoformat(),
-                'persona': persona_info
+                'persona': persona_info,
+                'session_id': session_id
             }
         }), 200
         
@@ -60,16 +144,25 @@ def ghost_chat():
             }
         }), 500
 
-@ghost_chat_bp.route('/api/ghost-personas', methods=['GET'])
-def get_ghost_personas():
+@ghost_chat_bp.route('/api/ghost-chat/sessions/<session_id>', methods=['DELETE'])
+def end_ghost_chat_session(session_id):
     """
-    Get list of available ghost personas
-    Returns: { "personas": array }
+    Forget a ghost chat session and its history
+    Returns: { "session_id": string, "ended": bool }
     """
-    try:
-        personas_list = []
-        for persona_id, persona_data in ai_service.ghost_personas.items():
-            personas_list.append({
+    return jsonify({
+        'success': True,
+        'data': {
+            'session_id': session_id,
+            'ended': chat_sessions.end(session_id)
+        }
+    }), 200
+
+def _persona_catalog():
+    """Public persona details, without the prompt vocabulary"""
+    return {
+        'personas': [
+            {
                 'id': persona_id,
                 'name': persona_data['name'],
                 'era': persona_data['era'],
@@ -77,15 +170,25 @@ def get_ghost_personas():
                 'tone': persona_data['tone'],
                 'gender': persona_data['gender'],
                 'voice_settings': persona_data['voice_settings']
-            })
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'personas': personas_list
             }
-        }), 200
-        
+            for persona_id, persona_data in ai_service.ghost_personas.items()
+        ]
+    }
+
+# Encoded once per dataset version
+personas_catalog = PrecomputedJSON(
+    _persona_catalog, max_age=Config.CATALOG_MAX_AGE, version=lambda: datasets.version
+)
+
+@ghost_chat_bp.route('/api/ghost-personas', methods=['GET'])
+def get_ghost_personas():
+    """
+    Get list of available ghost personas
+    Returns: { "personas": array }
+    """
+    try:
+        return personas_catalog.response()
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -1,14 +1,108 @@
-from flask import Blueprint, request, jsonify
-from datetime import datetime
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from datetime import datetime, timezone
+from config import Config
 from services.ai_service import ai_service
+from services.journal_analysis import (
+    TREND_BUCKETS, JournalEntryError, normalize_entry, classify_entries, summarize_emotions
+)
+from services.journal_store import journal_store, JournalStoreError
+from utils.ndjson import ndjson_line, NDJSON_MIMETYPE
 
 haunted_journal_bp = Blueprint('haunted_journal', __name__)
 
+# Journal history page sizes
+DEFAULT_HISTORY_LIMIT = 20
+MAX_HISTORY_LIMIT = 100
+
+# Header carrying the token from POST /api/haunted-journal/journals
+JOURNAL_TOKEN_HEADER = 'X-Journal-Token'
+
+def _journal_from_request(required=False):
+    """
+    The journal named by the request's token
+
+    Args:
+        required (bool): Whether a request without a token is an error
+
+    Returns:
+        tuple: (journal id or None, error response or None)
+    """
+    token = request.headers.get(JOURNAL_TOKEN_HEADER)
+    if not required and (not token or not journal_store.enabled):
+        return None, None
+
+    journal = journal_store.find_journal(token) if token else None
+    if journal is None:
+        return None, (jsonify({
+            'success': False,
+            'error': {
+                'code': 'UNAUTHORIZED',
+                'message': 'A valid journal token is required',
+                'details': f'Send the token from POST /api/haunted-journal/journals in the {JOURNAL_TOKEN_HEADER} header'
+            }
+        }), 401)
+    return journal, None
+
+@haunted_journal_bp.route('/api/haunted-journal/journals', methods=['POST'])
+def create_journal():
+    """
+    Start a stored journal
+    Returns: { "token": string }, a secret to send as X-Journal-Token with
+    entries to store them and to read them back; it can't be recovered if lost
+    """
+    try:
+        token = journal_store.create_journal()
+    except JournalStoreError as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'JOURNAL_UNAVAILABLE',
+                'message': 'Journals can not be stored on this server',
+                'details': str(e)
+            }
+        }), 503
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'token': token
+        }
+    }), 201
+
+@haunted_journal_bp.route('/api/haunted-journal/journals', methods=['DELETE'])
+def delete_journal():
+    """
+    Delete the journal named by X-Journal-Token with all its entries
+    Returns: { "deleted": int }
+    """
+    journal, error = _journal_from_request(required=True)
+    if error:
+        return error
+
+    try:
+        deleted = journal_store.delete_journal(journal)
+    except JournalStoreError as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'SERVER_ERROR',
+                'message': 'An error occurred deleting your journal',
+                'details': str(e)
+            }
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'deleted': deleted
+        }
+    }), 200
+
 @haunted_journal_bp.route('/api/haunted-journal', methods=['POST'])
 def haunted_journal():
     """
     Handle haunted journal entries
-    Expects: { "entry": string }
+    Expects: { "entry": string }, stored only with an X-Journal-Token header
     Returns: { "emotion": string, "haunted_reply": string, "timestamp": string }
     """
     try:
@@ -34,15 +128,26 @@ def haunted_journal():
                 }
             }), 400
         
+        journal, error = _journal_from_request()
+        if error:
+            return error
+        
         # Analyze emotion and generate haunted reply using AI service
         result = ai_service.analyze_emotion_and_reply(journal_entry)
+        timestamp = datetime.now(timezone.utc)
+        
+        # Written in the background; the reply doesn't wait for the disk
+        journal_store.append(
+            journal_entry, result['emotion'], result['haunted_reply'],
+            journal=journal, created_at=timestamp.timestamp()
+        )
         
         return jsonify({
             'success': True,
             'data': {
                 'emotion': result['emotion'],
                 'haunted_reply': result['haunted_reply'],
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': timestamp.replace(tzinfo=None).isoformat()
             }
         }), 200
         
@@ -55,3 +160,249 @@ def haunted_journal():
                 'details': str(e)
             }
         }), 500
+
+@haunted_journal_bp.route('/api/haunted-journal/batch', methods=['POST'])
+def haunted_journal_batch():
+    """
+    Analyze many journal entries at once, streaming haunted replies as they are ready
+
+    Request body:
+        {
+            "entries": ["I miss her", {"entry": "Why me?", "timestamp": "2024-01-31T21:15:00Z"}],
+            "bucket": "day" | "week" | "month"
+        }
+    Entries are stored only with an X-Journal-Token header
+
+    Response (application/x-ndjson), one line per entry:
+        {"index": 0, "success": true, "data": {"emotion": ..., "haunted_reply": ..., "timestamp": ...}}
+    followed by a summary line with the emotion aggregates of the valid entries:
+        {"done": true, "total": 2, "succeeded": 2, "failed": 0,
+         "emotions": {"sadness": 1, ...}, "dominant_emotion": "sadness",
+         "trend": [{"period": "2024-01-31", "total": 1, "emotions": {...}, "dominant_emotion": ...}]}
+    """
+    try:
+        data = request.get_json()
+
+        if not data or not isinstance(data.get('entries'), list) or not data['entries']:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'INVALID_REQUEST',
+                    'message': 'A non-empty list of journal entries is required',
+                    'details': 'Please provide "entries" as an array in the request body'
+                }
+            }), 400
+
+        entries = data['entries']
+        max_entries = Config.JOURNAL_BATCH_MAX_ENTRIES
+
+        if len(entries) > max_entries:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'TOO_MANY_ENTRIES',
+                    'message': f'A batch can contain at most {max_entries} entries',
+                    'details': f'Received {len(entries)} entries'
+                }
+            }), 400
+
+        bucket = data.get('bucket', 'day')
+
+        if bucket not in TREND_BUCKETS:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'INVALID_BUCKET',
+                    'message': f'Unknown trend bucket: {bucket}',
+                    'details': 'Bucket must be "day", "week" or "month"'
+                }
+            }), 400
+
+        journal, error = _journal_from_request()
+        if error:
+            return error
+
+        # Validate every entry up front; bad ones are reported in the stream
+        texts, timestamps, positions, errors = [], [], [], {}
+        for index, entry in enumerate(entries):
+            try:
+                text, timestamp = normalize_entry(entry)
+            except JournalEntryError as e:
+                errors[index] = str(e)
+                continue
+            texts.append(text)
+            timestamps.append(timestamp)
+            positions.append(index)
+
+        # One pass of the compiled matcher over all entries
+        emotions = classify_entries(texts)
+        summary = summarize_emotions(emotions, timestamps, bucket)
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'SERVER_ERROR',
+                'message': 'An error occurred processing your journal entries',
+                'details': str(e)
+            }
+        }), 500
+
+    def generate():
+        for index, message in errors.items():
+            yield ndjson_line({
+                'index': index,
+                'success': False,
+                'error': {
+                    'code': 'INVALID_ENTRY',
+                    'message': message
+                }
+            })
+
+        received_at = datetime.now(timezone.utc)
+        received_iso = received_at.replace(tzinfo=None).isoformat()
+        succeeded = 0
+        try:
+            for position, haunted_reply in ai_service.journal_batch_replies(texts, emotions):
+                timestamp = timestamps[position]
+                succeeded += 1
+                journal_store.append(
+                    texts[position], emotions[position], haunted_reply,
+                    journal=journal, created_at=(timestamp or received_at).timestamp()
+                )
+                yield ndjson_line({
+                    'index': positions[position],
+                    'success': True,
+                    'data': {
+                        'emotion': emotions[position],
+                        'haunted_reply': haunted_reply,
+                        'timestamp': timestamp.isoformat() if timestamp else received_iso
+                    }
+                })
+        except Exception as e:
+            yield ndjson_line({
+                'success': False,
+                'error': {
+                    'code': 'SERVER_ERROR',
+                    'message': 'An error occurred processing your journal entries',
+                    'details': str(e)
+                }
+            })
+
+        yield ndjson_line({
+            'done': True,
+            'total': len(entries),
+            'succeeded': succeeded,
+            'failed': len(entries) - succeeded,
+            'emotions': summary['emotions'],
+            'dominant_emotion': summary['dominant_emotion'],
+            'trend': summary['trend']
+        })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=NDJSON_MIMETYPE,
+        headers={'X-Accel-Buffering': 'no'}
+    )
+
+@haunted_journal_bp.route('/api/haunted-journal/history', methods=['GET'])
+def haunted_journal_history():
+    """
+    Page through stored journal entries, newest first
+    Needs the journal's X-Journal-Token header
+
+    Query parameters:
+        limit: Entries per page (default 20, at most 100)
+        cursor: next_cursor from the previous page
+        emotion: Only entries with this emotion
+
+    Returns: { "entries": [...], "next_cursor": string | null }
+    """
+    journal, error = _journal_from_request(required=True)
+    if error:
+        return error
+
+    limit = request.args.get('limit', DEFAULT_HISTORY_LIMIT, type=int)
+    limit = max(1, min(limit, MAX_HISTORY_LIMIT))
+
+    try:
+        page = journal_store.history(
+            journal,
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            emotion=request.args.get('emotion')
+        )
+    except JournalStoreError as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INVALID_REQUEST',
+                'message': 'Could not read the journal history',
+                'details': str(e)
+            }
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'SERVER_ERROR',
+                'message': 'An error occurred reading your journal',
+                'details': str(e)
+            }
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': page
+    }), 200
+
+@haunted_journal_bp.route('/api/haunted-journal/emotions', methods=['GET'])
+def haunted_journal_emotions():
+    """
+    Emotion histogram of stored journal entries
+    Needs the journal's X-Journal-Token header
+
+    Query parameters:
+        start: First day to include, as YYYY-MM-DD (UTC)
+        end: Last day to include, as YYYY-MM-DD (UTC)
+
+    Returns: { "total": int, "emotions": {emotion: count}, "days": [{"day", "emotions"}] }
+    """
+    journal, error = _journal_from_request(required=True)
+    if error:
+        return error
+
+    start = request.args.get('start')
+    end = request.args.get('end')
+
+    for value in (start, end):
+        if value is None:
+            continue
+        try:
+            datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'INVALID_DATE',
+                    'message': f'Invalid date: {value}',
+                    'details': 'Dates must be formatted as YYYY-MM-DD'
+                }
+            }), 400
+
+    try:
+        histogram = journal_store.emotion_histogram(journal, start=start, end=end)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'SERVER_ERROR',
+                'message': 'An error occurred reading your journal',
+                'details': str(e)
+            }
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'data': histogram
+    }), 200
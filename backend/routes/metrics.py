@@ -0,0 +1,66 @@
+"""
+Metrics API routes
+Times every request and serves the collected metrics to Prometheus
+"""
+import time
+from flask import Blueprint, Response, g, request
+from services.ai_service import ai_service, reply_cache
+from services.chat_sessions import chat_sessions
+from services.datasets import datasets
+from services.journal_store import journal_store
+from services.story_pool import story_pool
+from services.asset_proxy import asset_cache
+from utils.cache import cache
+from utils.metrics import metrics, REQUESTS, REQUEST_LATENCY, IN_FLIGHT, REQUEST_BYTES, RESPONSE_BYTES
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Text exposition format understood by every Prometheus version
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+metrics.register_stats('reply_cache', reply_cache.stats, counters=('hits', 'misses', 'evictions'))
+metrics.register_stats('api_cache', cache.stats, counters=('hits', 'misses'))
+metrics.register_stats('asset_cache', lambda: {'bytes': asset_cache.size})
+metrics.register_stats('chat_sessions', chat_sessions.stats, counters=('evictions',))
+metrics.register_stats('story_pool', story_pool.stats, counters=('hits', 'misses'))
+metrics.register_stats(
+    'journal_store', journal_store.stats, counters=('written', 'batches', 'dropped', 'write_errors')
+)
+metrics.register_stats('datasets', datasets.stats, counters=('reloads',))
+if ai_service.scheduler is not None:
+    metrics.register_stats('llm_scheduler', ai_service.scheduler.stats, counters=('batches', 'items'))
+
+@metrics_bp.before_app_request
+def _start_timer():
+    g.metrics_blueprint = request.blueprint or 'app'
+    g.metrics_started = time.perf_counter()
+    IN_FLIGHT.inc(g.metrics_blueprint)
+    if request.content_length:
+        REQUEST_BYTES.observe(request.content_length, g.metrics_blueprint)
+
+@metrics_bp.after_app_request
+def _record_response(response):
+    g.metrics_status = str(response.status_code)
+    if not response.is_streamed and response.content_length is not None:
+        RESPONSE_BYTES.observe(response.content_length, g.metrics_blueprint)
+    return response
+
+@metrics_bp.teardown_app_request
+def _record_request(error=None):
+    # Streamed responses are torn down once their body is fully sent, so
+    # their latency covers the whole stream
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    blueprint = g.metrics_blueprint
+    REQUEST_LATENCY.observe(time.perf_counter() - started, blueprint, request.endpoint or 'unmatched')
+    REQUESTS.inc(blueprint, request.endpoint or 'unmatched', request.method, g.get('metrics_status', '500'))
+    IN_FLIGHT.dec(blueprint)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Request, stage and cache metrics of this worker process
+    Returns: Prometheus text exposition format
+    """
+    return Response(metrics.render(), content_type=PROMETHEUS_MIMETYPE)
@@ -2,22 +2,170 @@
 Reanimator API routes
 Resurrects archived websites with modern styling
 """
-from flask import Blueprint, request, jsonify
-from services.wayback_service import fetch_archived_snapshot, WaybackError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from config import Config
+from services.wayback_service import fetch_archived_snapshot, WaybackError, ArchiveBusyError
 from services.ai_service import ai_service
+from services.asset_proxy import fetch_proxied_asset, is_proxyable_url, AssetProxyError
+from services.job_queue import JobQueue, JobQueueFullError, FINISHED_STATES, JOB_COMPLETED
+from utils.sse import format_sse, sse_comment, SSE_HEADERS, SSE_MIMETYPE
+from utils.ndjson import ndjson_line, NDJSON_MIMETYPE
+from utils.page_templates import (
+    REANIMATED_PAGE_SHELL,
+    REANIMATED_PAGE_SHELL_ETAG,
+    REANIMATED_CONTENT_PLACEHOLDER
+)
 
 reanimator_bp = Blueprint('reanimator', __name__)
 
+# Response modes: a full revived document, or only the content fragment that
+# the client drops into the cached template shell
+MODE_FULL = 'full'
+MODE_FRAGMENT = 'fragment'
+
+# The template shell only changes on deploy, so let clients keep it for a day
+TEMPLATE_MAX_AGE = 86400
+
+# Background workers for reanimations requested with "async": true
+reanimator_jobs = JobQueue(
+    max_workers=Config.REANIMATOR_JOB_WORKERS,
+    result_ttl=Config.REANIMATOR_JOB_TTL,
+    max_pending=Config.REANIMATOR_JOB_MAX_PENDING,
+    max_finished=Config.REANIMATOR_JOB_MAX_RESULTS,
+    name='reanimator-job'
+)
+
+# Proxied images are immutable snapshots, so they can be cached for a week
+ASSET_MAX_AGE = 604800
+
+# Seconds between keep-alive comments on the job event stream
+JOB_EVENT_KEEPALIVE = 15
+
+# Seconds clients are told to wait when the job queue is full
+JOB_RETRY_AFTER = 5
+
+def _reanimate(url, mode=MODE_FULL, include_original=True):
+    """
+    Fetch and modernize an archived website
+
+    Args:
+        url (str): URL to reanimate
+        mode (str): 'full' for a complete revived document, 'fragment' for
+            only the content that goes inside the template shell
+        include_original (bool): Whether to include the archived HTML
+
+    Returns:
+        tuple: (response body dict, HTTP status code)
+    """
+    # Step 1: Fetch archived snapshot from Wayback Machine
+    try:
+        archive_data = fetch_archived_snapshot(url)
+        original_html = archive_data['html']
+        archive_date = archive_data['archive_date']
+        archive_url = archive_data['archive_url']
+        removed_artifacts = archive_data.get('removed_artifacts', {})
+    except ArchiveBusyError as e:
+        return {
+            'success': False,
+            'error': {
+                'code': 'ARCHIVE_BUSY',
+                'message': str(e),
+                'details': 'Requests to the Wayback Machine are rate limited'
+            }
+        }, 503
+    except WaybackError as e:
+        return {
+            'success': False,
+            'error': {
+                'code': 'WAYBACK_ERROR',
+                'message': str(e),
+                'details': 'Failed to fetch archived version from Wayback Machine'
+            }
+        }, 404
+
+    # Step 2: Modernize the HTML using AI service
+    try:
+        if mode == MODE_FRAGMENT:
+            revived = {
+                'revived_fragment': ai_service.modernize_html_fragment(original_html, archive_url),
+                'template': {
+                    'url': '/api/reanimator/template',
+                    'etag': REANIMATED_PAGE_SHELL_ETAG,
+                    'placeholder': REANIMATED_CONTENT_PLACEHOLDER
+                }
+            }
+        else:
+            revived = {'revived_html': ai_service.modernize_html(original_html, archive_url)}
+    except Exception as e:
+        return {
+            'success': False,
+            'error': {
+                'code': 'MODERNIZATION_ERROR',
+                'message': 'Failed to modernize HTML',
+                'details': str(e)
+            }
+        }, 500
+
+    # Step 3: Return both versions
+    result = {}
+    if include_original:
+        result['original_html'] = original_html
+    result.update(revived)
+    result['archive_date'] = archive_date
+    result['removed_artifacts'] = removed_artifacts
+    result['success'] = True
+
+    return {
+        'success': True,
+        'data': result
+    }, 200
+
+def _serialize_job(job):
+    """Build the public view of a reanimator job"""
+    payload = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'created_at': job['created_at'],
+        'finished_at': job['finished_at']
+    }
+
+    if job['status'] == JOB_COMPLETED:
+        body, status_code = job['result']
+        payload['result'] = body
+        payload['result_status'] = status_code
+    elif job['error']:
+        payload['error'] = {
+            'code': 'INTERNAL_ERROR',
+            'message': 'An unexpected error occurred',
+            'details': job['error']
+        }
+
+    return payload
+
+def _job_not_found(job_id):
+    return jsonify({
+        'success': False,
+        'error': {
+            'code': 'JOB_NOT_FOUND',
+            'message': 'Job not found',
+            'details': f'No reanimation job found with ID: {job_id} (it may have expired)'
+        }
+    }), 404
+
 @reanimator_bp.route('/api/reanimator', methods=['POST'])
 def reanimate_website():
     """
     Reanimate a website by fetching archived version and modernizing it
-    
+
     Request body:
         {
-            "url": "https://example.com"
+            "url": "https://example.com",
+            "async": false,
+            "mode": "full" | "fragment",
+            "include_original": true
         }
-    
+
     Response:
         {
             "success": true,
@@ -25,14 +173,32 @@ def reanimate_website():
                 "original_html": "...",
                 "revived_html": "...",
                 "archive_date": "2020-01-01",
+                "removed_artifacts": {"wayback_toolbar": 1, ...},
                 "success": true
             }
         }
+
+    With "mode": "fragment", "revived_html" is replaced by "revived_fragment"
+    plus a "template" object pointing at the cacheable page shell; the client
+    substitutes the fragment for template.placeholder.
+
+    With "async": true the request returns 202 immediately:
+        {
+            "success": true,
+            "data": {
+                "job_id": "...",
+                "status": "queued",
+                "status_url": "/api/reanimator/jobs/<job_id>",
+                "events_url": "/api/reanimator/jobs/<job_id>/events"
+            }
+        }
+    or 503 QUEUE_FULL, with Retry-After, while REANIMATOR_JOB_MAX_PENDING
+    jobs are unfinished
     """
     try:
         # Get URL from request
         data = request.get_json()
-        
+
         if not data or 'url' not in data:
             return jsonify({
                 'success': False,
@@ -42,9 +208,9 @@ def reanimate_website():
                     'details': 'Please provide a URL in the request body'
                 }
             }), 400
-        
+
         url = data['url']
-        
+
         if not url or not url.strip():
             return jsonify({
                 'success': False,
@@ -54,48 +220,118 @@ def reanimate_website():
                     'details': 'Please provide a valid URL'
                 }
             }), 400
-        
-        # Step 1: Fetch archived snapshot from Wayback Machine
-        try:
-            archive_data = fetch_archived_snapshot(url)
-            original_html = archive_data['html']
-            archive_date = archive_data['archive_date']
-        except WaybackError as e:
+
+        mode = data.get('mode', MODE_FULL)
+
+        if mode not in (MODE_FULL, MODE_FRAGMENT):
             return jsonify({
                 'success': False,
                 'error': {
-                    'code': 'WAYBACK_ERROR',
-                    'message': str(e),
-                    'details': 'Failed to fetch archived version from Wayback Machine'
+                    'code': 'INVALID_MODE',
+                    'message': f'Unknown response mode: {mode}',
+                    'details': 'Mode must be "full" or "fragment"'
                 }
-            }), 404
-        
-        # Step 2: Modernize the HTML using AI service
-        try:
-            revived_html = ai_service.modernize_html(original_html)
-        except Exception as e:
+            }), 400
+
+        include_original = bool(data.get('include_original', True))
+
+        # Hand long-running work to the job queue so the request thread is freed
+        if data.get('async'):
+            try:
+                job_id = reanimator_jobs.submit(_reanimate, url, mode, include_original)
+            except JobQueueFullError as e:
+                response = jsonify({
+                    'success': False,
+                    'error': {
+                        'code': 'QUEUE_FULL',
+                        'message': 'Too many reanimations are already waiting',
+                        'details': str(e)
+                    }
+                })
+                response.headers['Retry-After'] = str(JOB_RETRY_AFTER)
+                return response, 503
             return jsonify({
-                'success': False,
-                'error': {
-                    'code': 'MODERNIZATION_ERROR',
-                    'message': 'Failed to modernize HTML',
-                    'details': str(e)
+                'success': True,
+                'data': {
+                    'job_id': job_id,
+                    'status': 'queued',
+                    'status_url': f'/api/reanimator/jobs/{job_id}',
+                    'events_url': f'/api/reanimator/jobs/{job_id}/events'
                 }
-            }), 500
-        
-        # Step 3: Return both versions
+            }), 202
+
+        body, status_code = _reanimate(url, mode, include_original)
+        return jsonify(body), status_code
+
+    except Exception as e:
+        # Handle unexpected errors
         return jsonify({
-            'success': True,
-            'data': {
-                'original_html': original_html,
-                'revived_html': revived_html,
-                'archive_date': archive_date,
-                'success': True
+            'success': False,
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': 'An unexpected error occurred',
+                'details': str(e)
             }
-        }), 200
-        
+        }), 500
+
+@reanimator_bp.route('/api/reanimator/batch', methods=['POST'])
+def reanimate_websites_batch():
+    """
+    Reanimate a list of websites concurrently, streaming results as they finish
+
+    Request body:
+        {
+            "urls": ["https://example.com", "https://example.org"],
+            "mode": "full" | "fragment",
+            "include_original": true
+        }
+
+    Response (application/x-ndjson), one line per URL in completion order:
+        {"index": 0, "url": "https://example.com", "status": 200, "success": true, "data": {...}}
+    followed by a summary line:
+        {"done": true, "total": 2, "succeeded": 2, "failed": 0}
+    """
+    try:
+        data = request.get_json()
+
+        if not data or not isinstance(data.get('urls'), list) or not data['urls']:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'MISSING_URLS',
+                    'message': 'A non-empty list of URLs is required',
+                    'details': 'Please provide "urls" as an array in the request body'
+                }
+            }), 400
+
+        urls = data['urls']
+        max_urls = Config.REANIMATOR_BATCH_MAX_URLS
+
+        if len(urls) > max_urls:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'TOO_MANY_URLS',
+                    'message': f'A batch can contain at most {max_urls} URLs',
+                    'details': f'Received {len(urls)} URLs'
+                }
+            }), 400
+
+        mode = data.get('mode', MODE_FULL)
+
+        if mode not in (MODE_FULL, MODE_FRAGMENT):
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'INVALID_MODE',
+                    'message': f'Unknown response mode: {mode}',
+                    'details': 'Mode must be "full" or "fragment"'
+                }
+            }), 400
+
+        include_original = bool(data.get('include_original', True))
+
     except Exception as e:
-        # Handle unexpected errors
         return jsonify({
             'success': False,
             'error': {
@@ -104,3 +340,186 @@ def reanimate_website():
                 'details': str(e)
             }
         }), 500
+
+    def reanimate_entry(url):
+        if not isinstance(url, str) or not url.strip():
+            return {
+                'success': False,
+                'error': {
+                    'code': 'INVALID_URL',
+                    'message': 'URL cannot be empty',
+                    'details': 'Please provide a valid URL'
+                }
+            }, 400
+        return _reanimate(url, mode, include_original)
+
+    def generate():
+        succeeded = 0
+        # Archive.org politeness is enforced by the shared per-host rate limiter
+        # inside fetch_archived_snapshot; the pool just bounds concurrency
+        executor = ThreadPoolExecutor(
+            max_workers=min(Config.REANIMATOR_BATCH_CONCURRENCY, len(urls)),
+            thread_name_prefix='reanimator-batch'
+        )
+        try:
+            futures = {
+                executor.submit(reanimate_entry, url): (index, url)
+                for index, url in enumerate(urls)
+            }
+
+            for future in as_completed(futures):
+                index, url = futures[future]
+                try:
+                    body, status_code = future.result()
+                except Exception as e:
+                    body, status_code = {
+                        'success': False,
+                        'error': {
+                            'code': 'INTERNAL_ERROR',
+                            'message': 'An unexpected error occurred',
+                            'details': str(e)
+                        }
+                    }, 500
+
+                if body.get('success'):
+                    succeeded += 1
+
+                yield ndjson_line({'index': index, 'url': url, 'status': status_code, **body})
+
+            yield ndjson_line({
+                'done': True,
+                'total': len(urls),
+                'succeeded': succeeded,
+                'failed': len(urls) - succeeded
+            })
+        finally:
+            # Drop queued work if the client disconnects mid-stream
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=NDJSON_MIMETYPE,
+        headers={'X-Accel-Buffering': 'no'}
+    )
+
+@reanimator_bp.route('/api/reanimator/template', methods=['GET'])
+def get_reanimated_page_template():
+    """
+    Serve the static reanimated page shell (stylesheet and layout)
+    Used with "mode": "fragment"; supports conditional GET via ETag
+    """
+    response = Response(REANIMATED_PAGE_SHELL, mimetype='text/html')
+    response.set_etag(REANIMATED_PAGE_SHELL_ETAG)
+    response.headers['Cache-Control'] = f'public, max-age={TEMPLATE_MAX_AGE}'
+    return response.make_conditional(request)
+
+@reanimator_bp.route('/api/reanimator/asset', methods=['GET'])
+def get_proxied_asset():
+    """
+    Serve an archived image through the local caching proxy
+    Query params: url - absolute Wayback Machine URL of the image
+    """
+    url = request.args.get('url', '')
+
+    if not is_proxyable_url(url):
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'INVALID_ASSET_URL',
+                'message': 'Asset URL is not allowed',
+                'details': 'Only Wayback Machine assets can be proxied'
+            }
+        }), 400
+
+    try:
+        payload, content_type = fetch_proxied_asset(url)
+    except ArchiveBusyError as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'ARCHIVE_BUSY',
+                'message': 'Failed to fetch archived asset',
+                'details': str(e)
+            }
+        }), 503
+    except AssetProxyError as e:
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'ASSET_PROXY_ERROR',
+                'message': 'Failed to fetch archived asset',
+                'details': str(e)
+            }
+        }), 502
+
+    response = Response(payload, mimetype=content_type)
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    # Never let a browser treat archived bytes as a document on this origin
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.headers['Content-Security-Policy'] = "default-src 'none'"
+    return response
+
+@reanimator_bp.route('/api/reanimator/jobs/<job_id>', methods=['GET'])
+def get_reanimation_job(job_id):
+    """
+    Poll the status of a background reanimation
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "job_id": "...",
+                "status": "queued" | "running" | "completed" | "failed",
+                "result": { ...same body as a synchronous reanimation... }
+            }
+        }
+    """
+    job = reanimator_jobs.get(job_id)
+
+    if not job:
+        return _job_not_found(job_id)
+
+    return jsonify({
+        'success': True,
+        'data': _serialize_job(job)
+    }), 200
+
+@reanimator_bp.route('/api/reanimator/jobs/<job_id>/events', methods=['GET'])
+def stream_reanimation_job(job_id):
+    """
+    Stream job status changes as Server-Sent Events
+    Emits "status" events while waiting and a final "result" event
+    """
+    job = reanimator_jobs.get(job_id)
+
+    if not job:
+        return _job_not_found(job_id)
+
+    def generate():
+        current = job
+        yield format_sse(_serialize_job(current), event='status')
+
+        while current['status'] not in FINISHED_STATES:
+            previous_status = current['status']
+            current = reanimator_jobs.wait(
+                job_id,
+                timeout=JOB_EVENT_KEEPALIVE,
+                changed_from=previous_status
+            )
+
+            if current is None:
+                yield format_sse({'job_id': job_id, 'status': 'expired'}, event='error')
+                return
+
+            if current['status'] == previous_status:
+                yield sse_comment('keep-alive')
+            elif current['status'] not in FINISHED_STATES:
+                yield format_sse(_serialize_job(current), event='status')
+
+        yield format_sse(_serialize_job(current), event='result')
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=SSE_MIMETYPE,
+        headers=SSE_HEADERS
+    )
@@ -0,0 +1,196 @@
+"""
+Asset proxy for reanimated pages
+Rewrites archived image URLs to a local caching endpoint that fetches them on
+demand from the Wayback Machine, downscales them and keeps them in memory
+"""
+import requests
+from io import BytesIO
+from urllib.parse import urljoin, urlparse, quote
+from PIL import Image
+from config import Config
+from utils.cache import ByteLRUCache
+from services.wayback_service import acquire_archive_slot
+
+class AssetProxyError(Exception):
+    """Custom exception for asset proxy errors"""
+    pass
+
+# Only archive hosts are proxied, so the endpoint can't be used as an open proxy
+ALLOWED_ASSET_HOSTS = ('web.archive.org', 'archive.org')
+
+# Local endpoint that serves proxied assets
+ASSET_PROXY_PATH = '/api/reanimator/asset'
+
+# Refuse upstream images larger than this before decoding them
+MAX_UPSTREAM_BYTES = 5 * 1024 * 1024
+
+# Images with more pixels than this are served as fetched rather than
+# decoded, so a small compressed file can't expand into a huge bitmap
+MAX_DECODE_PIXELS = 16 * 1024 * 1024
+
+# Redirects followed per asset; the Wayback Machine redirects to the closest
+# capture, usually once
+MAX_REDIRECTS = 5
+
+# Raster types only: SVG can carry script, and assets are served from the
+# API origin
+ALLOWED_IMAGE_TYPES = (
+    'image/jpeg', 'image/pjpeg', 'image/png', 'image/gif', 'image/webp',
+    'image/bmp', 'image/x-icon', 'image/vnd.microsoft.icon',
+)
+
+# Formats re-encoded after downscaling; anything else is passed through
+RESAMPLED_FORMATS = {
+    'JPEG': {'quality': 80, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 80},
+}
+
+# Processed images, bounded by total bytes
+asset_cache = ByteLRUCache(Config.ASSET_CACHE_MAX_BYTES)
+
+def is_proxyable_url(url):
+    """Whether a URL points at an archive host the proxy is allowed to fetch"""
+    parsed = urlparse(url)
+    return parsed.scheme in ('http', 'https') and parsed.hostname in ALLOWED_ASSET_HOSTS
+
+def resolve_link_url(href, base_url=None):
+    """
+    Resolve an archived link against the page it came from
+
+    Args:
+        href (str): href attribute as found in the archived HTML
+        base_url (str): Wayback Machine URL of the archived page
+
+    Returns:
+        str: Absolute URL, or the original href if it can't be resolved
+    """
+    if not base_url or not href or href.startswith(('#', 'javascript:', 'mailto:')):
+        return href
+    return urljoin(base_url, href)
+
+def proxied_image_url(src, base_url=None):
+    """
+    Rewrite an archived image URL to go through the local asset proxy
+
+    Args:
+        src (str): src attribute as found in the archived HTML
+        base_url (str): Wayback Machine URL of the archived page
+
+    Returns:
+        str: Proxy URL for archive-hosted images, otherwise the resolved src
+    """
+    absolute_url = resolve_link_url(src, base_url)
+
+    if not is_proxyable_url(absolute_url):
+        return absolute_url
+
+    return f"{Config.ASSET_PROXY_BASE_URL}{ASSET_PROXY_PATH}?url={quote(absolute_url, safe='')}"
+
+def _downscale_image(payload, max_dimension):
+    """Shrink an image to fit within max_dimension, keeping its format"""
+    try:
+        image = Image.open(BytesIO(payload))
+        image_format = image.format
+
+        # Image.open only reads the header, so this runs before any decoding
+        width, height = image.size
+        if width * height > MAX_DECODE_PIXELS:
+            return payload
+
+        if (image_format not in RESAMPLED_FORMATS
+                or getattr(image, 'is_animated', False)
+                or max(image.size) <= max_dimension):
+            return payload
+
+        image.thumbnail((max_dimension, max_dimension))
+
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        buffered = BytesIO()
+        image.save(buffered, format=image_format, **RESAMPLED_FORMATS[image_format])
+        resized = buffered.getvalue()
+
+        return resized if len(resized) < len(payload) else payload
+
+    except Exception:
+        # Serve the original bytes if Pillow can't handle the image
+        return payload
+
+def _get_following_archive_redirects(url, timeout):
+    """
+    GET a URL, following redirects only while they stay on the archive
+
+    Each hop is checked before it is requested, so a redirect can't make
+    the proxy contact any other host, and waits for the shared archive rate
+    limit like every other archive request
+
+    Returns:
+        requests.Response: Streamed final response
+
+    Raises:
+        AssetProxyError: If a redirect leaves the archive or there are too many
+        ArchiveBusyError: If the rate limit has no slot within timeout
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        acquire_archive_slot(url, timeout)
+        response = requests.get(url, timeout=timeout, stream=True, allow_redirects=False)
+        if not response.is_redirect:
+            return response
+
+        response.close()
+        url = urljoin(url, response.headers['Location'])
+        if not is_proxyable_url(url):
+            raise AssetProxyError("Asset redirected outside the Wayback Machine")
+
+    raise AssetProxyError("Asset redirected too many times")
+
+def fetch_proxied_asset(url, timeout=10):
+    """
+    Fetch an archived image through the cache
+
+    Args:
+        url (str): Absolute Wayback Machine URL of the image
+        timeout (int): Request timeout in seconds
+
+    Returns:
+        tuple: (image bytes, content type)
+
+    Raises:
+        AssetProxyError: If the URL is not allowed or the fetch fails
+        ArchiveBusyError: If the archive rate limit has no slot within timeout
+    """
+    if not url or not is_proxyable_url(url):
+        raise AssetProxyError("Only Wayback Machine assets can be proxied")
+
+    cached = asset_cache.get(url)
+    if cached is not None:
+        return cached
+
+    try:
+        with _get_following_archive_redirects(url, timeout) as response:
+            response.raise_for_status()
+
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type not in ALLOWED_IMAGE_TYPES:
+                raise AssetProxyError(f"Asset is not a raster image ({content_type or 'unknown type'})")
+
+            chunks = []
+            received = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                received += len(chunk)
+                if received > MAX_UPSTREAM_BYTES:
+                    raise AssetProxyError("Asset is too large to proxy")
+            payload = b''.join(chunks)
+
+    except requests.exceptions.Timeout:
+        raise AssetProxyError("Request timed out while fetching asset")
+    except requests.exceptions.RequestException as e:
+        raise AssetProxyError(f"Failed to fetch asset: {str(e)}")
+
+    payload = _downscale_image(payload, Config.ASSET_PROXY_MAX_DIMENSION)
+    asset_cache.set(url, payload, content_type)
+
+    return payload, content_type
@@ -0,0 +1,187 @@
+"""
+Micro-batching scheduler for language model calls
+Concurrent generation requests are held for a few milliseconds, grouped into
+batches by priority and sent to the backend in one call each
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from services.llm_backend import LLMBackendError
+
+# Lower numbers are dispatched first when more requests wait than fit a batch.
+# Interactive chat beats journal replies, which beat background generation
+PRIORITY_CHAT = 0
+PRIORITY_JOURNAL = 1
+PRIORITY_DEFAULT = 2
+PRIORITY_BACKGROUND = 3
+
+class BatchScheduler:
+    """Groups concurrent completion requests into backend batch calls"""
+
+    def __init__(self, backend, max_batch=8, max_wait=0.015, workers=4, name='llm-batch'):
+        """
+        Args:
+            backend (LLMBackend): Backend whose complete_batch() receives the batches
+            max_batch (int): Requests per batch (capped by the backend's max_batch_size)
+            max_wait (float): Seconds the oldest waiting request may be held
+                back while the batch fills up
+            workers (int): Batches in flight at once
+            name (str): Thread name prefix
+        """
+        self.backend = backend
+        self.max_batch = max(1, min(max_batch, backend.max_batch_size))
+        self.max_wait = max_wait
+        self.workers = workers
+        self.name = name
+        self._counter = itertools.count()
+        self._reset()
+
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def _reset(self):
+        self._queue = []
+        self._ready = threading.Condition()
+        self._executor = None
+        self._dispatcher = None
+        self._idle_workers = threading.BoundedSemaphore(self.workers)
+        self._pid = os.getpid()
+
+    def _ensure_started(self):
+        # Started on first use, and again in a forked worker, whose copy of
+        # the dispatcher thread and queue would otherwise be dead
+        if self._pid != os.getpid():
+            self._reset()
+
+        if self._dispatcher is None:
+            with self._ready:
+                if self._dispatcher is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix=self.name
+                    )
+                    self._dispatcher = threading.Thread(
+                        target=self._dispatch_loop, name=f'{self.name}-dispatch', daemon=True
+                    )
+                    self._dispatcher.start()
+
+    def submit(self, messages, max_tokens=256, temperature=0.9, priority=PRIORITY_DEFAULT):
+        """
+        Queue a completion request
+
+        Args:
+            messages (list): Chat messages as {'role', 'content'} dicts
+            max_tokens (int): Maximum tokens to generate
+            temperature (float): Sampling temperature
+            priority (int): Dispatch priority (lower goes first)
+
+        Returns:
+            Future: Resolves to the generated text or raises LLMBackendError
+        """
+        self._ensure_started()
+
+        future = Future()
+        item = {
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'future': future,
+            'enqueued': time.monotonic(),
+        }
+
+        with self._ready:
+            heapq.heappush(self._queue, (priority, next(self._counter), item))
+            self._ready.notify()
+
+        return future
+
+    def complete(self, messages, max_tokens=256, temperature=0.9, priority=PRIORITY_DEFAULT, timeout=None):
+        """
+        Queue a completion request and wait for its result
+
+        Args:
+            timeout (float): Seconds to wait, including time spent queued
+
+        Returns:
+            str: Generated text
+
+        Raises:
+            LLMBackendError: If the request failed or timed out
+        """
+        future = self.submit(messages, max_tokens, temperature, priority)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Drop it from the next batch if it hasn't been sent yet
+            future.cancel()
+            raise LLMBackendError("Language model request timed out in the batch queue")
+
+    def _dispatch_loop(self):
+        while True:
+            # Only form a batch once a worker can take it; while all are busy,
+            # requests keep queueing so the next batch is fuller and ordered
+            # by priority
+            self._idle_workers.acquire()
+
+            with self._ready:
+                while not self._queue:
+                    self._ready.wait()
+
+                # Hold the batch open until it is full or the oldest request
+                # has waited max_wait
+                deadline = min(entry[2]['enqueued'] for entry in self._queue) + self.max_wait
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._ready.wait(remaining)
+
+                batch = []
+                while self._queue and len(batch) < self.max_batch:
+                    item = heapq.heappop(self._queue)[2]
+                    # Skip requests whose caller already gave up
+                    if item['future'].set_running_or_notify_cancel():
+                        batch.append(item)
+
+            if batch:
+                self._executor.submit(self._run_batch, batch)
+            else:
+                self._idle_workers.release()
+
+    def _run_batch(self, batch):
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+
+        try:
+            results = self.backend.complete_batch(batch)
+        except Exception as e:
+            error = e if isinstance(e, LLMBackendError) else LLMBackendError(str(e))
+            results = [error] * len(batch)
+        finally:
+            self._idle_workers.release()
+
+        for item, result in zip(batch, results):
+            if isinstance(result, Exception):
+                item['future'].set_exception(result)
+            else:
+                item['future'].set_result(result)
+
+    def stats(self):
+        """
+        Batching effectiveness counters
+
+        Returns:
+            dict: batches, items, average batch size and requests waiting
+        """
+        with self._stats_lock:
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'avg_batch_size': self.items / self.batches if self.batches else 0.0,
+                'queued': len(self._queue)
+            }
@@ -0,0 +1,214 @@
+"""
+Server-side ghost chat sessions
+Keeps each session's persona and its last few messages in a fixed-size ring
+buffer, so the client never re-sends the conversation and memory stays bounded
+"""
+import re
+import time
+import uuid
+from collections import OrderedDict, deque
+from threading import Lock
+from config import Config
+
+# Client-supplied session ids must look like the ones we issue
+SESSION_ID_RE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+# Rough per-session bookkeeping cost on top of the stored text, in bytes
+SESSION_OVERHEAD_BYTES = 256
+
+# Message roles as sent to the model
+ROLE_USER = 'user'
+ROLE_GHOST = 'assistant'
+
+def estimate_tokens(text):
+    """Cheap token estimate (about four characters per token for English)"""
+    return len(text) // 4 + 1
+
+def build_chat_messages(system_prompt, history, user_message, token_budget):
+    """
+    Assemble chat messages from the newest history that fits a token budget
+
+    Args:
+        system_prompt (str): System prompt, always included
+        history (sequence): (role, text) turns, oldest first
+        user_message (str): New message, always included
+        token_budget (int): Tokens available for system prompt, history and message
+
+    Returns:
+        list: Chat messages as {'role', 'content'} dicts
+    """
+    # Every message costs a few tokens of framing on top of its text
+    remaining = token_budget - estimate_tokens(system_prompt) - estimate_tokens(user_message) - 8
+
+    included = []
+    for role, text in reversed(history):
+        cost = estimate_tokens(text) + 4
+        if cost > remaining:
+            break
+        included.append({'role': role, 'content': text})
+        remaining -= cost
+    included.reverse()
+
+    return [{'role': 'system', 'content': system_prompt}] + included + [
+        {'role': ROLE_USER, 'content': user_message}
+    ]
+
+class ChatSession:
+    """One conversation: its persona and a ring buffer of recent turns"""
+
+    __slots__ = ('persona_id', 'turns', 'size', 'last_seen')
+
+    def __init__(self, max_turns):
+        self.persona_id = None
+        self.turns = deque(maxlen=max_turns)
+        self.size = SESSION_OVERHEAD_BYTES
+        self.last_seen = time.monotonic()
+
+class ChatSessionStore:
+    """Thread-safe session store with idle eviction and a global memory cap"""
+
+    def __init__(self, max_turns=12, idle_ttl=1800, max_sessions=10000,
+                 max_bytes=16 * 1024 * 1024, max_turn_chars=1000):
+        """
+        Args:
+            max_turns (int): Messages remembered per session (user and ghost both count)
+            idle_ttl (float): Seconds of inactivity before a session is dropped
+            max_sessions (int): Sessions kept at most; the least recently active go first
+            max_bytes (int): Approximate memory cap across all sessions
+            max_turn_chars (int): Longer messages are truncated before being stored
+        """
+        self.max_turns = max_turns
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.max_turn_chars = max_turn_chars
+        self._sessions = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+        self.evictions = 0
+
+    def begin_turn(self, session_id=None, persona_id=None, default_persona=None):
+        """
+        Open (or resume) a session for a new message
+
+        Args:
+            session_id (str): Session id from the client, if any
+            persona_id (str): Persona requested with this message, if any
+            default_persona (callable): Picks a persona for a session that has none
+
+        Returns:
+            tuple: (session id, persona id, history as a tuple of (role, text))
+        """
+        if not isinstance(session_id, str) or not SESSION_ID_RE.match(session_id):
+            session_id = uuid.uuid4().hex
+
+        with self._lock:
+            now = time.monotonic()
+            self._evict_idle(now)
+
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = ChatSession(self.max_turns)
+                self._size += session.size
+                self._enforce_caps()
+            else:
+                self._sessions.move_to_end(session_id)
+
+            session.last_seen = now
+            if persona_id:
+                session.persona_id = persona_id
+            elif session.persona_id is None and default_persona is not None:
+                # Keep the same ghost for the whole conversation
+                session.persona_id = default_persona()
+
+            return session_id, session.persona_id, tuple(session.turns)
+
+    def add_exchange(self, session_id, user_message, reply):
+        """
+        Remember a user message and the ghost's reply
+
+        Args:
+            session_id (str): Session returned by begin_turn
+            user_message (str): What the user said
+            reply (str): What the ghost answered
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                # Evicted while the reply was being generated
+                return
+
+            for role, text in ((ROLE_USER, user_message), (ROLE_GHOST, reply)):
+                text = text[:self.max_turn_chars]
+                if len(session.turns) == session.turns.maxlen:
+                    dropped = len(session.turns[0][1])
+                    session.size -= dropped
+                    self._size -= dropped
+                session.turns.append((role, text))
+                session.size += len(text)
+                self._size += len(text)
+
+            session.last_seen = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            self._enforce_caps()
+
+    def end(self, session_id):
+        """
+        Forget a session
+
+        Returns:
+            bool: Whether the session existed
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            self._size -= session.size
+            return True
+
+    def _evict_idle(self, now):
+        # Sessions are ordered by last activity, so idle ones are at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen < self.idle_ttl:
+                break
+            self._drop_oldest()
+
+    def _enforce_caps(self):
+        # Never evict the session that was just used
+        while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_sessions or self._size > self.max_bytes):
+            self._drop_oldest()
+
+    def _drop_oldest(self):
+        _, session = self._sessions.popitem(last=False)
+        self._size -= session.size
+        self.evictions += 1
+
+    def cleanup_idle(self):
+        """Drop every idle session now rather than on the next request"""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+    def stats(self):
+        """
+        Session store usage
+
+        Returns:
+            dict: sessions, bytes and evictions
+        """
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'bytes': self._size,
+                'evictions': self.evictions
+            }
+
+# Singleton instance
+chat_sessions = ChatSessionStore(
+    max_turns=Config.CHAT_SESSION_MAX_TURNS,
+    idle_ttl=Config.CHAT_SESSION_IDLE_TTL,
+    max_sessions=Config.CHAT_SESSION_MAX_SESSIONS,
+    max_bytes=Config.CHAT_SESSION_MAX_BYTES,
+    max_turn_chars=Config.CHAT_TURN_MAX_CHARS
+)
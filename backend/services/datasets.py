@@ -0,0 +1,311 @@
+"""
+Hot-reloadable datasets
+Haunted locations and ghost personas are loaded from data files into an
+immutable snapshot together with their indexes. A changed file is validated
+and indexed in the background, then swapped in with a single assignment, so
+readers never wait and never see a half-loaded dataset
+"""
+import csv
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+from config import Config
+from services.location_index import LocationIndex, LocationIndexError, validate_point
+from services.location_clusters import ClusterIndex
+
+# Location fields; CSV files need a header row with these names
+LOCATION_FIELDS = ('id', 'name', 'lat', 'lng', 'description')
+
+# Persona fields shown to users or used in prompts
+PERSONA_TEXT_FIELDS = ('name', 'era', 'tone', 'behavior', 'whisper', 'gender')
+PERSONA_LIST_FIELDS = ('traits', 'vocabulary')
+VOICE_NUMBER_FIELDS = ('pitch', 'rate', 'volume', 'reverb')
+
+class DatasetError(Exception):
+    """Custom exception for missing or invalid data files"""
+    pass
+
+def _require_text(record, field, where):
+    value = record.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise DatasetError(f"{where}: '{field}' must be a non-empty string")
+    return value
+
+def _require_number(record, field, where):
+    value = record.get(field)
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            pass
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise DatasetError(f"{where}: '{field}' must be a number")
+    return float(value)
+
+def validate_location(record, where='location'):
+    """
+    Check a location record and normalize its types
+
+    Returns:
+        dict: id, name, lat, lng and description
+
+    Raises:
+        DatasetError: If a field is missing or invalid
+    """
+    if not isinstance(record, dict):
+        raise DatasetError(f"{where}: must be an object")
+
+    location = {
+        'id': _require_text(record, 'id', where),
+        'name': _require_text(record, 'name', where),
+        'lat': _require_number(record, 'lat', where),
+        'lng': _require_number(record, 'lng', where),
+        'description': _require_text(record, 'description', where),
+    }
+    try:
+        validate_point(location['lat'], location['lng'])
+    except LocationIndexError as e:
+        raise DatasetError(f"{where}: {e}")
+    return location
+
+def validate_persona(persona_id, record):
+    """
+    Check a persona definition
+
+    Returns:
+        dict: The persona
+
+    Raises:
+        DatasetError: If a field is missing or invalid
+    """
+    where = f"persona '{persona_id}'"
+    if not isinstance(record, dict):
+        raise DatasetError(f"{where}: must be an object")
+
+    for field in PERSONA_TEXT_FIELDS:
+        _require_text(record, field, where)
+    for field in PERSONA_LIST_FIELDS:
+        values = record.get(field)
+        if not isinstance(values, list) or not values or not all(isinstance(v, str) for v in values):
+            raise DatasetError(f"{where}: '{field}' must be a non-empty list of strings")
+
+    voice = record.get('voice_settings')
+    if not isinstance(voice, dict):
+        raise DatasetError(f"{where}: 'voice_settings' must be an object")
+    for field in VOICE_NUMBER_FIELDS:
+        _require_number(voice, field, f"{where} voice_settings")
+    _require_text(voice, 'preset', f"{where} voice_settings")
+
+    return record
+
+def read_locations(path):
+    """
+    Load and validate locations from a .json (array of objects) or .csv file
+
+    Returns:
+        list: Location dicts in file order
+
+    Raises:
+        DatasetError: If the file can't be read or a record is invalid
+    """
+    try:
+        with open(path, encoding='utf-8', newline='') as f:
+            if path.endswith('.csv'):
+                reader = csv.DictReader(f)
+                missing = [field for field in LOCATION_FIELDS if field not in (reader.fieldnames or ())]
+                if missing:
+                    raise DatasetError(f"{path}: missing columns {', '.join(missing)}")
+                records = list(reader)
+            else:
+                records = json.load(f)
+    except (OSError, ValueError, csv.Error) as e:
+        raise DatasetError(f"Could not read {path}: {e}")
+
+    if not isinstance(records, list):
+        raise DatasetError(f"{path}: expected a list of locations")
+
+    locations = [validate_location(record, f"{path} entry {number}") for number, record in enumerate(records, 1)]
+    if len({location['id'] for location in locations}) != len(locations):
+        raise DatasetError(f"{path}: location ids must be unique")
+    return locations
+
+def read_personas(path):
+    """
+    Load and validate persona definitions from a JSON object keyed by persona id
+
+    Returns:
+        MappingProxyType: Persona id to definition, in file order
+
+    Raises:
+        DatasetError: If the file can't be read or a persona is invalid
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            records = json.load(f)
+    except (OSError, ValueError) as e:
+        raise DatasetError(f"Could not read {path}: {e}")
+
+    if not isinstance(records, dict) or not records:
+        raise DatasetError(f"{path}: expected an object of personas")
+
+    return MappingProxyType({
+        persona_id: validate_persona(persona_id, record) for persona_id, record in records.items()
+    })
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+class DatasetSnapshot:
+    """One consistent version of the datasets and their indexes; never modified"""
+
+    __slots__ = ('version', 'locations', 'location_index', 'location_clusters', 'personas')
+
+    def __init__(self, version, locations, location_index, location_clusters, personas):
+        self.version = version
+        self.locations = locations
+        self.location_index = location_index
+        self.location_clusters = location_clusters
+        self.personas = personas
+
+class Datasets:
+    """Current dataset snapshot, reloaded when its files change"""
+
+    def __init__(self, locations_path, personas_path, reload_interval=2.0, name='dataset-reload'):
+        """
+        Args:
+            locations_path (str): Locations file (.json or .csv)
+            personas_path (str): Personas file (.json)
+            reload_interval (float): Seconds between file change checks; 0
+                disables hot reloading
+            name (str): Reload thread name
+
+        Raises:
+            DatasetError: If the initial files are missing or invalid
+        """
+        self.locations_path = locations_path
+        self.personas_path = personas_path
+        self.reload_interval = reload_interval
+        self.name = name
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._reloading = False
+        self._checked_at = time.monotonic()
+        self.reloads = 0
+        self.last_error = None
+
+        try:
+            self._signatures = {path: _signature(path) for path in (locations_path, personas_path)}
+        except OSError as e:
+            raise DatasetError(f"Could not read data files: {e}")
+        locations = tuple(read_locations(locations_path))
+        index = LocationIndex(locations)
+        self._snapshot = DatasetSnapshot(
+            1, locations, index, ClusterIndex(index), read_personas(personas_path)
+        )
+
+    @property
+    def version(self):
+        """Version of the current snapshot, increased on every reload"""
+        return self._snapshot.version
+
+    def stats(self):
+        """
+        Dataset sizes and reload health
+
+        Returns:
+            dict: version, reloads, locations, personas and whether the last
+                reload failed
+        """
+        snapshot = self._snapshot
+        return {
+            'version': snapshot.version,
+            'reloads': self.reloads,
+            'locations': len(snapshot.locations),
+            'personas': len(snapshot.personas),
+            'reload_failing': self.last_error is not None
+        }
+
+    def current(self):
+        """
+        The current snapshot; also starts a background reload when a data
+        file changed, without waiting for it
+
+        Returns:
+            DatasetSnapshot: Keep using the same snapshot for a whole request
+        """
+        if self.reload_interval > 0 and time.monotonic() - self._checked_at >= self.reload_interval:
+            self._start_reload()
+        return self._snapshot
+
+    def _start_reload(self):
+        with self._lock:
+            if self._reloading or time.monotonic() - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = time.monotonic()
+            self._reloading = True
+        threading.Thread(target=self._reload_in_background, name=self.name, daemon=True).start()
+
+    def _reload_in_background(self):
+        try:
+            self.reload()
+        except Exception:
+            # Already recorded in last_error; the old snapshot stays in use
+            pass
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def reload(self):
+        """
+        Load whichever data files changed and swap in a new snapshot
+
+        Returns:
+            bool: Whether a new snapshot was installed
+
+        Raises:
+            DatasetError: If a changed file is invalid (the current snapshot is kept)
+        """
+        with self._reload_lock:
+            try:
+                signatures = {path: _signature(path) for path in self._signatures}
+            except OSError as e:
+                # Mid-replace or deleted; try again on the next check
+                self.last_error = str(e)
+                raise DatasetError(f"Could not read data files: {e}")
+
+            changed = {path for path, signature in signatures.items() if signature != self._signatures[path]}
+            if not changed:
+                return False
+
+            # A broken file is not re-read until it changes again
+            self._signatures = signatures
+            current = self._snapshot
+
+            try:
+                locations, index, clusters = current.locations, current.location_index, current.location_clusters
+                if self.locations_path in changed:
+                    locations = tuple(read_locations(self.locations_path))
+                    index, moved = current.location_index.updated(locations)
+                    clusters = ClusterIndex(index) if moved else current.location_clusters.with_index(index)
+
+                personas = current.personas
+                if self.personas_path in changed:
+                    personas = read_personas(self.personas_path)
+            except (DatasetError, LocationIndexError) as e:
+                self.last_error = str(e)
+                raise DatasetError(str(e))
+
+            self._snapshot = DatasetSnapshot(current.version + 1, locations, index, clusters, personas)
+            self.reloads += 1
+            self.last_error = None
+            return True
+
+# Singleton instance
+datasets = Datasets(
+    locations_path=Config.LOCATIONS_DATA_PATH,
+    personas_path=Config.PERSONAS_DATA_PATH,
+    reload_interval=Config.DATASET_RELOAD_INTERVAL
+)
@@ -4,6 +4,7 @@ External APIs service for fetching data from various public APIs
 import requests
 from config import Config
 from utils.cache import cache
+from utils.metrics import timed
 
 class ExternalAPIError(Exception):
     """Custom exception for external API errors"""
@@ -181,6 +182,7 @@ API_HANDLERS = {
     'catfacts': fetch_catfact_data,
 }
 
+@timed('external_api')
 def fetch_api_data(api_name):
     """
     Fetch data from specified API with caching
@@ -0,0 +1,178 @@
+"""
+In-process background job queue for long-running requests
+"""
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition
+
+# Job lifecycle states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED)
+
+class JobQueueFullError(Exception):
+    """Custom exception for jobs submitted while too many are unfinished"""
+    pass
+
+class JobQueue:
+    """Thread pool backed job queue that keeps finished results for a TTL"""
+
+    def __init__(self, max_workers=4, result_ttl=600, max_pending=100, max_finished=500, name='job'):
+        """
+        Args:
+            max_workers (int): Jobs run at once
+            result_ttl (float): Seconds finished jobs are kept for polling
+            max_pending (int): Queued and running jobs at most; more are
+                refused so a burst of submissions can't grow memory unbounded
+            max_finished (int): Finished jobs kept at most; beyond it the
+                oldest are dropped before their TTL, since results can be large
+            name (str): Worker thread name prefix
+        """
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.name = name
+        self.pending = 0
+        self._executor = None
+        self._jobs = {}
+        self._changed = Condition()
+
+    def _get_executor(self):
+        # Created on first use so worker threads are never inherited across a fork
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=self.name
+            )
+        return self._executor
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue a callable to run on the worker pool
+
+        Args:
+            func (callable): Work to run; its return value becomes the job result
+            *args, **kwargs: Arguments passed to func
+
+        Returns:
+            str: Job ID that can be used to poll for the result
+
+        Raises:
+            JobQueueFullError: If max_pending jobs are already unfinished
+        """
+        job_id = uuid.uuid4().hex
+
+        with self._changed:
+            if self.pending >= self.max_pending:
+                raise JobQueueFullError(f"{self.pending} jobs are already waiting")
+            self.pending += 1
+            self._cleanup_expired_locked()
+            self._jobs[job_id] = {
+                'id': job_id,
+                'status': JOB_QUEUED,
+                'result': None,
+                'error': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+            }
+            executor = self._get_executor()
+
+        try:
+            executor.submit(self._run, job_id, func, args, kwargs)
+        except RuntimeError:
+            # The executor is shutting down
+            with self._changed:
+                self.pending -= 1
+                del self._jobs[job_id]
+            raise
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        self._update(job_id, status=JOB_RUNNING, started_at=time.time())
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._update(job_id, finished=True, status=JOB_FAILED, error=str(e), finished_at=time.time())
+        else:
+            self._update(job_id, finished=True, status=JOB_COMPLETED, result=result, finished_at=time.time())
+
+    def _update(self, job_id, finished=False, **fields):
+        with self._changed:
+            if finished:
+                self.pending -= 1
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+                if finished:
+                    self._cleanup_expired_locked()
+                self._changed.notify_all()
+
+    def get(self, job_id):
+        """
+        Get a snapshot of a job
+
+        Args:
+            job_id (str): Job ID returned by submit()
+
+        Returns:
+            dict: Copy of the job record, or None if unknown or expired
+        """
+        with self._changed:
+            self._cleanup_expired_locked()
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id, timeout=None, changed_from=None):
+        """
+        Block until a job finishes or the timeout elapses
+
+        Args:
+            job_id (str): Job ID returned by submit()
+            timeout (float): Maximum seconds to wait (None waits forever)
+            changed_from (str): Also return as soon as the job's status is
+                no longer this one, e.g. when a queued job starts running
+
+        Returns:
+            dict: Copy of the job record, or None if unknown or expired
+        """
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if (job is None
+                        or job['status'] in FINISHED_STATES
+                        or (changed_from is not None and job['status'] != changed_from)):
+                    return dict(job) if job else None
+
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return dict(job)
+                self._changed.wait(remaining)
+
+    def cleanup_expired(self):
+        """Remove finished jobs past the TTL or beyond max_finished"""
+        with self._changed:
+            self._cleanup_expired_locked()
+
+    def _cleanup_expired_locked(self):
+        cutoff = time.time() - self.result_ttl
+        expired_ids = [
+            job_id for job_id, job in self._jobs.items()
+            if job['finished_at'] is not None and job['finished_at'] < cutoff
+        ]
+        for job_id in expired_ids:
+            del self._jobs[job_id]
+
+        finished = [job for job in self._jobs.values() if job['finished_at'] is not None]
+        if len(finished) > self.max_finished:
+            finished.sort(key=lambda job: job['finished_at'])
+            for job in finished[:len(finished) - self.max_finished]:
+                del self._jobs[job['id']]
@@ -0,0 +1,135 @@
+"""
+Bulk journal analysis
+Classifies many journal entries in one pass and aggregates the emotions
+found, overall and per time period
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from services.response_tables import response_tables
+
+# Emotion used for entries without any emotional cue
+DEFAULT_EMOTION = 'contemplation'
+
+# Trend granularities and how a timestamp maps to its period label
+TREND_BUCKETS = {
+    'day': lambda moment: moment.strftime('%Y-%m-%d'),
+    'week': lambda moment: '{0}-W{1:02d}'.format(*moment.isocalendar()[:2]),
+    'month': lambda moment: moment.strftime('%Y-%m'),
+}
+
+class JournalEntryError(Exception):
+    """Custom exception for malformed journal entries"""
+    pass
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 timestamp from a journal entry
+
+    Args:
+        value (str): Timestamp such as 2024-01-31T21:15:00Z
+
+    Returns:
+        datetime: Timezone-aware datetime (naive values are taken as UTC)
+
+    Raises:
+        JournalEntryError: If the timestamp can't be parsed
+    """
+    if not isinstance(value, str):
+        raise JournalEntryError("Timestamp must be an ISO 8601 string")
+
+    text = value.strip()
+    if text.endswith(('Z', 'z')):
+        text = text[:-1] + '+00:00'
+
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        raise JournalEntryError(f"Invalid timestamp: {value}")
+
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+def normalize_entry(entry):
+    """
+    Validate one entry of a batch
+
+    Args:
+        entry: Entry text, or a dict with 'entry' (or 'text') and optional 'timestamp'
+
+    Returns:
+        tuple: (entry text, datetime or None)
+
+    Raises:
+        JournalEntryError: If the entry is empty or malformed
+    """
+    timestamp = None
+    if isinstance(entry, dict):
+        text = entry.get('entry', entry.get('text'))
+        if entry.get('timestamp') is not None:
+            timestamp = parse_timestamp(entry['timestamp'])
+    else:
+        text = entry
+
+    if not isinstance(text, str) or not text.strip():
+        raise JournalEntryError("Journal entry cannot be empty")
+
+    return text, timestamp
+
+def classify_entries(texts):
+    """
+    Detect the emotion of every entry with the shared compiled matcher
+
+    Args:
+        texts (list): Entry texts
+
+    Returns:
+        list: Emotion per entry, in order
+    """
+    return response_tables.journal_emotions.classify_many(texts, default=DEFAULT_EMOTION)
+
+def summarize_emotions(emotions, timestamps, bucket='day'):
+    """
+    Aggregate detected emotions overall and per time period
+
+    Args:
+        emotions (list): Emotion per entry
+        timestamps (list): datetime or None per entry; undated entries only
+            count toward the totals
+        bucket (str): 'day', 'week' or 'month'
+
+    Returns:
+        dict: total, emotions (counts), dominant_emotion and trend, a list of
+            {period, total, emotions, dominant_emotion} in chronological order
+    """
+    period_of = TREND_BUCKETS[bucket]
+    totals = Counter(emotions)
+    periods = {}
+
+    for emotion, moment in zip(emotions, timestamps):
+        if moment is not None:
+            periods.setdefault(period_of(moment.astimezone(timezone.utc)), Counter())[emotion] += 1
+
+    return {
+        'total': len(emotions),
+        'emotions': dict(totals),
+        'dominant_emotion': _dominant(totals),
+        'trend': [
+            {
+                'period': period,
+                'total': sum(counts.values()),
+                'emotions': dict(counts),
+                'dominant_emotion': _dominant(counts)
+            }
+            for period, counts in sorted(periods.items())
+        ]
+    }
+
+def _dominant(counts):
+    # Ties go to the emotion listed first in the lexicon, like classification
+    if not counts:
+        return None
+    order = response_tables.journal_emotions.labels
+    return min(counts, key=lambda emotion: (
+        -counts[emotion], order.index(emotion) if emotion in order else len(order)
+    ))
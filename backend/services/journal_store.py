@@ -0,0 +1,567 @@
+"""
+Persistent haunted journal
+SQLite log (WAL mode) of journal entries with their detected emotion. Only
+entries written with a server-issued journal token are kept, and only that
+token can read them back. Writes are queued and committed in batches by a
+background thread; history and emotion histograms are served from indexes
+instead of scans
+
+Operators can delete stored entries with
+    python -m services.journal_store purge [--before YYYY-MM-DD]
+"""
+import argparse
+import hashlib
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from config import Config
+
+# Random bytes in a journal token
+TOKEN_BYTES = 32
+
+# Entries are owned by a journal: user_id holds the SHA-256 of its token, so
+# the database alone doesn't give access to anyone's journal
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journals (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS journal_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    emotion TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    haunted_reply TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_journal_user_time
+    ON journal_entries (user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_journal_user_emotion_time
+    ON journal_entries (user_id, emotion, created_at, id);
+
+-- Entries are never edited, only deleted with their journal or by a purge
+CREATE TRIGGER IF NOT EXISTS journal_entries_no_update
+    BEFORE UPDATE ON journal_entries
+    BEGIN SELECT RAISE(ABORT, 'journal entries are append-only'); END;
+DROP TRIGGER IF EXISTS journal_entries_no_delete;
+
+-- Daily emotion counts per user, kept in step with journal_entries so
+-- histograms read a handful of rows per day instead of every entry
+CREATE TABLE IF NOT EXISTS journal_emotion_days (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    emotion TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day, emotion)
+) WITHOUT ROWID;
+"""
+
+# Both skip journals deleted while their entries were queued
+INSERT_ENTRY = """
+INSERT INTO journal_entries (user_id, created_at, emotion, entry, haunted_reply)
+SELECT ?1, ?2, ?3, ?4, ?5 WHERE EXISTS (SELECT 1 FROM journals WHERE id = ?1)
+"""
+
+INCREMENT_DAY = """
+INSERT INTO journal_emotion_days (user_id, day, emotion, count)
+SELECT ?1, ?2, ?3, ?4 WHERE EXISTS (SELECT 1 FROM journals WHERE id = ?1)
+ON CONFLICT (user_id, day, emotion) DO UPDATE SET count = count + excluded.count
+"""
+
+class JournalStoreError(Exception):
+    """Custom exception for journal store errors"""
+    pass
+
+def _day(created_at):
+    return datetime.fromtimestamp(created_at, timezone.utc).strftime('%Y-%m-%d')
+
+def journal_id(token):
+    """Id under which a token's journal is stored"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def encode_cursor(created_at, entry_id):
+    """Opaque pagination cursor pointing just past an entry"""
+    return f'{created_at!r}:{entry_id}'
+
+def decode_cursor(cursor):
+    """
+    Read a cursor made by encode_cursor
+
+    Returns:
+        tuple: (created_at, entry id)
+
+    Raises:
+        JournalStoreError: If the cursor is malformed
+    """
+    try:
+        created_at, entry_id = cursor.split(':')
+        return float(created_at), int(entry_id)
+    except (AttributeError, ValueError):
+        raise JournalStoreError(f"Invalid cursor: {cursor}")
+
+class JournalStore:
+    """Token-owned journal log with batched background writes"""
+
+    def __init__(self, path, max_batch=256, flush_interval=0.05, max_pending=10000, name='journal-writer'):
+        """
+        Args:
+            path (str): SQLite database file; an empty path disables persistence
+            max_batch (int): Entries committed per transaction at most
+            flush_interval (float): Seconds the writer waits for more entries
+                before committing a partial batch
+            max_pending (int): Entries queued at most; more are dropped so a
+                stalled disk can't grow memory without bound
+            name (str): Writer thread name
+        """
+        self.path = path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.name = name
+        self._stats_lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self.last_error = None
+        self._reset()
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def _reset(self):
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._writer = None
+        self._start_lock = threading.Lock()
+        self._local = threading.local()
+        self._schema_ready = False
+        self._pid = os.getpid()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        # WAL keeps committed data safe from crashes with NORMAL; only the
+        # last transactions can be lost on power failure
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _ensure_schema(self):
+        if self._schema_ready:
+            return
+        with self._start_lock:
+            if not self._schema_ready:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                connection = self._connect()
+                try:
+                    connection.executescript(SCHEMA)
+                finally:
+                    connection.close()
+                self._schema_ready = True
+
+    def _ensure_started(self):
+        # Started on first use, and again in a forked worker, where the
+        # parent's writer thread and connections don't exist
+        if self._pid != os.getpid():
+            self._reset()
+
+        if self._writer is None:
+            self._ensure_schema()
+            with self._start_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name=self.name, daemon=True)
+                    self._writer.start()
+
+    def _reader(self):
+        # One read connection per thread; WAL lets them read while the writer commits
+        if self._pid != os.getpid():
+            self._reset()
+        self._ensure_schema()
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _writer_connection(self):
+        # Short-lived connection for writes that must finish before returning
+        if self._pid != os.getpid():
+            self._reset()
+        self._ensure_schema()
+        return closing(self._connect())
+
+    def create_journal(self):
+        """
+        Issue a new journal
+
+        Returns:
+            str: Secret token that writes to and reads the journal
+
+        Raises:
+            JournalStoreError: If persistence is disabled or the database fails
+        """
+        if not self.enabled:
+            raise JournalStoreError("Journal storage is disabled")
+
+        token = secrets.token_urlsafe(TOKEN_BYTES)
+        try:
+            with self._writer_connection() as connection, connection:
+                connection.execute(
+                    'INSERT INTO journals (id, created_at) VALUES (?, ?)', (journal_id(token), time.time())
+                )
+        except sqlite3.Error as e:
+            raise JournalStoreError(str(e))
+        return token
+
+    def find_journal(self, token):
+        """
+        Look up the journal a token was issued for
+
+        Args:
+            token (str): Token from create_journal()
+
+        Returns:
+            str: Journal id, or None if the token is unknown or storage is disabled
+        """
+        if not self.enabled or not isinstance(token, str) or not token:
+            return None
+        key = journal_id(token)
+        try:
+            row = self._reader().execute('SELECT 1 FROM journals WHERE id = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            raise JournalStoreError(str(e))
+        return key if row else None
+
+    def delete_journal(self, journal):
+        """
+        Delete a journal with all its entries; its token stops working
+
+        Args:
+            journal (str): Journal id from find_journal()
+
+        Returns:
+            int: Entries deleted
+
+        Raises:
+            JournalStoreError: If the database fails
+        """
+        if not self.enabled:
+            return 0
+
+        # Entries still queued for this journal are skipped by the writer
+        # once the journal row is gone
+        try:
+            with self._writer_connection() as connection, connection:
+                connection.execute('DELETE FROM journals WHERE id = ?', (journal,))
+                deleted = connection.execute(
+                    'DELETE FROM journal_entries WHERE user_id = ?', (journal,)
+                ).rowcount
+                connection.execute('DELETE FROM journal_emotion_days WHERE user_id = ?', (journal,))
+        except sqlite3.Error as e:
+            raise JournalStoreError(str(e))
+        return deleted
+
+    def purge(self, before=None):
+        """
+        Delete stored entries of every journal
+
+        Args:
+            before (str): Only entries from days before this one, as
+                YYYY-MM-DD (UTC); everything, journals included, if missing
+
+        Returns:
+            int: Entries deleted
+
+        Raises:
+            JournalStoreError: If storage is disabled, the date is invalid or
+                the database fails
+        """
+        if not self.enabled:
+            raise JournalStoreError("Journal storage is disabled")
+
+        self.flush(timeout=5)
+        try:
+            with self._writer_connection() as connection, connection:
+                if before is None:
+                    deleted = connection.execute('DELETE FROM journal_entries').rowcount
+                    connection.execute('DELETE FROM journal_emotion_days')
+                    connection.execute('DELETE FROM journals')
+                else:
+                    try:
+                        cutoff = datetime.strptime(before, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+                    except ValueError:
+                        raise JournalStoreError(f"Invalid date: {before}")
+                    deleted = connection.execute(
+                        'DELETE FROM journal_entries WHERE created_at < ?', (cutoff.timestamp(),)
+                    ).rowcount
+                    connection.execute('DELETE FROM journal_emotion_days WHERE day < ?', (before,))
+        except sqlite3.Error as e:
+            raise JournalStoreError(str(e))
+        return deleted
+
+    def append(self, entry, emotion, haunted_reply, journal=None, created_at=None):
+        """
+        Queue a journal entry for writing; returns without waiting for disk
+
+        Args:
+            entry (str): Entry text
+            emotion (str): Detected emotion
+            haunted_reply (str): Reply given to the writer
+            journal (str): Journal id from find_journal(); entries without
+                one are not stored
+            created_at (float): Unix timestamp of the entry (now if missing)
+
+        Returns:
+            bool: Whether the entry was queued (False without a journal, when
+                persistence is disabled or when the queue is full)
+        """
+        if not self.enabled or not journal:
+            return False
+
+        self._ensure_started()
+        record = (
+            journal,
+            time.time() if created_at is None else created_at,
+            emotion,
+            entry,
+            haunted_reply
+        )
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def flush(self, timeout=None):
+        """
+        Wait until every entry queued so far is committed
+
+        Args:
+            timeout (float): Seconds to wait at most
+
+        Returns:
+            bool: Whether everything was committed in time
+        """
+        if not self.enabled or self._writer is None or self._pid != os.getpid():
+            return True
+
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            batch, markers = [], []
+            item = self._queue.get()
+
+            # Collect whatever else arrives within the flush interval; a
+            # flush() marker commits right away, since a reader is waiting
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    markers.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(connection, batch)
+            for marker in markers:
+                marker.set()
+
+    def _write_batch(self, connection, batch):
+        days = {}
+        for user_id, created_at, emotion, _, _ in batch:
+            key = (user_id, _day(created_at), emotion)
+            days[key] = days.get(key, 0) + 1
+
+        try:
+            with connection:
+                connection.executemany(INSERT_ENTRY, batch)
+                connection.executemany(INCREMENT_DAY, [key + (count,) for key, count in days.items()])
+        except sqlite3.Error as e:
+            with self._stats_lock:
+                self.write_errors += 1
+                self.last_error = str(e)
+            return
+
+        with self._stats_lock:
+            self.written += len(batch)
+            self.batches += 1
+
+    def history(self, journal, limit=20, cursor=None, emotion=None):
+        """
+        One page of a journal's entries, newest first
+
+        Uses keyset pagination on the (user, time) index, so every page costs
+        the same however deep into the history it is
+
+        Args:
+            journal (str): Journal id from find_journal()
+            limit (int): Entries per page
+            cursor (str): next_cursor from the previous page
+            emotion (str): Only entries with this emotion
+
+        Returns:
+            dict: entries and next_cursor (None on the last page)
+
+        Raises:
+            JournalStoreError: If the cursor is invalid or the database fails
+        """
+        if not self.enabled:
+            return {'entries': [], 'next_cursor': None}
+
+        # Read your own writes
+        self.flush(timeout=1)
+
+        conditions = ['user_id = ?']
+        params = [journal]
+        if emotion:
+            conditions.append('emotion = ?')
+            params.append(emotion)
+        if cursor:
+            conditions.append('(created_at, id) < (?, ?)')
+            params.extend(decode_cursor(cursor))
+
+        query = (
+            'SELECT id, created_at, emotion, entry, haunted_reply FROM journal_entries '
+            f"WHERE {' AND '.join(conditions)} "
+            'ORDER BY created_at DESC, id DESC LIMIT ?'
+        )
+        params.append(limit + 1)
+
+        try:
+            rows = self._reader().execute(query, params).fetchall()
+        except sqlite3.Error as e:
+            raise JournalStoreError(str(e))
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+
+        return {
+            'entries': [
+                {
+                    'id': entry_id,
+                    'emotion': row_emotion,
+                    'entry': entry,
+                    'haunted_reply': haunted_reply,
+                    'timestamp': datetime.fromtimestamp(created_at, timezone.utc).isoformat()
+                }
+                for entry_id, created_at, row_emotion, entry, haunted_reply in rows
+            ],
+            'next_cursor': next_cursor
+        }
+
+    def emotion_histogram(self, journal, start=None, end=None):
+        """
+        Emotion counts of a journal's entries, overall and per day
+
+        Args:
+            journal (str): Journal id from find_journal()
+            start (str): First day to include, as YYYY-MM-DD
+            end (str): Last day to include, as YYYY-MM-DD
+
+        Returns:
+            dict: total, emotions (counts) and days, a list of {day, emotions}
+
+        Raises:
+            JournalStoreError: If the database fails
+        """
+        if not self.enabled:
+            return {'total': 0, 'emotions': {}, 'days': []}
+
+        self.flush(timeout=1)
+
+        conditions = ['user_id = ?']
+        params = [journal]
+        if start:
+            conditions.append('day >= ?')
+            params.append(start)
+        if end:
+            conditions.append('day <= ?')
+            params.append(end)
+
+        query = (
+            'SELECT day, emotion, count FROM journal_emotion_days '
+            f"WHERE {' AND '.join(conditions)} ORDER BY day"
+        )
+
+        try:
+            rows = self._reader().execute(query, params).fetchall()
+        except sqlite3.Error as e:
+            raise JournalStoreError(str(e))
+
+        totals = {}
+        days = {}
+        for day, emotion, count in rows:
+            totals[emotion] = totals.get(emotion, 0) + count
+            days.setdefault(day, {})[emotion] = count
+
+        return {
+            'total': sum(totals.values()),
+            'emotions': totals,
+            'days': [{'day': day, 'emotions': counts} for day, counts in days.items()]
+        }
+
+    def stats(self):
+        """
+        Writer counters
+
+        Returns:
+            dict: written, batches, queued, dropped and write_errors
+        """
+        with self._stats_lock:
+            return {
+                'written': self.written,
+                'batches': self.batches,
+                'queued': self._queue.qsize(),
+                'dropped': self.dropped,
+                'write_errors': self.write_errors
+            }
+
+# Singleton instance
+journal_store = JournalStore(
+    path=Config.JOURNAL_DB_PATH,
+    max_batch=Config.JOURNAL_WRITE_BATCH,
+    flush_interval=Config.JOURNAL_FLUSH_INTERVAL_MS / 1000
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the persistent haunted journal')
+    commands = parser.add_subparsers(dest='command', required=True)
+    purge = commands.add_parser('purge', help='delete stored entries (all of them unless --before is given)')
+    purge.add_argument('--before', help='only delete entries from days before YYYY-MM-DD (UTC)')
+    args = parser.parse_args()
+
+    try:
+        deleted = journal_store.purge(before=args.before)
+    except JournalStoreError as e:
+        parser.exit(1, f"Could not purge the journal: {e}\n")
+    print(f"Deleted {deleted} entries from {journal_store.path}")
+
+if __name__ == '__main__':
+    main()
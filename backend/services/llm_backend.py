@@ -0,0 +1,430 @@
+"""
+Language model backends for the AI service
+Any OpenAI-compatible chat completions API can be used; when no backend is
+configured, or it is slow or failing, callers fall back to template replies
+"""
+import json
+import random
+import time
+from threading import BoundedSemaphore, Lock
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+
+class LLMBackendError(Exception):
+    """Custom exception for language model backend errors"""
+    pass
+
+# Upstream statuses worth retrying; anything else is returned to the caller
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# First retry delay in seconds, doubled on every attempt
+RETRY_BACKOFF = 0.2
+
+class CircuitBreaker:
+    """Stops calling a failing upstream for a while after repeated errors"""
+
+    def __init__(self, threshold, cooldown):
+        """
+        Args:
+            threshold (int): Consecutive failures that open the circuit
+            cooldown (float): Seconds to wait before letting a trial call through
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._lock = Lock()
+
+    def allow(self):
+        """
+        Whether a call may be attempted now
+
+        Once the cooldown has passed the circuit is half-open: the first
+        caller gets through as the trial and the cooldown restarts, so
+        everyone else keeps being refused until the trial succeeds. A trial
+        that never reports back only holds the circuit for one more cooldown
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at >= self.cooldown:
+                self._opened_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            if self._opened_at is not None:
+                # A failed trial reopens the circuit for a full cooldown
+                self._opened_at = time.monotonic()
+                return
+            self._failures += 1
+            if self.threshold and self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        """Whether calls are refused right now; False again once a trial call may go through"""
+        with self._lock:
+            return self._opened_at is not None and time.monotonic() - self._opened_at < self.cooldown
+
+class LLMBackend:
+    """Interface every language model backend implements"""
+
+    name = 'base'
+
+    # False for the stand-in used when no model is set up at all
+    configured = True
+
+    # Requests one complete_batch() call can carry; 1 means no batching
+    max_batch_size = 1
+
+    @property
+    def available(self):
+        """Whether it is worth calling complete() right now"""
+        return False
+
+    def reset_connections(self):
+        """Drop pooled connections, e.g. in a freshly forked worker process"""
+        pass
+
+    def complete(self, messages, max_tokens=256, temperature=0.9, timeout=None):
+        """
+        Generate a chat completion
+
+        Args:
+            messages (list): Chat messages as {'role', 'content'} dicts
+            max_tokens (int): Maximum tokens to generate
+            temperature (float): Sampling temperature
+            timeout (float): Read timeout in seconds (backend default if None)
+
+        Returns:
+            str: Generated text
+
+        Raises:
+            LLMBackendError: If no completion could be produced
+        """
+        raise NotImplementedError
+
+    def complete_batch(self, batch, timeout=None):
+        """
+        Generate several chat completions, in one round trip where supported
+
+        Args:
+            batch (list): Dicts with 'messages', 'max_tokens' and 'temperature'
+            timeout (float): Read timeout in seconds for the whole batch
+
+        Returns:
+            list: Generated text or an LLMBackendError per request, in order
+        """
+        results = []
+        for item in batch:
+            try:
+                results.append(self.complete(
+                    item['messages'], item['max_tokens'], item['temperature'], timeout
+                ))
+            except LLMBackendError as e:
+                results.append(e)
+        return results
+
+    def stream(self, messages, max_tokens=256, temperature=0.9, timeout=None):
+        """
+        Generate a chat completion incrementally
+
+        Args:
+            messages (list): Chat messages as {'role', 'content'} dicts
+            max_tokens (int): Maximum tokens to generate
+            temperature (float): Sampling temperature
+            timeout (float): Seconds to wait for each chunk (backend default if None)
+
+        Yields:
+            str: Text deltas in generation order
+
+        Raises:
+            LLMBackendError: If the stream can't be started or breaks off
+        """
+        raise NotImplementedError
+
+class NullBackend(LLMBackend):
+    """Backend used when no model is configured; always unavailable"""
+
+    name = 'none'
+    configured = False
+
+    def complete(self, messages, max_tokens=256, temperature=0.9, timeout=None):
+        raise LLMBackendError("No language model backend is configured")
+
+    def stream(self, messages, max_tokens=256, temperature=0.9, timeout=None):
+        raise LLMBackendError("No language model backend is configured")
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Chat completions client for OpenAI and compatible servers"""
+
+    name = 'openai'
+
+    def __init__(self, base_url, api_key=None, model='gpt-4o-mini', connect_timeout=2, timeout=8,
+                 max_retries=1, max_concurrency=8, queue_timeout=0.5,
+                 breaker_threshold=5, breaker_cooldown=30, batch_path=None, max_batch_size=8):
+        """
+        Args:
+            base_url (str): API root, e.g. https://api.openai.com/v1
+            api_key (str): Bearer token (optional for local servers)
+            model (str): Model name sent with every request
+            connect_timeout (float): Seconds to establish a connection
+            timeout (float): Default seconds to wait for a response
+            max_retries (int): Extra attempts on connection errors and retryable statuses
+            max_concurrency (int): Requests allowed in flight at once
+            queue_timeout (float): Seconds to wait for a free slot before giving up
+            breaker_threshold (int): Consecutive failures before calls are skipped
+            breaker_cooldown (float): Seconds calls are skipped once the breaker opens
+            batch_path (str): Path under base_url accepting several chat requests
+                at once (see complete_batch); batching is off when not set
+            max_batch_size (int): Requests sent per batch call
+        """
+        self.url = base_url.rstrip('/') + '/chat/completions'
+        self.batch_url = base_url.rstrip('/') + '/' + batch_path.lstrip('/') if batch_path else None
+        self.max_batch_size = max(1, max_batch_size) if batch_path else 1
+        self.model = model
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.queue_timeout = queue_timeout
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self._slots = BoundedSemaphore(max_concurrency)
+
+        # One pooled session keeps TLS connections to the API warm; the pool
+        # holds a connection per concurrent request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Content-Type'] = 'application/json'
+        if api_key:
+            self.session.headers['Authorization'] = f'Bearer {api_key}'
+
+    @property
+    def available(self):
+        return not self.breaker.is_open
+
+    def reset_connections(self):
+        # Sockets inherited across a fork would be shared between processes
+        self.session.close()
+
+    def _acquire(self):
+        if not self.breaker.allow():
+            raise LLMBackendError("Language model backend is cooling down after repeated failures")
+
+        # Shed load instead of queueing behind slow requests; the caller's
+        # template fallback is better than a long wait
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMBackendError("Too many concurrent language model requests")
+
+    def _payload(self, messages, max_tokens, temperature, stream=False):
+        payload = {
+            'model': self.model,
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+        }
+        if stream:
+            payload['stream'] = True
+        return payload
+
+    def complete(self, messages, max_tokens=256, temperature=0.9, timeout=None):
+        self._acquire()
+
+        try:
+            response = self._post_with_retries(
+                self._payload(messages, max_tokens, temperature), timeout or self.timeout
+            )
+            text = self._parse_completion(response)
+        except LLMBackendError:
+            self.breaker.record_failure()
+            raise
+        finally:
+            self._slots.release()
+
+        self.breaker.record_success()
+        return text
+
+    def complete_batch(self, batch, timeout=None):
+        """
+        Send several chat requests in one round trip
+
+        OpenAI's chat API has no synchronous batch call, so this targets
+        gateways in front of self-hosted models that accept
+        {"model": ..., "requests": [chat payloads]} at batch_path and answer
+        {"responses": [chat completion or {"error": ...}]} in the same order.
+        Without a batch_path requests are sent one by one.
+        """
+        if self.batch_url is None or len(batch) == 1:
+            return super().complete_batch(batch, timeout)
+
+        self._acquire()
+
+        try:
+            response = self._post_with_retries({
+                'model': self.model,
+                'requests': [
+                    self._payload(item['messages'], item['max_tokens'], item['temperature'])
+                    for item in batch
+                ],
+            }, timeout or self.timeout, url=self.batch_url)
+            if response.status_code >= 400:
+                raise LLMBackendError(f"Language model backend returned {response.status_code}")
+            try:
+                responses = response.json()['responses']
+            except (ValueError, KeyError, TypeError):
+                raise LLMBackendError("Malformed batch response from language model backend")
+            if not isinstance(responses, list) or len(responses) != len(batch):
+                raise LLMBackendError("Batch response does not match the requests sent")
+        except LLMBackendError:
+            self.breaker.record_failure()
+            raise
+        finally:
+            self._slots.release()
+
+        self.breaker.record_success()
+
+        results = []
+        for body in responses:
+            try:
+                results.append(self._parse_choice(body))
+            except LLMBackendError as e:
+                results.append(e)
+        return results
+
+    def stream(self, messages, max_tokens=256, temperature=0.9, timeout=None):
+        # The slot is held until the stream is exhausted or closed
+        self._acquire()
+
+        try:
+            response = self._post_with_retries(
+                self._payload(messages, max_tokens, temperature, stream=True),
+                timeout or self.timeout,
+                stream=True
+            )
+            with response:
+                if response.status_code >= 400:
+                    raise LLMBackendError(f"Language model backend returned {response.status_code}")
+                yield from self._iter_deltas(response)
+        except LLMBackendError:
+            self.breaker.record_failure()
+            raise
+        finally:
+            self._slots.release()
+
+        self.breaker.record_success()
+
+    @staticmethod
+    def _iter_deltas(response):
+        """Read text deltas from an OpenAI-style event stream"""
+        try:
+            for line in response.iter_lines():
+                if not line.startswith(b'data:'):
+                    continue
+                data = line[5:].strip()
+                if data == b'[DONE]':
+                    return
+                try:
+                    delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                    raise LLMBackendError("Malformed stream from language model backend")
+                if delta:
+                    yield delta
+        except requests.exceptions.RequestException as e:
+            # The read timeout applies between chunks, so a stalled stream ends here
+            raise LLMBackendError(f"Language model stream broke off: {str(e)}")
+
+    def _post_with_retries(self, payload, timeout, stream=False, url=None):
+        # Retries share the caller's time budget so a slow backend can't
+        # multiply the wait
+        deadline = time.monotonic() + timeout
+        attempt = 0
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMBackendError("Language model request timed out")
+
+            try:
+                response = self.session.post(
+                    url or self.url, json=payload, timeout=(self.connect_timeout, remaining), stream=stream
+                )
+            except requests.exceptions.Timeout:
+                raise LLMBackendError("Language model request timed out")
+            except requests.exceptions.ConnectionError as e:
+                error = LLMBackendError(f"Could not reach language model backend: {str(e)}")
+            except requests.exceptions.RequestException as e:
+                raise LLMBackendError(f"Language model request failed: {str(e)}")
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                response.close()
+                error = LLMBackendError(f"Language model backend returned {response.status_code}")
+
+            if attempt >= self.max_retries:
+                raise error
+
+            delay = RETRY_BACKOFF * (2 ** attempt) * (0.5 + random.random() / 2)
+            if time.monotonic() + delay >= deadline:
+                raise error
+            time.sleep(delay)
+            attempt += 1
+
+    @classmethod
+    def _parse_completion(cls, response):
+        if response.status_code >= 400:
+            raise LLMBackendError(f"Language model backend returned {response.status_code}")
+
+        try:
+            body = response.json()
+        except ValueError:
+            raise LLMBackendError("Malformed response from language model backend")
+        return cls._parse_choice(body)
+
+    @staticmethod
+    def _parse_choice(body):
+        """Text of the first choice in a chat completion body"""
+        if isinstance(body, dict) and body.get('error'):
+            raise LLMBackendError(f"Language model error: {body['error']}")
+
+        try:
+            text = body['choices'][0]['message']['content']
+        except (KeyError, IndexError, TypeError):
+            raise LLMBackendError("Malformed response from language model backend")
+
+        if not text or not text.strip():
+            raise LLMBackendError("Language model returned an empty reply")
+        return text.strip()
+
+def create_backend():
+    """
+    Build the backend selected by Config.LLM_BACKEND
+
+    Returns:
+        LLMBackend: Configured backend (NullBackend if none is configured)
+    """
+    if Config.LLM_BACKEND == 'openai':
+        return OpenAICompatibleBackend(
+            Config.LLM_BASE_URL,
+            api_key=Config.OPENAI_API_KEY,
+            model=Config.LLM_MODEL,
+            connect_timeout=Config.LLM_CONNECT_TIMEOUT,
+            timeout=Config.LLM_TIMEOUT,
+            max_retries=Config.LLM_MAX_RETRIES,
+            max_concurrency=Config.LLM_MAX_CONCURRENCY,
+            queue_timeout=Config.LLM_QUEUE_TIMEOUT,
+            breaker_threshold=Config.LLM_BREAKER_THRESHOLD,
+            breaker_cooldown=Config.LLM_BREAKER_COOLDOWN,
+            batch_path=Config.LLM_BATCH_PATH or None,
+            max_batch_size=Config.LLM_BATCH_MAX_SIZE,
+        )
+    return NullBackend()
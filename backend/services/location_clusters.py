@@ -0,0 +1,229 @@
+"""
+Map marker clustering
+Precomputes, once per dataset, a grid of clusters for every zoom level on
+the Web Mercator map, so a viewport at any zoom returns a bounded number of
+markers however many locations there are
+"""
+import math
+from services.location_index import validate_point, LocationIndexError
+
+# Web Mercator can't show the poles; latitudes are clamped to its edge
+MAX_MERCATOR_LAT = 85.05112878
+
+# Map tile size in pixels, and the on-screen size of a cluster cell
+TILE_SIZE = 256
+CLUSTER_CELL_PX = 64
+
+# Markers (clusters plus single locations) returned per query at most
+MAX_MARKERS = 1000
+
+# Largest projected coordinate, keeping the far edge inside the last cell
+_EDGE = 1.0 - 1e-12
+
+def _clamp(value):
+    return min(max(value, 0.0), _EDGE)
+
+def _mercator_x(lng):
+    return _clamp((lng + 180) / 360)
+
+def _mercator_y(lat):
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    sin_lat = math.sin(math.radians(lat))
+    return _clamp(0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi))
+
+def _lng(x):
+    return x * 360 - 180
+
+def _lat(y):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+
+class ClusterIndex:
+    """Hierarchical grid clusters of locations for each map zoom level"""
+
+    def __init__(self, index, max_zoom=16, cell_px=CLUSTER_CELL_PX, max_markers=MAX_MARKERS):
+        """
+        Args:
+            index (LocationIndex): Locations to cluster; also answers viewports
+                at zoom levels where nothing is grouped
+            max_zoom (int): Deepest zoom level clustered; beyond it, and beyond
+                the first level where no two locations share a cell, every
+                location is returned on its own
+            cell_px (int): Cluster cell width on screen in pixels
+            max_markers (int): Markers returned per query at most
+        """
+        self.index = index
+        self.max_zoom = max_zoom
+        self.cell_px = cell_px
+        self.max_markers = max_markers
+        self._cells_at_zoom0 = TILE_SIZE // cell_px
+        self._points = [
+            (_mercator_x(location['lng']), _mercator_y(location['lat']), location['id'])
+            for location in index.all()
+        ]
+
+        # Cells at one zoom split exactly in four at the next, so each level is
+        # built by merging the one below; only levels that still group
+        # anything are kept
+        self._levels = []
+        finest = self._finest_level()
+        if finest is not None:
+            level = self._group_points(finest)
+            levels = [level]
+            for _ in range(finest):
+                level = self._merge_up(level)
+                levels.append(level)
+            self._levels = levels[::-1]
+
+    def with_index(self, index):
+        """
+        The same clusters over a new index whose locations kept their ids and
+        coordinates (only names or descriptions changed), without rebuilding
+        """
+        clusters = ClusterIndex.__new__(ClusterIndex)
+        clusters.__dict__.update(self.__dict__)
+        clusters.index = index
+        return clusters
+
+    @property
+    def clustered_zooms(self):
+        """Zoom levels at which at least two locations share a cluster"""
+        return len(self._levels)
+
+    def _grid_size(self, zoom):
+        return self._cells_at_zoom0 << zoom
+
+    def _finest_level(self):
+        # Deepest zoom where some cell still holds several locations; found by
+        # bisection, since splitting cells only separates locations further
+        def groups(zoom):
+            size = self._grid_size(zoom)
+            return len({(int(x * size), int(y * size)) for x, y, _ in self._points}) < len(self._points)
+
+        if len(self._points) < 2 or not groups(0):
+            return None
+        low, high = 0, self.max_zoom
+        while low < high:
+            middle = (low + high + 1) // 2
+            if groups(middle):
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def _group_points(self, zoom):
+        size = self._grid_size(zoom)
+        level = {}
+        for x, y, location_id in self._points:
+            cell = (int(x * size), int(y * size))
+            count, sum_x, sum_y, representative = level.get(cell, (0, 0.0, 0.0, location_id))
+            level[cell] = (count + 1, sum_x + x, sum_y + y, representative)
+        return level
+
+    @staticmethod
+    def _merge_up(level):
+        parents = {}
+        best = {}
+        for (cx, cy), (count, sum_x, sum_y, representative) in level.items():
+            cell = (cx >> 1, cy >> 1)
+            parent = parents.get(cell)
+            if parent is None:
+                parents[cell] = (count, sum_x, sum_y, representative)
+                best[cell] = count
+                continue
+            # The busiest child's representative speaks for the parent
+            if count > best[cell]:
+                representative, best[cell] = representative, count
+            else:
+                representative = parent[3]
+            parents[cell] = (parent[0] + count, parent[1] + sum_x, parent[2] + sum_y, representative)
+        return parents
+
+    def clusters(self, zoom, west=-180.0, south=-90.0, east=180.0, north=90.0):
+        """
+        Clusters and single locations visible in a viewport at a zoom level
+
+        Args:
+            zoom (int): Map zoom level
+            west, south, east, north (float): Viewport; west > east crosses
+                the antimeridian
+
+        Returns:
+            dict: clusters, a list of {id, lat, lng, count, location_id} where
+                location_id is a representative member; locations, the
+                locations that aren't grouped with any other; and truncated,
+                whether markers past max_markers were left out
+
+        Raises:
+            LocationIndexError: If the viewport or zoom is invalid
+        """
+        validate_point(south, west)
+        validate_point(north, east)
+        if south > north:
+            raise LocationIndexError("The south edge must not be north of the north edge")
+        if zoom < 0:
+            raise LocationIndexError("Zoom must not be negative")
+
+        if zoom >= len(self._levels):
+            # No two locations share a cell this deep, so markers are the locations
+            locations = self.index.within_bbox(west, south, east, north)
+            return {
+                'clusters': [],
+                'locations': locations[:self.max_markers],
+                'truncated': len(locations) > self.max_markers
+            }
+
+        # x ranges of the viewport, two when it crosses the antimeridian
+        x_ranges = [(_mercator_x(west), _mercator_x(east))] if west <= east else [
+            (_mercator_x(west), 1.0), (0.0, _mercator_x(east))
+        ]
+        y_min, y_max = _mercator_y(north), _mercator_y(south)
+
+        def visible(x, y):
+            return y_min <= y <= y_max and any(low <= x <= high for low, high in x_ranges)
+
+        level = self._levels[zoom]
+        size = self._grid_size(zoom)
+        clusters = []
+        locations = []
+        truncated = False
+
+        for cell, (count, sum_x, sum_y, representative) in self._cells_in(level, size, x_ranges, y_min, y_max):
+            # Rounding can put the mean of points on the map edge just past it
+            x, y = _clamp(sum_x / count), _clamp(sum_y / count)
+            if not visible(x, y):
+                continue
+            if len(clusters) + len(locations) >= self.max_markers:
+                truncated = True
+                break
+            if count == 1:
+                locations.append(self.index.get(representative))
+            else:
+                clusters.append({
+                    'id': f'{zoom}/{cell[0]}/{cell[1]}',
+                    'lat': round(_lat(y), 6),
+                    'lng': round(_lng(x), 6),
+                    'count': count,
+                    'location_id': representative
+                })
+
+        return {'clusters': clusters, 'locations': locations, 'truncated': truncated}
+
+    @staticmethod
+    def _cells_in(level, size, x_ranges, y_min, y_max):
+        rows = range(int(y_min * size), int(y_max * size) + 1)
+        columns = [range(int(low * size), int(high * size) + 1) for low, high in x_ranges]
+        visible_cells = len(rows) * sum(len(r) for r in columns)
+
+        # A wide viewport covers more cells than are occupied; walk those instead
+        if visible_cells > len(level):
+            for cell, cluster in level.items():
+                if cell[1] in rows and any(cell[0] in r for r in columns):
+                    yield cell, cluster
+            return
+
+        for row in rows:
+            for column_range in columns:
+                for column in column_range:
+                    cluster = level.get((column, row))
+                    if cluster is not None:
+                        yield (column, row), cluster
@@ -0,0 +1,263 @@
+"""
+Spatial index for haunted locations
+Locations are bucketed into a fixed lat/lng grid so viewport, radius and
+nearest-neighbour queries only look at the cells they overlap
+"""
+import math
+
+# Mean Earth radius, for great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+
+# Kilometres per degree of latitude
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Half the Earth's circumference; no two points are further apart
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+class LocationIndexError(Exception):
+    """Custom exception for invalid location queries"""
+    pass
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def validate_point(lat, lng):
+    """
+    Raises:
+        LocationIndexError: If the coordinates are outside the globe
+    """
+    if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+        raise LocationIndexError(f"Coordinates out of range: {lat},{lng}")
+
+class LocationIndex:
+    """Id lookup and grid-bucketed spatial queries over location dicts"""
+
+    def __init__(self, locations, cell_size=1.0):
+        """
+        Args:
+            locations (iterable): Dicts with at least 'id', 'lat' and 'lng'
+            cell_size (float): Grid cell size in degrees; about the size of
+                the smallest viewports queried keeps the cells scanned few
+        """
+        self.cell_size = cell_size
+        self._columns = int(math.ceil(360 / cell_size))
+        self._rows = int(math.ceil(180 / cell_size))
+        self._locations = {}
+        self._order = {}
+        self._cells = {}
+
+        for position, location in enumerate(locations):
+            location_id = location['id']
+            validate_point(location['lat'], location['lng'])
+            if location_id in self._locations:
+                raise LocationIndexError(f"Duplicate location id: {location_id}")
+            self._locations[location_id] = location
+            self._order[location_id] = position
+            self._cells.setdefault(self._cell(location['lat'], location['lng']), []).append(location)
+
+    def __len__(self):
+        return len(self._locations)
+
+    def get(self, location_id):
+        """
+        Returns:
+            dict: The location with this id, or None
+        """
+        return self._locations.get(location_id)
+
+    def all(self):
+        """
+        Returns:
+            list: Every location in dataset order
+        """
+        return list(self._locations.values())
+
+    def updated(self, locations):
+        """
+        A new index for a changed dataset, sharing every untouched grid cell
+        with this one; this index is left unchanged for readers still using it
+
+        Args:
+            locations (iterable): The complete new dataset
+
+        Returns:
+            tuple: (new LocationIndex, whether any location was added, removed or moved)
+        """
+        index = LocationIndex.__new__(LocationIndex)
+        index.cell_size = self.cell_size
+        index._columns = self._columns
+        index._rows = self._rows
+        index._locations = {}
+        index._order = {}
+
+        changed = []
+        for position, location in enumerate(locations):
+            location_id = location['id']
+            validate_point(location['lat'], location['lng'])
+            if location_id in index._locations:
+                raise LocationIndexError(f"Duplicate location id: {location_id}")
+            previous = self._locations.get(location_id)
+            if previous == location:
+                # Keep the indexed object so unchanged cells can be shared
+                location = previous
+            else:
+                changed.append(location)
+            index._locations[location_id] = location
+            index._order[location_id] = position
+
+        removed = [location for location_id, location in self._locations.items()
+                   if location_id not in index._locations]
+
+        # Only cells that lose or gain a location are copied
+        stale_ids = {location['id'] for location in changed} | {location['id'] for location in removed}
+        touched = {self._cell(location['lat'], location['lng']) for location in removed + changed}
+        for location in changed:
+            previous = self._locations.get(location['id'])
+            if previous is not None:
+                touched.add(self._cell(previous['lat'], previous['lng']))
+
+        index._cells = dict(self._cells)
+        for cell in touched:
+            index._cells[cell] = [
+                location for location in self._cells.get(cell, ()) if location['id'] not in stale_ids
+            ]
+        for location in changed:
+            index._cells[self._cell(location['lat'], location['lng'])].append(location)
+        for cell in touched:
+            if not index._cells[cell]:
+                del index._cells[cell]
+
+        moved = bool(removed) or any(
+            location['id'] not in self._locations
+            or (self._locations[location['id']]['lat'], self._locations[location['id']]['lng'])
+            != (location['lat'], location['lng'])
+            for location in changed
+        )
+        return index, moved
+
+    def _cell(self, lat, lng):
+        column = min(int((lng + 180) // self.cell_size), self._columns - 1)
+        row = min(int((lat + 90) // self.cell_size), self._rows - 1)
+        return row, column
+
+    def _candidates(self, south, west, north, east):
+        """Locations in every cell overlapping the box (west > east wraps the antimeridian)"""
+        first_row, first_column = self._cell(south, west)
+        last_row, last_column = self._cell(north, east)
+        if west > east:
+            last_column += self._columns
+
+        columns = last_column - first_column + 1
+        rows = last_row - first_row + 1
+
+        # A box covering more cells than are occupied is cheaper to answer
+        # from the occupied cells directly
+        if rows * min(columns, self._columns) > len(self._cells):
+            for (row, column), locations in self._cells.items():
+                if first_row <= row <= last_row and (
+                        columns >= self._columns
+                        or first_column <= column <= last_column
+                        or first_column <= column + self._columns <= last_column):
+                    yield from locations
+            return
+
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, first_column + min(columns, self._columns)):
+                yield from self._cells.get((row, column % self._columns), ())
+
+    def _sorted(self, locations):
+        return sorted(locations, key=lambda location: self._order[location['id']])
+
+    def within_bbox(self, west, south, east, north):
+        """
+        Locations inside a viewport
+
+        Args:
+            west, south, east, north (float): Box edges in degrees; west > east
+                means the box crosses the antimeridian
+
+        Returns:
+            list: Locations in dataset order
+
+        Raises:
+            LocationIndexError: If the box is invalid
+        """
+        validate_point(south, west)
+        validate_point(north, east)
+        if south > north:
+            raise LocationIndexError("The south edge must not be north of the north edge")
+
+        wraps = west > east
+        return self._sorted(
+            location for location in self._candidates(south, west, north, east)
+            if south <= location['lat'] <= north and (
+                location['lng'] >= west or location['lng'] <= east if wraps
+                else west <= location['lng'] <= east
+            )
+        )
+
+    def near(self, lat, lng, radius_km, limit=None):
+        """
+        Locations within a distance of a point, closest first
+
+        Args:
+            lat, lng (float): Centre point
+            radius_km (float): Search radius in kilometres
+            limit (int): Return at most this many
+
+        Returns:
+            list: (distance in km, location) tuples
+
+        Raises:
+            LocationIndexError: If the point or radius is invalid
+        """
+        validate_point(lat, lng)
+        if radius_km < 0:
+            raise LocationIndexError("Radius must not be negative")
+
+        # Bounding box of the circle; it spans all longitudes near the poles
+        delta_lat = radius_km / KM_PER_DEGREE
+        south, north = max(-90.0, lat - delta_lat), min(90.0, lat + delta_lat)
+        widest = max(abs(south), abs(north))
+        cos_lat = math.cos(math.radians(widest))
+        if widest >= 90 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180:
+            west, east = -180.0, 180.0
+        else:
+            delta_lng = radius_km / (KM_PER_DEGREE * cos_lat)
+            west = (lng - delta_lng + 180) % 360 - 180
+            east = (lng + delta_lng + 180) % 360 - 180
+
+        matches = []
+        for location in self._candidates(south, west, north, east):
+            distance = haversine_km(lat, lng, location['lat'], location['lng'])
+            if distance <= radius_km:
+                matches.append((distance, location))
+
+        matches.sort(key=lambda match: (match[0], self._order[match[1]['id']]))
+        return matches[:limit] if limit is not None else matches
+
+    def nearest(self, lat, lng, k=10):
+        """
+        The k locations closest to a point
+
+        Searches a growing radius until it holds k locations, so only nearby
+        cells are visited where the map is dense
+
+        Returns:
+            list: (distance in km, location) tuples, closest first
+        """
+        validate_point(lat, lng)
+        if k <= 0 or not self._locations:
+            return []
+
+        radius = self.cell_size * KM_PER_DEGREE
+        while True:
+            matches = self.near(lat, lng, radius, limit=k)
+            if len(matches) >= k or radius >= MAX_DISTANCE_KM:
+                return matches
+            radius = min(radius * 2, MAX_DISTANCE_KM)
@@ -0,0 +1,127 @@
+"""
+Precompiled response tables for template (fallback) replies
+The corpora live in data/ghost_responses.json and are loaded once at import
+into immutable tuples; only story templates with slots are formatted per request
+"""
+import json
+import os
+import string
+from types import MappingProxyType
+from utils.intent_matcher import IntentMatcher
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+GHOST_RESPONSES_PATH = os.path.join(DATA_DIR, 'ghost_responses.json')
+
+# Persona whose lines are used when an unknown persona is requested
+DEFAULT_PERSONA = 'weeping_bride'
+
+# Format specs understood in template slots, e.g. {location_description:lower}
+SLOT_FILTERS = {
+    '': lambda value: value,
+    'lower': str.lower,
+}
+
+class CompiledTemplate:
+    """A template string parsed once into literal text and named slots"""
+    
+    __slots__ = ('parts', 'fields')
+    
+    def __init__(self, template):
+        parts = []
+        fields = set()
+        for literal, field, spec, _ in string.Formatter().parse(template):
+            if literal:
+                parts.append(literal)
+            if field is not None:
+                if spec not in SLOT_FILTERS:
+                    raise ValueError(f"Unknown slot filter '{spec}' in template")
+                parts.append((field, SLOT_FILTERS[spec]))
+                fields.add(field)
+        self.parts = tuple(parts)
+        self.fields = frozenset(fields)
+    
+    def render(self, values):
+        """
+        Fill the template's slots
+        
+        Args:
+            values (dict): Slot name to value
+            
+        Returns:
+            str: Rendered text
+        """
+        return ''.join(
+            part if isinstance(part, str) else part[1](values[part[0]])
+            for part in self.parts
+        )
+
+def _compile(template):
+    """Keep slot-free strings as-is; only templates with slots need rendering"""
+    compiled = CompiledTemplate(template)
+    return compiled if compiled.fields else template.replace('{{', '{').replace('}}', '}')
+
+class ResponseTables:
+    """Read-only lookup tables of intents, persona replies and ghost story templates"""
+    
+    def __init__(self, chat_intents, journal_emotions, persona_responses, journal_replies, ghost_stories):
+        # Keyword lexicons compiled into single-pass matchers
+        self.chat_intents = IntentMatcher(chat_intents)
+        self.journal_emotions = IntentMatcher(journal_emotions)
+        self.persona_responses = MappingProxyType({
+            category: MappingProxyType({
+                persona_id: tuple(lines)
+                for persona_id, lines in personas.items()
+            })
+            for category, personas in persona_responses.items()
+        })
+        self.journal_replies = MappingProxyType({
+            emotion: tuple(replies)
+            for emotion, replies in journal_replies.items()
+        })
+        self.ghost_stories = MappingProxyType({
+            ending_type: tuple(_compile(template) for template in templates)
+            for ending_type, templates in ghost_stories.items()
+        })
+        self.ending_types = tuple(self.ghost_stories)
+    
+    @classmethod
+    def load(cls, path=GHOST_RESPONSES_PATH):
+        """
+        Load tables from a JSON data file
+        
+        Args:
+            path (str): Path to the JSON file
+            
+        Returns:
+            ResponseTables: Compiled tables
+        """
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(
+            data['chat_intents'],
+            data['journal_emotions'],
+            data['persona_responses'],
+            data['journal_replies'],
+            data['ghost_stories']
+        )
+    
+    def persona_lines(self, category, persona_id):
+        """
+        Get the candidate replies of a category for a persona
+        
+        Args:
+            category (str): 'joke', 'greeting', 'identity', 'scary' or 'generic'
+            persona_id (str): Persona ID (unknown IDs fall back to the default persona)
+            
+        Returns:
+            tuple: Candidate reply strings
+        """
+        lines = self.persona_responses[category]
+        return lines.get(persona_id) or lines[DEFAULT_PERSONA]
+    
+    def story_templates(self, ending_type):
+        """Get the story templates for an ending type"""
+        return self.ghost_stories[ending_type]
+
+# Shared tables, compiled once per process
+response_tables = ResponseTables.load()
@@ -0,0 +1,215 @@
+"""
+Pre-generated ghost story pool
+Keeps a few model-written stories ready per (location, ending type) pair,
+refilled in the background, so a map click never waits on generation. A
+capped set of locations is warmed up front; the rest fill on first request
+"""
+import itertools
+import os
+import random
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from config import Config
+from services.ai_service import ai_service
+from services.response_tables import response_tables
+from utils.cache import content_tag
+
+def _pool_key(location, ending_type):
+    # The text fingerprint retires stories of a location edited by a dataset
+    # reload; its old pairs are never taken again and age out
+    return location['id'], content_tag(location['name'], location['description']), ending_type
+
+class StoryPool:
+    """Thread-safe pool of ready-made stories per (location, ending type)"""
+
+    def __init__(self, compose, fallback, ending_types, size=2, ttl=21600,
+                 workers=2, retry_delay=60, warm_locations=10, max_pairs=1000, name='story-pool'):
+        """
+        Args:
+            compose (callable): (name, description, ending_type) -> story text,
+                or None if the model couldn't write one
+            fallback (callable): (name, description, ending_type) -> story dict,
+                used instantly when a pool is empty
+            ending_types (sequence): Ending types to keep stories for
+            size (int): Stories kept ready per (location, ending type)
+            ttl (float): Seconds before a pooled story is replaced by a fresh one
+            workers (int): Background generation threads
+            retry_delay (float): Seconds before retrying a pair whose generation failed
+            warm_locations (int): Locations whose pairs warm() fills up front
+            max_pairs (int): Pairs kept at most; the least recently used are dropped
+            name (str): Thread name prefix
+        """
+        self.compose = compose
+        self.fallback = fallback
+        self.ending_types = tuple(ending_types)
+        self.size = size
+        self.ttl = ttl
+        self.workers = workers
+        self.retry_delay = retry_delay
+        self.warm_locations = warm_locations
+        self.max_pairs = max_pairs
+        self.name = name
+        self._stories = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self._reset_workers()
+
+    def _reset_workers(self):
+        self._executor = None
+        self._pending = set()
+        self._failed_at = {}
+        self._warmed = False
+        self._pid = os.getpid()
+
+    def _get_executor(self):
+        # Created on first use, and again in a forked worker, where the parent's
+        # generation threads don't exist
+        if self._pid != os.getpid():
+            self._reset_workers()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def warm(self, locations):
+        """
+        Queue generation for the first warm_locations locations, once per process
+
+        Every pair is generated up front for those only, so startup cost
+        doesn't grow with the dataset; other locations fill on first request
+
+        Args:
+            locations (iterable): Location dicts with 'id', 'name' and 'description'
+        """
+        with self._lock:
+            if self._warmed and self._pid == os.getpid():
+                return
+            executor = self._get_executor()
+            self._warmed = True
+            for location in itertools.islice(locations, self.warm_locations):
+                for ending_type in self.ending_types:
+                    self._schedule_locked(executor, location, ending_type)
+
+    def take(self, location, ending_type=None):
+        """
+        Get a story for a location immediately
+
+        Args:
+            location (dict): Location with 'id', 'name' and 'description'
+            ending_type (str): Wanted ending type (random if missing)
+
+        Returns:
+            dict: story and ending_type; a template story when nothing is pooled
+        """
+        if not ending_type or ending_type not in self.ending_types:
+            ending_type = random.choice(self.ending_types)
+
+        with self._lock:
+            executor = self._get_executor()
+            story = self._pop_locked(_pool_key(location, ending_type))
+            if story is None:
+                # Any other ending this location has ready beats a template
+                for other in random.sample(self.ending_types, len(self.ending_types)):
+                    story = self._pop_locked(_pool_key(location, other))
+                    if story is not None:
+                        ending_type = other
+                        break
+
+            self._schedule_locked(executor, location, ending_type)
+            if story is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if story is None:
+            return self.fallback(location['name'], location['description'], ending_type)
+
+        return {
+            'story': story,
+            'ending_type': ending_type
+        }
+
+    def _ready_locked(self, key):
+        """Stories ready for a pair, after dropping those past their TTL"""
+        stories = self._stories.get(key)
+        if not stories:
+            return 0
+
+        # Drop stories past their TTL so the pool refreshes over time
+        expires_before = time.monotonic() - self.ttl
+        while stories and stories[0][1] < expires_before:
+            stories.popleft()
+        return len(stories)
+
+    def _pop_locked(self, key):
+        if not self._ready_locked(key):
+            return None
+        self._stories.move_to_end(key)
+        return self._stories[key].popleft()[0]
+
+    def _schedule_locked(self, executor, location, ending_type):
+        key = _pool_key(location, ending_type)
+        if key in self._pending or self._ready_locked(key) >= self.size:
+            return
+        failed_at = self._failed_at.get(key)
+        if failed_at is not None and time.monotonic() - failed_at < self.retry_delay:
+            return
+
+        self._pending.add(key)
+        executor.submit(self._refill, location, ending_type)
+
+    def _refill(self, location, ending_type):
+        key = _pool_key(location, ending_type)
+        try:
+            while True:
+                with self._lock:
+                    if self._ready_locked(key) >= self.size:
+                        return
+
+                story = self.compose(location['name'], location['description'], ending_type)
+
+                with self._lock:
+                    if story is None:
+                        self._failed_at[key] = time.monotonic()
+                        return
+                    self._failed_at.pop(key, None)
+                    self._stories.setdefault(key, deque()).append((story, time.monotonic()))
+                    self._stories.move_to_end(key)
+                    while len(self._stories) > self.max_pairs:
+                        self._stories.popitem(last=False)
+        except Exception:
+            with self._lock:
+                self._failed_at[key] = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def stats(self):
+        """
+        Pool usage counters
+
+        Returns:
+            dict: hits, misses, stories ready and refills in progress
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'ready': sum(len(stories) for stories in self._stories.values()),
+                'pending': len(self._pending)
+            }
+
+# Singleton instance
+story_pool = StoryPool(
+    compose=ai_service.compose_ghost_story,
+    fallback=ai_service.template_ghost_story,
+    ending_types=response_tables.ending_types,
+    size=Config.STORY_POOL_SIZE,
+    ttl=Config.STORY_POOL_TTL,
+    workers=Config.STORY_POOL_WORKERS,
+    retry_delay=Config.STORY_POOL_RETRY_DELAY,
+    warm_locations=Config.STORY_POOL_WARM_LOCATIONS,
+    max_pairs=Config.STORY_POOL_MAX_PAIRS
+)
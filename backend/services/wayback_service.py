@@ -5,11 +5,44 @@ import requests
 from urllib.parse import urlparse, quote
 import re
 from bs4 import BeautifulSoup
+from config import Config
+from utils.metrics import timed
+from utils.rate_limit import HostRateLimiter, RateLimitTimeout
 
 class WaybackError(Exception):
     """Custom exception for Wayback Machine errors"""
     pass
 
+class ArchiveBusyError(WaybackError):
+    """Custom exception for archive requests the rate limit can't fit in their timeout"""
+    pass
+
+# Shared across threads so concurrent reanimations stay polite toward archive.org
+archive_rate_limiter = HostRateLimiter(Config.ARCHIVE_RATE_LIMIT, Config.ARCHIVE_RATE_BURST)
+
+def acquire_archive_slot(url, timeout):
+    """
+    Wait for the per-host rate limit before a request to the archive
+
+    Args:
+        url (str): URL about to be requested
+        timeout (float): Seconds to wait at most, usually the request's own timeout
+
+    Raises:
+        ArchiveBusyError: If the slot would not come within timeout; nothing
+            is reserved then, so a backlog can't park request threads unbounded
+    """
+    host = urlparse(url).hostname or ''
+    try:
+        archive_rate_limiter.acquire(host, timeout=timeout)
+    except RateLimitTimeout:
+        raise ArchiveBusyError(f"Too many requests are queued for {host}; try again shortly")
+
+def _archive_get(url, timeout):
+    """GET a Wayback Machine URL once the per-host rate limit allows it"""
+    acquire_archive_slot(url, timeout)
+    return requests.get(url, timeout=timeout)
+
 def validate_url(url):
     """
     Validate and sanitize URL
@@ -36,6 +69,7 @@ def validate_url(url):
     except Exception as e:
         raise WaybackError(f"URL validation failed: {str(e)}")
 
+@timed('wayback_fetch')
 def fetch_archived_snapshot(url, timeout=10):
     """
     Fetch an archived snapshot from the Wayback Machine
@@ -49,6 +83,7 @@ def fetch_archived_snapshot(url, timeout=10):
             - html (str): Archived HTML content
             - archive_date (str): Date of the archive
             - archive_url (str): Full Wayback Machine URL
+            - removed_artifacts (dict): Elements removed per cleaning rule
             
     Raises:
         WaybackError: If archive cannot be fetched
@@ -60,7 +95,7 @@ def fetch_archived_snapshot(url, timeout=10):
         # Step 1: Get the latest available snapshot
         availability_url = f"http://archive.org/wayback/available?url={quote(validated_url)}"
         
-        response = requests.get(availability_url, timeout=timeout)
+        response = _archive_get(availability_url, timeout)
         response.raise_for_status()
         
         data = response.json()
@@ -77,20 +112,23 @@ def fetch_archived_snapshot(url, timeout=10):
         archive_date = format_wayback_timestamp(archive_timestamp)
         
         # Step 2: Fetch the actual archived content
-        archive_response = requests.get(archive_url, timeout=timeout)
+        archive_response = _archive_get(archive_url, timeout)
         archive_response.raise_for_status()
         
         html_content = archive_response.text
         
         # Step 3: Clean the HTML
-        cleaned_html = clean_archived_html(html_content, archive_url)
+        cleaned_html, removed_artifacts = clean_archived_html_with_stats(html_content, archive_url)
         
         return {
             'html': cleaned_html,
             'archive_date': archive_date,
-            'archive_url': archive_url
+            'archive_url': archive_url,
+            'removed_artifacts': removed_artifacts
         }
         
+    except WaybackError:
+        raise
     except requests.exceptions.Timeout:
         raise WaybackError("Request timed out while fetching archive")
     except requests.exceptions.RequestException as e:
@@ -116,6 +154,119 @@ def format_wayback_timestamp(timestamp):
     except:
         return timestamp
 
+class CleaningRule:
+    """A precompiled rule that matches one kind of Wayback Machine artifact"""
+    
+    __slots__ = ('name', 'tag_names', 'matcher')
+    
+    def __init__(self, name, matcher, tag_names=None):
+        """
+        Args:
+            name (str): Rule name used in removal counts
+            matcher (callable): Predicate taking a Tag, True if it should be removed
+            tag_names (iterable): Restrict the rule to these tag names (None = any tag)
+        """
+        self.name = name
+        self.matcher = matcher
+        self.tag_names = frozenset(tag_names) if tag_names else None
+
+# Patterns are compiled once at import and shared by every cleaning pass
+WAYBACK_TEXT_RE = re.compile(r'archive\.org|wayback', re.I)
+WOMBAT_REWRITE_RE = re.compile(r'__wb_|_wb_wombat|__wm\.|wombat\.js', re.I)
+WM_ID_RE = re.compile(r'wm-', re.I)
+WAYBACK_CLASS_RE = re.compile(r'wayback', re.I)
+ARCHIVE_STATIC_RE = re.compile(r'(?:^|//)web-static\.archive\.org/|(?:^|//(?:web\.)?archive\.org)/_static/', re.I)
+
+def _inline_text_matches(pattern):
+    def matcher(tag):
+        return bool(tag.string) and pattern.search(tag.string) is not None
+    return matcher
+
+def _attribute_matches(attribute, pattern):
+    def matcher(tag):
+        value = tag.get(attribute)
+        if not value:
+            return False
+        # Multi-valued attributes such as class come back as lists
+        if isinstance(value, list):
+            return any(pattern.search(item) for item in value)
+        return pattern.search(value) is not None
+    return matcher
+
+CLEANING_RULES = []
+_rules_by_tag = {}
+_untargeted_rules = ()
+
+def register_cleaning_rule(rule):
+    """
+    Add a rule to the cleaning pass
+    Rules are tried in registration order and the first match removes the tag
+    
+    Args:
+        rule (CleaningRule): Rule to add
+    """
+    global _rules_by_tag, _untargeted_rules
+    
+    CLEANING_RULES.append(rule)
+    
+    # Rebuild the dispatch table: rules for a tag name, in registration order
+    tag_names = set()
+    for r in CLEANING_RULES:
+        if r.tag_names:
+            tag_names.update(r.tag_names)
+    _rules_by_tag = {
+        name: tuple(r for r in CLEANING_RULES if r.tag_names is None or name in r.tag_names)
+        for name in tag_names
+    }
+    _untargeted_rules = tuple(r for r in CLEANING_RULES if r.tag_names is None)
+
+# Wayback's own scripts and styles (banner, analytics, playback)
+register_cleaning_rule(CleaningRule(
+    'wayback_inline_script', _inline_text_matches(WAYBACK_TEXT_RE), tag_names=['script', 'style']
+))
+# Wombat client-side URL rewriting injected into every capture
+register_cleaning_rule(CleaningRule(
+    'wombat_rewrite', _inline_text_matches(WOMBAT_REWRITE_RE), tag_names=['script']
+))
+# Scripts and stylesheets served from the archive's static asset host
+register_cleaning_rule(CleaningRule(
+    'archive_static_script', _attribute_matches('src', ARCHIVE_STATIC_RE), tag_names=['script']
+))
+register_cleaning_rule(CleaningRule(
+    'archive_static_link', _attribute_matches('href', ARCHIVE_STATIC_RE), tag_names=['link']
+))
+# Wayback toolbar elements
+register_cleaning_rule(CleaningRule('wayback_toolbar', _attribute_matches('id', WM_ID_RE)))
+# Wayback banner
+register_cleaning_rule(CleaningRule('wayback_banner', _attribute_matches('class', WAYBACK_CLASS_RE)))
+
+def apply_cleaning_rules(soup):
+    """
+    Remove Wayback Machine artifacts from a parsed document in a single traversal
+    
+    Args:
+        soup (BeautifulSoup): Parsed archived page, modified in place
+        
+    Returns:
+        dict: Number of elements removed per rule name
+    """
+    counts = {rule.name: 0 for rule in CLEANING_RULES}
+    rules_by_tag = _rules_by_tag
+    untargeted_rules = _untargeted_rules
+    
+    for tag in soup.find_all(True):
+        # Descendants of an already removed element are gone with it
+        if tag.decomposed:
+            continue
+        
+        for rule in rules_by_tag.get(tag.name, untargeted_rules):
+            if rule.matcher(tag):
+                tag.decompose()
+                counts[rule.name] += 1
+                break
+    
+    return counts
+
 def clean_archived_html(html, archive_url):
     """
     Clean and parse archived HTML content
@@ -128,22 +279,25 @@ def clean_archived_html(html, archive_url):
     Returns:
         str: Cleaned HTML content
     """
+    cleaned_html, _ = clean_archived_html_with_stats(html, archive_url)
+    return cleaned_html
+
+def clean_archived_html_with_stats(html, archive_url):
+    """
+    Clean archived HTML content and report what was removed
+    
+    Args:
+        html (str): Raw HTML from Wayback Machine
+        archive_url (str): The Wayback Machine URL
+        
+    Returns:
+        tuple: (cleaned HTML, dict of removal counts per rule)
+    """
     try:
         soup = BeautifulSoup(html, 'html.parser')
         
-        # Remove Wayback Machine toolbar and scripts
-        for element in soup.find_all(['script', 'style']):
-            # Remove Wayback-specific scripts
-            if element.string and ('archive.org' in element.string or 'wayback' in element.string.lower()):
-                element.decompose()
-        
-        # Remove Wayback toolbar elements
-        for toolbar in soup.find_all(id=re.compile('wm-', re.I)):
-            toolbar.decompose()
-        
-        # Remove Wayback banner
-        for banner in soup.find_all(class_=re.compile('wayback', re.I)):
-            banner.decompose()
+        # Remove Wayback Machine toolbar, banner and scripts
+        removed = apply_cleaning_rules(soup)
         
         # Limit the HTML size to prevent huge responses
         html_str = str(soup)
@@ -153,11 +307,11 @@ def clean_archived_html(html, archive_url):
         if len(html_str) > max_size:
             html_str = html_str[:max_size] + "\n<!-- Content truncated for display -->"
         
-        return html_str
+        return html_str, removed
         
     except Exception as e:
         # If parsing fails, return original HTML (truncated)
         max_size = 50000
         if len(html) > max_size:
-            return html[:max_size] + "\n<!-- Content truncated for display -->"
-        return html
+            return html[:max_size] + "\n<!-- Content truncated for display -->", {}
+        return html, {}
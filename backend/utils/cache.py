@@ -1,7 +1,10 @@
 """
 Simple in-memory cache for API responses
 """
+import hashlib
+import json
 import time
+from collections import OrderedDict
 from threading import Lock
 
 class SimpleCache:
@@ -10,6 +13,8 @@ class SimpleCache:
     def __init__(self):
         self._cache = {}
         self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
     
     def get(self, key):
         """
@@ -25,10 +30,12 @@ class SimpleCache:
             if key in self._cache:
                 value, expiry = self._cache[key]
                 if time.time() < expiry:
+                    self.hits += 1
                     return value
                 else:
                     # Remove expired entry
                     del self._cache[key]
+            self.misses += 1
             return None
     
     def set(self, key, value, ttl=300):
@@ -49,6 +56,22 @@ class SimpleCache:
         with self._lock:
             self._cache.clear()
     
+    def stats(self):
+        """
+        Cache effectiveness counters
+        
+        Returns:
+            dict: hits, misses, hit_ratio and keys
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'keys': len(self._cache)
+            }
+    
     def cleanup_expired(self):
         """Remove all expired entries"""
         with self._lock:
@@ -60,5 +83,222 @@ class SimpleCache:
             for key in expired_keys:
                 del self._cache[key]
 
+class ByteLRUCache:
+    """Thread-safe LRU cache for byte payloads, bounded by total size in bytes"""
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+    
+    def get(self, key):
+        """
+        Get a cached entry and mark it as most recently used
+        
+        Args:
+            key (str): Cache key
+            
+        Returns:
+            tuple: (payload bytes, metadata) if cached, None otherwise
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+    
+    def set(self, key, payload, metadata=None):
+        """
+        Store a payload, evicting least recently used entries to stay under the cap
+        
+        Args:
+            key (str): Cache key
+            payload (bytes): Data to cache
+            metadata: Small value stored alongside the payload (e.g. content type)
+        """
+        size = len(payload)
+        if size > self.max_bytes:
+            # Would evict everything else and still not fit
+            return
+        
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[0])
+            
+            self._entries[key] = (payload, metadata)
+            self._size += size
+            
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+    
+    @property
+    def size(self):
+        """Total bytes currently cached"""
+        return self._size
+    
+    def clear(self):
+        """Clear all cache entries"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+def content_tag(*parts):
+    """
+    Short fingerprint of the text something was derived from
+
+    Added to cache keys so that, when a dataset reload edits a location or
+    persona, replies generated from the old text are no longer found
+
+    Returns:
+        str: 12 hex digits
+    """
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=6).hexdigest()
+
+def _sizeof(value):
+    """Approximate memory held by a cached value, in bytes"""
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    return len(json.dumps(value, default=str).encode('utf-8'))
+
+class VariantCache:
+    """
+    Thread-safe cache keeping several alternative values per key
+    
+    A key counts as a hit only once it holds `variants` live values, which are
+    then served round-robin; until then callers generate a new value and add
+    it, so repeated questions still get varied answers. Values expire
+    individually after `ttl` seconds and whole keys are evicted least recently
+    used first to stay under `max_bytes`.
+    """
+    
+    def __init__(self, variants=3, ttl=3600, max_bytes=8 * 1024 * 1024):
+        self.variants = max(1, variants)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _live_values(self, key, now):
+        # Entry is [values, next index]; values are (value, size, expiry)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        values = entry[0]
+        live = [item for item in values if item[2] > now]
+        if len(live) != len(values):
+            self._size -= sum(item[1] for item in values if item[2] <= now)
+            if not live:
+                del self._entries[key]
+                return None
+            entry[0] = live
+        return entry
+    
+    def get(self, key):
+        """
+        Get the next variant for a key once its variant budget is full
+        
+        Args:
+            key (str): Cache key
+            
+        Returns:
+            Cached value on a hit, None if the caller should generate a new one
+        """
+        with self._lock:
+            entry = self._live_values(key, time.time())
+            if entry is None or len(entry[0]) < self.variants:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            values, index = entry
+            entry[1] = (index + 1) % len(values)
+            self.hits += 1
+            return values[index % len(values)][0]
+    
+    def get_any(self, key):
+        """
+        Get any live variant regardless of the budget, without counting a lookup
+        Used when generating a fresh value failed
+        """
+        with self._lock:
+            entry = self._live_values(key, time.time())
+            if entry is None:
+                return None
+            values, index = entry
+            entry[1] = (index + 1) % len(values)
+            return values[index % len(values)][0]
+    
+    def add(self, key, value):
+        """
+        Add a variant for a key, replacing the oldest one if the budget is full
+        
+        Args:
+            key (str): Cache key
+            value: Value to cache (str, bytes or JSON-serializable)
+        """
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            now = time.time()
+            entry = self._live_values(key, now)
+            if entry is None:
+                entry = self._entries[key] = [[], 0]
+            else:
+                self._entries.move_to_end(key)
+            
+            values = entry[0]
+            if len(values) >= self.variants:
+                self._size -= values.pop(0)[1]
+            values.append((value, size, now + self.ttl))
+            self._size += size
+            
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= sum(item[1] for item in evicted)
+                self.evictions += 1
+    
+    @property
+    def size(self):
+        """Total bytes currently cached"""
+        return self._size
+    
+    def stats(self):
+        """
+        Cache effectiveness counters
+        
+        Returns:
+            dict: hits, misses, hit_ratio, evictions, keys and bytes
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'keys': len(self._entries),
+                'bytes': self._size
+            }
+    
+    def clear(self):
+        """Clear all cache entries and counters"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
 # Global cache instance
 cache = SimpleCache()
@@ -0,0 +1,298 @@
+"""
+HTTP response compression
+Brotli and Zstandard are used when the optional `brotli` and `zstandard`
+packages are installed, gzip is always available
+"""
+import gzip
+import zlib
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Responses smaller than this are not worth the CPU spent compressing them
+DEFAULT_MIN_SIZE = 1024
+
+# Media types that are already compressed and gain nothing from a second pass
+INCOMPRESSIBLE_PREFIXES = ('image/', 'audio/', 'video/', 'font/woff')
+INCOMPRESSIBLE_TYPES = ('application/zip', 'application/gzip', 'application/pdf')
+
+# Streamed media types whose every chunk must reach the client right away
+FLUSHED_TYPES = ('text/event-stream', 'application/x-ndjson')
+
+# Default compression levels per encoding
+DEFAULT_LEVELS = {
+    'br': 5,
+    'zstd': 6,
+    'gzip': 6,
+}
+
+# Streams are compressed one small chunk at a time, where higher levels cost
+# CPU on every event for little gain
+STREAM_LEVELS = {
+    'br': 4,
+    'zstd': 3,
+    'gzip': 5,
+}
+
+def available_encodings():
+    """Content-codings this server can produce, in order of preference"""
+    encodings = []
+    if brotli is not None:
+        encodings.append('br')
+    if zstandard is not None:
+        encodings.append('zstd')
+    encodings.append('gzip')
+    return encodings
+
+def is_compressible(mimetype):
+    """Whether a media type is worth compressing"""
+    if not mimetype:
+        return False
+    return not (mimetype.startswith(INCOMPRESSIBLE_PREFIXES) or mimetype in INCOMPRESSIBLE_TYPES)
+
+def choose_encoding(accept_encoding):
+    """
+    Pick the best content-coding the client accepts
+
+    Args:
+        accept_encoding (str): Value of the Accept-Encoding request header
+
+    Returns:
+        str: 'br', 'zstd' or 'gzip', or None if the client accepts none of them
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = parse_accept_header(accept_encoding)
+    for encoding in available_encodings():
+        if accepted.quality(encoding) > 0:
+            return encoding
+    return None
+
+def compress_bytes(data, encoding, level=None):
+    """
+    Compress a byte string with the given content-coding
+
+    Args:
+        data (bytes): Uncompressed payload
+        encoding (str): 'br', 'zstd' or 'gzip'
+        level (int): Compression level (defaults per encoding)
+
+    Returns:
+        bytes: Compressed payload
+    """
+    if level is None:
+        level = DEFAULT_LEVELS[encoding]
+
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+class StreamCompressor:
+    """Incremental compressor whose output can be flushed after any chunk"""
+
+    def __init__(self, encoding, level=None):
+        """
+        Args:
+            encoding (str): 'br', 'zstd' or 'gzip'
+            level (int): Compression level (defaults per encoding for streams)
+        """
+        if level is None:
+            level = STREAM_LEVELS[encoding]
+        self.encoding = encoding
+
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=level)
+        elif encoding == 'zstd':
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            # wbits 16 + 15 writes a gzip header and trailer
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        """Compress a chunk; the output may be held back until flush()"""
+        if self.encoding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self):
+        """Everything compressed so far, decodable by the client on arrival"""
+        if self.encoding == 'br':
+            return self._compressor.flush()
+        if self.encoding == 'zstd':
+            return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        """The remaining output and the end of the stream"""
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+def _add_vary(headers):
+    vary = headers.get('Vary', '')
+    if 'accept-encoding' not in vary.lower() and vary.strip() != '*':
+        headers['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+
+def _weaken_etag(headers):
+    # Compressed bytes differ from the identity representation, so only a weak
+    # validator still holds; If-None-Match uses weak comparison on GET
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        headers['ETag'] = f'W/{etag}'
+
+class CompressionMiddleware:
+    """
+    WSGI middleware compressing responses in the best encoding the client accepts
+
+    Responses with a Content-Length are compressed whole when at least
+    min_size bytes; streamed responses are compressed as they are produced,
+    flushing after every chunk for event streams and NDJSON so clients still
+    see each event immediately. Responses already encoded (such as the
+    precomputed catalogs), already-compressed media, partial content and
+    responses marked no-transform are passed through untouched
+    """
+
+    def __init__(self, app, min_size=DEFAULT_MIN_SIZE, route_levels=None):
+        """
+        Args:
+            app (callable): The WSGI application to wrap
+            min_size (int): Smallest body in bytes worth compressing
+            route_levels (dict): Path prefix to {encoding: level} overrides;
+                the longest matching prefix wins, and None leaves that
+                route's responses uncompressed
+        """
+        self.app = app
+        self.min_size = min_size
+        self.route_levels = sorted((route_levels or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _route_levels(self, path):
+        for prefix, levels in self.route_levels:
+            if path.startswith(prefix):
+                return True, levels
+        return False, None
+
+    def __call__(self, environ, start_response):
+        encoding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        matched, levels = self._route_levels(environ.get('PATH_INFO', ''))
+        if matched and levels is None:
+            return self.app(environ, start_response)
+
+        response = _CompressedResponse(
+            start_response, encoding, levels or {}, self.min_size,
+            head=environ.get('REQUEST_METHOD') == 'HEAD'
+        )
+        return response.iterate(self.app(environ, response.start_response))
+
+# How a response is passed on
+PASS_THROUGH = 'identity'
+BUFFERED = 'buffered'
+STREAMED = 'streamed'
+
+class _CompressedResponse:
+    """State of one response going through CompressionMiddleware"""
+
+    def __init__(self, start_response, encoding, levels, min_size, head=False):
+        self._start_response = start_response
+        self.encoding = encoding
+        self.levels = levels
+        self.min_size = min_size
+        self.head = head
+        self.mode = None
+        self.flush_chunks = False
+        self._status = None
+        self._headers = None
+        self._written = []
+
+    def _choose_mode(self, status, headers):
+        status_code = int(status.split(' ', 1)[0])
+        mimetype = headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+        if (status_code < 200
+                or status_code in (204, 206, 304)
+                or 'Content-Encoding' in headers
+                or 'no-transform' in headers.get('Cache-Control', '')
+                or not is_compressible(mimetype)):
+            return PASS_THROUGH
+
+        # Caches must keep compressed and uncompressed variants apart
+        _add_vary(headers)
+        if self.encoding is None or self.head:
+            return PASS_THROUGH
+
+        content_length = headers.get('Content-Length')
+        if content_length is None:
+            self.flush_chunks = mimetype in FLUSHED_TYPES
+            return STREAMED
+        return BUFFERED if int(content_length) >= self.min_size else PASS_THROUGH
+
+    def start_response(self, status, headers, exc_info=None):
+        headers = Headers(headers)
+        self.mode = self._choose_mode(status, headers)
+
+        if self.mode == PASS_THROUGH:
+            return self._start_response(status, headers.to_wsgi_list(), exc_info)
+
+        if self.mode == STREAMED:
+            headers['Content-Encoding'] = self.encoding
+            _weaken_etag(headers)
+            self._start_response(status, headers.to_wsgi_list(), exc_info)
+        else:
+            # Sent once the whole body is compressed and its length known
+            self._status, self._headers = status, headers
+        return self._written.append
+
+    def iterate(self, app_iter):
+        """Body of the response, compressed according to the chosen mode"""
+        try:
+            compressor = None
+            buffered = []
+            for chunk in app_iter:
+                chunks = self._written + [chunk]
+                self._written.clear()
+
+                if self.mode == PASS_THROUGH:
+                    yield from chunks
+                elif self.mode == BUFFERED:
+                    buffered.extend(chunks)
+                else:
+                    if compressor is None:
+                        compressor = StreamCompressor(self.encoding, self.levels.get(self.encoding))
+                    output = b''.join(compressor.compress(c) for c in chunks if c)
+                    if self.flush_chunks:
+                        output += compressor.flush()
+                    if output:
+                        yield output
+
+            if self.mode == BUFFERED:
+                yield self._buffered_body(b''.join(buffered + self._written))
+            elif self.mode == STREAMED:
+                if compressor is None:
+                    compressor = StreamCompressor(self.encoding, self.levels.get(self.encoding))
+                yield b''.join(compressor.compress(c) for c in self._written if c) + compressor.finish()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    def _buffered_body(self, body):
+        headers = self._headers
+        level = self.levels.get(self.encoding)
+        compressed = compress_bytes(body, self.encoding, level)
+
+        if len(compressed) < len(body):
+            body = compressed
+            headers['Content-Encoding'] = self.encoding
+            _weaken_etag(headers)
+        headers['Content-Length'] = str(len(body))
+        self._start_response(self._status, headers.to_wsgi_list())
+        return body
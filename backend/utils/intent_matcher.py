@@ -0,0 +1,154 @@
+"""
+Compiled multi-pattern keyword matcher
+Scores every intent in one pass over the text, matching whole words only
+"""
+import re
+from collections import Counter
+
+# Words, keeping inner apostrophes ("don't") but not quote marks around them
+_WORD_RE = re.compile(r"\w+(?:'\w+)*")
+
+# Upper bound on memoized tokens, so adversarial input can't grow it forever
+_MEMO_LIMIT = 50000
+
+def _normalize(text):
+    # Curly apostrophes typed on phones should match keywords like "don't"
+    return text.lower().replace('’', "'").replace('‘', "'")
+
+class IntentMatcher:
+    """Classifies text against ordered keyword lexicons"""
+
+    def __init__(self, lexicon):
+        """
+        Args:
+            lexicon (dict): Intent label to list of keywords. Insertion order is
+                the priority used to break ties between equally scored intents.
+                A trailing '*' makes a keyword a stem ('worr*' matches worry,
+                worried); keywords with spaces are matched as whole phrases and
+                score one hit per word, since they are more specific.
+        """
+        self.labels = tuple(lexicon)
+        self._priority = {label: index for index, label in enumerate(self.labels)}
+        self._words = {}
+        self._stems = {}
+        phrases = {}
+
+        for label, keywords in lexicon.items():
+            for keyword in keywords:
+                keyword = _normalize(keyword)
+                if keyword.endswith('*'):
+                    self._stems.setdefault(keyword[:-1], label)
+                elif ' ' in keyword:
+                    phrases.setdefault(' '.join(keyword.split()), label)
+                else:
+                    self._words.setdefault(keyword, label)
+
+        # Stem lengths to try, longest first so the most specific stem wins
+        self._stem_lengths = tuple(sorted({len(stem) for stem in self._stems}, reverse=True))
+
+        # All phrases share one regex; value is (label, weight). Word boundaries
+        # are checked on the few matches instead of at every position, which
+        # keeps the regex on its fast literal-prefix scan
+        self._phrases = {}
+        self._phrase_pattern = None
+        if phrases:
+            alternatives = sorted(phrases, key=len, reverse=True)
+            for phrase in alternatives:
+                self._phrases[phrase] = (phrases[phrase], len(phrase.split()))
+            self._phrase_pattern = re.compile('|'.join(
+                r'\s+'.join(re.escape(word) for word in phrase.split()) for phrase in alternatives
+            ))
+
+        # Whitespace-separated chunk -> labels of the words in it; the
+        # vocabulary of real text is small, so most lookups are memo hits
+        self._chunk_labels = {}
+
+    def _label_for_word(self, word):
+        label = self._words.get(word)
+        if label is None:
+            for length in self._stem_lengths:
+                if len(word) >= length:
+                    label = self._stems.get(word[:length])
+                    if label is not None:
+                        break
+        return label
+
+    def _labels_for_chunk(self, chunk):
+        try:
+            return self._chunk_labels[chunk]
+        except KeyError:
+            pass
+
+        # Strip punctuation and split joined words ("sad/angry", "hurt.")
+        labels = tuple(
+            label for label in map(self._label_for_word, _WORD_RE.findall(chunk))
+            if label is not None
+        )
+
+        if len(self._chunk_labels) < _MEMO_LIMIT:
+            self._chunk_labels[chunk] = labels
+        return labels
+
+    @staticmethod
+    def _is_word_boundary(text, index):
+        if index <= 0 or index >= len(text):
+            return True
+        before, after = text[index - 1], text[index]
+        return not ((before.isalnum() or before in "_'") and (after.isalnum() or after in "_'"))
+
+    def scores(self, text):
+        """
+        Count keyword hits per intent
+
+        Args:
+            text (str): Text to classify
+
+        Returns:
+            dict: Intent label to number of hits (intents without hits omitted)
+        """
+        normalized = _normalize(text)
+        counts = {}
+
+        # Split once and look each distinct chunk up a single time
+        for chunk, occurrences in Counter(normalized.split()).items():
+            for label in self._labels_for_chunk(chunk):
+                counts[label] = counts.get(label, 0) + occurrences
+
+        if self._phrase_pattern is not None:
+            for match in self._phrase_pattern.finditer(normalized):
+                start, end = match.span()
+                if self._is_word_boundary(normalized, start) and self._is_word_boundary(normalized, end):
+                    label, weight = self._phrases[' '.join(match.group().split())]
+                    counts[label] = counts.get(label, 0) + weight
+
+        return counts
+
+    def classify(self, text, default=None):
+        """
+        Pick the intent with the most hits, breaking ties by lexicon order
+
+        Args:
+            text (str): Text to classify
+            default: Value returned when no keyword matches
+
+        Returns:
+            str: Winning intent label, or default
+        """
+        counts = self.scores(text)
+        if not counts:
+            return default
+        priority = self._priority
+        return min(counts, key=lambda label: (-counts[label], priority[label]))
+
+    def classify_many(self, texts, default=None):
+        """
+        Classify a sequence of texts with the shared compiled tables
+
+        Args:
+            texts (iterable): Texts to classify
+            default: Value used for texts without any match
+
+        Returns:
+            list: Intent label per text, in input order
+        """
+        return [self.classify(text, default) for text in texts]
@@ -0,0 +1,87 @@
+"""
+Fast JSON serialization
+orjson is used when the optional `orjson` package (3.9.15 or newer) is
+installed, Python's json module otherwise. Responses, SSE frames and NDJSON lines all go through
+dumps_bytes, so every blueprint gets the faster encoder
+"""
+import json
+import re
+from flask.json.provider import DefaultJSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Older orjson releases can crash on deeply nested request bodies
+# (CVE-2024-27454), so they are ignored even where requirements.txt
+# wasn't reinstalled
+ORJSON_MIN_VERSION = (3, 9, 15)
+
+def _version_tuple(version):
+    # Leading digits of each part, so "3.10.0rc1" reads as (3, 10, 0)
+    return tuple(int(re.match(r'\d*', part).group() or 0) for part in version.split('.')[:3])
+
+if orjson is not None and _version_tuple(getattr(orjson, '__version__', '0')) < ORJSON_MIN_VERSION:
+    orjson = None
+
+if orjson is not None:
+    # Dates are passed to the default handler so they keep Flask's HTTP date
+    # format, and non-string dict keys become strings as with the json module
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+def dumps_bytes(data, default=_default, sort_keys=False):
+    """
+    Encode data as compact UTF-8 JSON
+
+    Args:
+        data: JSON-serializable value
+        default (callable): Converts values JSON has no type for; defaults
+            to Flask's handler (dates, UUIDs, dataclasses)
+        sort_keys (bool): Sort the keys of every object
+
+    Returns:
+        bytes: The encoded JSON
+
+    Raises:
+        TypeError: If a value can't be serialized
+    """
+    if orjson is not None:
+        options = ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else ORJSON_OPTIONS
+        try:
+            return orjson.dumps(data, default=default, option=options)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits and a few other values orjson rejects
+            # still encode with the json module
+            pass
+
+    return json.dumps(
+        data, default=default, sort_keys=sort_keys, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, for jsonify() and request.get_json()"""
+
+    # Key order and ASCII escaping cost time and no client depends on them
+    sort_keys = False
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        if kwargs or orjson is None:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj, self.default, self.sort_keys).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs or orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Pretty-printed debug output is left to the json module
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            dumps_bytes(obj, self.default, self.sort_keys) + b'\n', mimetype=self.mimetype
+        )
@@ -0,0 +1,264 @@
+"""
+In-process metrics in the Prometheus text format
+Every thread records into its own shard, so counting never takes a lock or
+contends with other requests; shards are only summed when /metrics is
+scraped. Each gunicorn worker keeps its own metrics, like any per-process
+Prometheus client
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; covers cached replies through slow model calls and archive fetches
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Bytes; covers small JSON replies through archived pages and images
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return str(int(value)) if value.is_integer() else repr(value)
+    return str(value)
+
+class Metric:
+    """A named metric with a fixed set of labels"""
+
+    kind = None
+
+    def __init__(self, registry, name, help, labels=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def _samples(self, values):
+        """Exposition lines for the merged values of this metric"""
+        for label_values, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}'
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        shard = self.registry._shard()
+        key = (self, label_values)
+        shard[key] = shard.get(key, 0) + amount
+
+class Gauge(Metric):
+    """Value that goes up and down, such as requests in flight"""
+
+    kind = 'gauge'
+
+    def inc(self, *label_values, amount=1):
+        shard = self.registry._shard()
+        key = (self, label_values)
+        shard[key] = shard.get(key, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        shard = self.registry._shard()
+        key = (self, label_values)
+        counts = shard.get(key)
+        if counts is None:
+            # One slot per bucket, one for +Inf, then the sum
+            counts = shard[key] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _samples(self, values):
+        for label_values, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f'{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}'
+            labels = _format_labels(self.labels, label_values)
+            yield f'{self.name}_sum{labels} {_format_value(counts[-1])}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+class MetricsRegistry:
+    """Metric definitions, their per-thread values and stats() collectors"""
+
+    def __init__(self, prefix='haunted'):
+        """
+        Args:
+            prefix (str): Prepended to every metric name
+        """
+        self.prefix = prefix
+        self._metrics = []
+        self._collectors = []
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+            return values
+
+    def _define(self, cls, name, help, labels, **kwargs):
+        metric = cls(self, f'{self.prefix}_{name}', help, labels, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._define(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._define(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._define(Histogram, name, help, labels, buckets=buckets)
+
+    def register_stats(self, component, stats, counters=()):
+        """
+        Export the numbers from a component's stats() on every scrape
+
+        Args:
+            component (str): Name used in the metric names, e.g. 'reply_cache'
+            stats (callable): Returns a dict of numbers; other values are skipped
+            counters (iterable): Keys that only ever increase, exported as
+                counters; the rest are gauges
+        """
+        self._collectors.append((component, stats, frozenset(counters)))
+
+    @staticmethod
+    def _merge(into, values):
+        for key, value in values.items():
+            if isinstance(value, list):
+                merged = into.get(key)
+                into[key] = value[:] if merged is None else [a + b for a, b in zip(merged, value)]
+            else:
+                into[key] = into.get(key, 0) + value
+
+    def _collect(self):
+        """Values summed over every thread, keyed by metric and label values"""
+        with self._lock:
+            # Threads that have exited can't record any more, so their values
+            # are folded in once and their shards dropped
+            live = []
+            for thread, values in self._shards:
+                if thread.is_alive():
+                    live.append((thread, values))
+                else:
+                    self._merge(self._retired, values)
+            self._shards = live
+
+            totals = {}
+            self._merge(totals, self._retired)
+            for _, values in live:
+                # dict.copy() is atomic, so owners can keep writing meanwhile
+                self._merge(totals, values.copy())
+        return totals
+
+    def render(self):
+        """
+        Current values in the Prometheus text exposition format
+
+        Returns:
+            str: One HELP/TYPE block per metric
+        """
+        by_metric = {}
+        for (metric, label_values), value in self._collect().items():
+            by_metric.setdefault(metric, {})[label_values] = value
+
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric._samples(by_metric.get(metric, {})))
+
+        for component, stats, counters in self._collectors:
+            try:
+                values = stats()
+            except Exception as e:
+                lines.append(f'# {component} stats unavailable: {_escape(e)}')
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                kind = 'counter' if key in counters else 'gauge'
+                name = f'{self.prefix}_{component}_{key}' + ('_total' if kind == 'counter' else '')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+# Singleton instance
+metrics = MetricsRegistry()
+
+REQUESTS = metrics.counter(
+    'http_requests_total', 'HTTP requests handled', ('blueprint', 'endpoint', 'method', 'status')
+)
+REQUEST_LATENCY = metrics.histogram(
+    'http_request_duration_seconds', 'Time from request to the end of the response body',
+    ('blueprint', 'endpoint')
+)
+IN_FLIGHT = metrics.gauge('http_requests_in_flight', 'Requests being handled', ('blueprint',))
+REQUEST_BYTES = metrics.histogram(
+    'http_request_size_bytes', 'Request body sizes', ('blueprint',), buckets=SIZE_BUCKETS
+)
+RESPONSE_BYTES = metrics.histogram(
+    'http_response_size_bytes', 'Response body sizes before compression; streams are not counted',
+    ('blueprint',), buckets=SIZE_BUCKETS
+)
+STAGE_LATENCY = metrics.histogram(
+    'stage_duration_seconds', 'Time spent in upstream calls and processing stages', ('stage',)
+)
+STAGE_ERRORS = metrics.counter(
+    'stage_errors_total', 'Upstream calls and processing stages that raised', ('stage', 'error')
+)
+
+@contextmanager
+def timed(stage):
+    """
+    Record the duration of a block, and its exception if it raises
+
+    Works as a decorator too:
+
+        @timed('wayback_fetch')
+        def fetch_archived_snapshot(url): ...
+
+    Args:
+        stage (str): Stage label, e.g. 'llm_complete'
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        STAGE_ERRORS.inc(stage, type(e).__name__)
+        raise
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage)
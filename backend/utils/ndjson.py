@@ -0,0 +1,18 @@
+"""
+Helpers for newline-delimited JSON (application/x-ndjson) responses
+"""
+from utils.json_provider import dumps_bytes
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def ndjson_line(data):
+    """
+    Encode one record of an NDJSON stream
+
+    Args:
+        data: JSON-serializable record
+
+    Returns:
+        str: Compact JSON followed by a newline
+    """
+    return dumps_bytes(data).decode('utf-8') + '\n'
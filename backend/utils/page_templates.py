@@ -0,0 +1,167 @@
+"""
+Page templates for reanimated websites
+The shell is identical for every reanimation, so it can be served once as a
+cacheable asset and combined with per-page content fragments on the client
+"""
+import hashlib
+
+# Opening half of a reanimated page: document head, stylesheet and badge
+REANIMATED_PAGE_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Reanimated Page</title>
+    <style>
+        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+        
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
+            line-height: 1.6;
+            color: #e0e0e0;
+            background: linear-gradient(135deg, #1a1a2e 0%, #16213e 100%);
+            padding: 2rem;
+            min-height: 100vh;
+        }
+        
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+            background: rgba(26, 26, 46, 0.8);
+            padding: 2rem;
+            border-radius: 12px;
+            border: 2px solid rgba(176, 38, 255, 0.3);
+            box-shadow: 0 0 30px rgba(176, 38, 255, 0.2);
+        }
+        
+        .reanimated-badge {
+            display: inline-block;
+            background: linear-gradient(135deg, #b026ff, #00f0ff);
+            color: #0a0a0f;
+            padding: 0.5rem 1rem;
+            border-radius: 20px;
+            font-weight: bold;
+            font-size: 0.9rem;
+            margin-bottom: 1rem;
+            animation: glow 2s ease-in-out infinite;
+        }
+        
+        @keyframes glow {
+            0%, 100% { box-shadow: 0 0 10px rgba(176, 38, 255, 0.5); }
+            50% { box-shadow: 0 0 20px rgba(0, 240, 255, 0.8); }
+        }
+        
+        h1, h2, h3, h4, h5, h6 {
+            color: #b026ff;
+            margin: 1.5rem 0 1rem;
+            text-shadow: 0 0 10px rgba(176, 38, 255, 0.5);
+        }
+        
+        h1 { font-size: 2.5rem; }
+        h2 { font-size: 2rem; }
+        h3 { font-size: 1.5rem; }
+        
+        p {
+            margin-bottom: 1rem;
+            color: #a0a0a0;
+        }
+        
+        a {
+            color: #00f0ff;
+            text-decoration: none;
+            transition: all 0.3s ease;
+        }
+        
+        a:hover {
+            color: #b026ff;
+            text-shadow: 0 0 10px rgba(176, 38, 255, 0.5);
+        }
+        
+        img {
+            max-width: 100%;
+            height: auto;
+            border-radius: 8px;
+            border: 2px solid rgba(0, 240, 255, 0.3);
+            margin: 1rem 0;
+        }
+        
+        ul, ol {
+            margin: 1rem 0 1rem 2rem;
+            color: #a0a0a0;
+        }
+        
+        li {
+            margin-bottom: 0.5rem;
+        }
+        
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 1rem 0;
+        }
+        
+        th, td {
+            padding: 0.75rem;
+            text-align: left;
+            border: 1px solid rgba(176, 38, 255, 0.3);
+        }
+        
+        th {
+            background: rgba(176, 38, 255, 0.2);
+            color: #b026ff;
+            font-weight: bold;
+        }
+        
+        td {
+            background: rgba(26, 26, 46, 0.5);
+        }
+        
+        .original-content {
+            margin-top: 2rem;
+            padding-top: 2rem;
+            border-top: 2px solid rgba(0, 240, 255, 0.3);
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="reanimated-badge">✨ REANIMATED BY THE HAUNTED NEXUS ✨</div>
+        <div class="original-content">
+"""
+
+# Closing half of a reanimated page
+REANIMATED_PAGE_TAIL = """
+        </div>
+        <div style="margin-top: 2rem; padding: 1rem; background: rgba(0, 240, 255, 0.1); border-radius: 8px; text-align: center;">
+            <p style="color: #00f0ff; font-style: italic;">
+                This page has been resurrected from the digital graveyard and given new life with modern styling.
+            </p>
+        </div>
+    </div>
+</body>
+</html>"""
+
+# Marker the client replaces with the content fragment
+REANIMATED_CONTENT_PLACEHOLDER = "<!-- REANIMATED_CONTENT -->"
+
+# Full shell served by /api/reanimator/template
+REANIMATED_PAGE_SHELL = REANIMATED_PAGE_HEAD + REANIMATED_CONTENT_PLACEHOLDER + REANIMATED_PAGE_TAIL
+
+# Strong validator for the shell; changes whenever the template changes
+REANIMATED_PAGE_SHELL_ETAG = hashlib.sha256(REANIMATED_PAGE_SHELL.encode('utf-8')).hexdigest()[:32]
+
+def render_reanimated_page(fragment):
+    """
+    Wrap a content fragment in the reanimated page shell
+
+    Args:
+        fragment (str): Extracted and modernized page content
+
+    Returns:
+        str: Complete HTML document
+    """
+    return REANIMATED_PAGE_HEAD + fragment + REANIMATED_PAGE_TAIL
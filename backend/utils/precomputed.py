@@ -0,0 +1,96 @@
+"""
+Pre-encoded JSON responses for catalog endpoints
+The body is serialized and compressed once per data version and served as
+bytes, with strong ETags so conditional GETs are answered without any
+serialization or compression work
+"""
+import hashlib
+from threading import Lock
+from flask import Response, request
+from utils.compression import available_encodings, choose_encoding, compress_bytes
+from utils.json_provider import dumps_bytes
+
+# Catalog bodies are small and served often, so spend more CPU compressing once
+PRECOMPRESS_LEVELS = {
+    'br': 11,
+    'zstd': 19,
+    'gzip': 9,
+}
+
+class PrecomputedJSON:
+    """A success envelope around slowly changing data, encoded once"""
+
+    def __init__(self, build, max_age=300, version=None):
+        """
+        Args:
+            build (callable): Returns the 'data' payload; called again only
+                after invalidate() or when the version changes
+            max_age (int): Seconds clients may reuse the response without revalidating
+            version (callable): Returns the current version of the underlying
+                data, for data that is reloaded at runtime
+        """
+        self.build = build
+        self.max_age = max_age
+        self.version = version
+        self._variants = None
+        self._encoded_version = None
+        self._lock = Lock()
+
+    def warm(self):
+        """Encode now rather than on the first request, e.g. before forking workers"""
+        self._get_variants()
+
+    def invalidate(self):
+        """Re-serialize on the next request, after the underlying data changed"""
+        self._variants = None
+
+    def _encode(self):
+        body = dumps_bytes({'success': True, 'data': self.build()})
+        digest = hashlib.sha256(body).hexdigest()[:32]
+
+        # Each encoding is a different byte sequence, so each gets its own strong ETag
+        variants = {None: (body, digest)}
+        for encoding in available_encodings():
+            variants[encoding] = (
+                compress_bytes(body, encoding, PRECOMPRESS_LEVELS[encoding]),
+                f'{digest}-{encoding}'
+            )
+        return variants
+
+    def _get_variants(self):
+        version = self.version() if self.version is not None else None
+        variants = self._variants
+        if variants is None or version != self._encoded_version:
+            with self._lock:
+                variants = self._variants
+                if variants is None or version != self._encoded_version:
+                    # Read the version before building, so data that changes
+                    # meanwhile is caught on the next request
+                    variants = self._encode()
+                    self._variants, self._encoded_version = variants, version
+        return variants
+
+    def response(self):
+        """
+        Serve the current data for this request
+
+        Returns:
+            Response: 304 when If-None-Match names any current variant,
+                otherwise the pre-encoded body in the best accepted encoding
+        """
+        variants = self._get_variants()
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        body, etag = variants.get(encoding, variants[None])
+
+        if_none_match = request.if_none_match
+        if if_none_match and any(if_none_match.contains_weak(tag) for _, tag in variants.values()):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+            if encoding is not None:
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        response.vary.add('Accept-Encoding')
+        return response
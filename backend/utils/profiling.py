@@ -0,0 +1,230 @@
+"""
+On-demand profiling for live workers
+A stack sampler for whole-process views and cProfile sessions for single
+requests. Nothing here runs, or is hooked into requests, until asked for
+"""
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+class ProfilingError(Exception):
+    """Custom exception for profiling requests that can't be served"""
+    pass
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def collapse_stack(frame, thread_name=None):
+    """
+    One stack in the collapsed format read by flamegraph.pl and speedscope
+
+    Args:
+        frame (frame): Innermost frame
+        thread_name (str): Prepended as the root frame when given
+
+    Returns:
+        str: Frames from the outermost to the innermost, joined by ';'
+    """
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    if thread_name:
+        labels.append(thread_name)
+    return ';'.join(reversed(labels))
+
+def sample_stacks(seconds, interval=0.005):
+    """
+    Sample the stacks of every other thread for a while
+
+    Args:
+        seconds (float): How long to sample
+        interval (float): Seconds between samples
+
+    Returns:
+        tuple: (Counter of collapsed stack to sample count, samples taken)
+    """
+    own_id = threading.get_ident()
+    stacks = Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != own_id:
+                stacks[collapse_stack(frame, names.get(thread_id, str(thread_id)))] += 1
+        samples += 1
+        time.sleep(interval)
+
+    return stacks, samples
+
+def format_collapsed(stacks):
+    """Collapsed stacks as text, most sampled first"""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+def stats_text(stats, limit=50, sort='cumulative'):
+    """
+    Human-readable report of a profile
+
+    Args:
+        stats (pstats.Stats): Collected profile
+        limit (int): Functions listed
+        sort (str): pstats sort key
+
+    Returns:
+        str: The report
+    """
+    stream = io.StringIO()
+    report = pstats.Stats(stream=stream)
+    report.add(stats)
+    report.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+def stats_bytes(stats):
+    """A profile in the file format of pstats.dump_stats, for snakeviz or pstats.Stats(path)"""
+    return marshal.dumps(stats.stats)
+
+class RequestProfiler:
+    """
+    cProfile sessions for individual requests
+
+    Either a single traced request, or the next N requests matching a path
+    prefix aggregated into one profile. Only one request is profiled at a
+    time; others arriving meanwhile run unprofiled
+    """
+
+    def __init__(self, keep=20):
+        """
+        Args:
+            keep (int): Traced request profiles kept for download
+        """
+        self.keep = keep
+        self.armed = 0
+        self.path_prefix = ''
+        self.aggregate = None
+        self.aggregated = 0
+        self._traces = OrderedDict()
+        self._ids = itertools.count(1)
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+
+    def arm(self, count, path_prefix=''):
+        """
+        Profile the next count requests whose path starts with path_prefix,
+        replacing any previous aggregate
+        """
+        with self._lock:
+            self.armed = count
+            self.path_prefix = path_prefix
+            self.aggregate = None
+            self.aggregated = 0
+
+    def wants(self, path):
+        """Whether an armed session should profile a request for this path"""
+        return self.armed > 0 and path.startswith(self.path_prefix)
+
+    def start(self, armed=False):
+        """
+        Start profiling the calling thread
+
+        Args:
+            armed (bool): Counts toward the armed session's requests
+
+        Returns:
+            cProfile.Profile: Running profile, or None when another request
+                is being profiled or the armed session just filled up
+        """
+        if not self._active.acquire(blocking=False):
+            return None
+        if armed:
+            with self._lock:
+                if self.armed <= 0:
+                    self._active.release()
+                    return None
+                self.armed -= 1
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) owns the interpreter hook
+            self._active.release()
+            return None
+        return profile
+
+    def finish(self, profile, armed=False):
+        """
+        Stop a profile started by start()
+
+        Returns:
+            str: Id of the stored trace, or None for armed sessions
+        """
+        profile.disable()
+        self._active.release()
+        stats = pstats.Stats(profile)
+
+        with self._lock:
+            if armed:
+                if self.aggregate is None:
+                    self.aggregate = stats
+                else:
+                    self.aggregate.add(stats)
+                self.aggregated += 1
+                return None
+
+            trace_id = str(next(self._ids))
+            self._traces[trace_id] = stats
+            while len(self._traces) > self.keep:
+                self._traces.popitem(last=False)
+            return trace_id
+
+    def trace(self, trace_id):
+        """
+        Raises:
+            ProfilingError: If the trace is unknown or was dropped
+        """
+        with self._lock:
+            stats = self._traces.get(trace_id)
+        if stats is None:
+            raise ProfilingError(f"No profile with id {trace_id}")
+        return stats
+
+    def aggregate_stats(self):
+        """
+        Returns:
+            pstats.Stats: Copy of the armed session's profile so far
+
+        Raises:
+            ProfilingError: If no request has been profiled since arm()
+        """
+        with self._lock:
+            if self.aggregate is None:
+                raise ProfilingError("No requests have been profiled yet")
+            stats = pstats.Stats()
+            stats.add(self.aggregate)
+        return stats
+
+    def status(self):
+        """
+        Returns:
+            dict: armed requests left, path_prefix, requests aggregated and traces kept
+        """
+        with self._lock:
+            return {
+                'armed': self.armed,
+                'path_prefix': self.path_prefix,
+                'aggregated': self.aggregated,
+                'traces': list(self._traces)
+            }
+
+# Singleton instance
+request_profiler = RequestProfiler()
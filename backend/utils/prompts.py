@@ -8,9 +8,18 @@ GHOST_CHAT_PROMPT = """You are a spooky ghost. Respond in 1-2 sentences with eer
 # Haunted Journal Prompt - Concise version
 HAUNTED_JOURNAL_PROMPT = """Analyze emotion (sadness/anger/fear/joy/hope/confusion/contemplation) and reply with 2-3 poetic sentences. Be haunting and brief."""
 
+# Output format appended to the journal prompt so the emotion can be read back
+HAUNTED_JOURNAL_FORMAT = """Answer only with JSON: {"emotion": "<emotion>", "haunted_reply": "<reply>"}"""
+
+# Batch journal replies - the emotion is already detected locally
+HAUNTED_JOURNAL_REPLY_PROMPT = """The writer feels {emotion}. Reply to their journal entry with 2-3 poetic sentences. Be haunting and brief."""
+
 # HTML Modernization Prompt - Concise version
 HTML_MODERNIZATION_PROMPT = """Modernize this HTML with dark theme, purple/cyan colors, modern CSS. Keep it minimal."""
 
+# The page shell and styles are fixed, so only the body content is requested
+HTML_FRAGMENT_FORMAT = """Return only the inner body HTML, without <html>, <head>, <style> or markdown fences."""
+
 # API Stitching Prompt - Concise version
 API_STITCHING_PROMPT = """Combine these two API responses into 2-3 spooky sentences. Be creative and brief."""
 
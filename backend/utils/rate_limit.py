@@ -0,0 +1,53 @@
+"""
+Per-host rate limiting for outbound requests
+"""
+import time
+from threading import Lock
+
+class RateLimitTimeout(Exception):
+    """Raised when a rate limit slot can't be acquired in time"""
+    pass
+
+class HostRateLimiter:
+    """Thread-safe token bucket per host, shared by every caller in the process"""
+    
+    def __init__(self, rate, burst=1):
+        """
+        Args:
+            rate (float): Sustained requests per second allowed per host
+            burst (int): Requests allowed back-to-back before throttling starts
+        """
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = Lock()
+    
+    def acquire(self, host, timeout=None):
+        """
+        Wait until a request to host is allowed
+        
+        Args:
+            host (str): Host name the request goes to
+            timeout (float): Maximum seconds to wait (None waits as long as needed)
+            
+        Raises:
+            RateLimitTimeout: If the slot would not be available within timeout
+        """
+        if not self.rate or self.rate <= 0:
+            return
+        
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            
+            # Reserve a token now (possibly going negative) so concurrent
+            # callers queue up behind each other instead of racing
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            if timeout is not None and wait > timeout:
+                raise RateLimitTimeout(f"Rate limit for {host} exceeded")
+            
+            self._buckets[host] = (tokens - 1, now)
+        
+        if wait > 0:
+            time.sleep(wait)
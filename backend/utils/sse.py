@@ -0,0 +1,49 @@
+"""
+Helpers for Server-Sent Events (text/event-stream) responses
+"""
+from flask import request
+from utils.json_provider import dumps_bytes
+
+# Media type of an event stream
+SSE_MIMETYPE = 'text/event-stream'
+
+def format_sse(data, event=None):
+    """
+    Format a single Server-Sent Event frame
+
+    Args:
+        data: JSON-serializable payload for the event
+        event (str): Optional event name
+
+    Returns:
+        str: Encoded event frame terminated by a blank line
+    """
+    frame = ''
+    if event:
+        frame += f"event: {event}\n"
+    frame += f"data: {dumps_bytes(data).decode('utf-8')}\n\n"
+    return frame
+
+def sse_comment(text=''):
+    """Format an SSE comment line, used as a keep-alive"""
+    return f": {text}\n\n"
+
+# Headers that keep proxies from buffering or caching an event stream
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',
+}
+
+def wants_event_stream(payload=None):
+    """
+    Whether the client asked for an event stream instead of a JSON reply
+
+    Args:
+        payload (dict): Parsed request body, checked for "stream": true
+
+    Returns:
+        bool: True for "stream": true or an Accept header preferring text/event-stream
+    """
+    if isinstance(payload, dict) and payload.get('stream') is True:
+        return True
+    return request.accept_mimetypes.best_match(['application/json', SSE_MIMETYPE]) == SSE_MIMETYPE
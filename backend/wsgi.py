@@ -0,0 +1,19 @@
+"""
+WSGI entry point for production servers
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module builds the app and loads everything that is shared
+read-only between requests (datasets and their indexes, response tables,
+pre-encoded catalogs), so with preload_app it is done once in the master
+process and shared copy-on-write by every worker
+"""
+from app import create_app
+from routes.cursed_image import styles_catalog
+from routes.ghost_chat import personas_catalog
+from routes.haunted_map import locations_catalog
+
+app = create_app()
+
+for catalog in (locations_catalog, personas_catalog, styles_catalog):
+    catalog.warm()